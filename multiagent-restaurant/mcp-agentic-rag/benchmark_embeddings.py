@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los backends de embeddings sobre el corpus de vinos
+Cada backend se mide en un subproceso propio (la memoria de PyTorch no
+contamina la del backend ONNX): tiempo de carga, RSS, latencia de una
+consulta (p50/p95), throughput por lotes y, frente al primer backend,
+coseno por documento y coincidencia del top-5 de recuperación.
+
+Uso:
+    python benchmark_embeddings.py --backends sentence_transformers,onnx --onnx-path data/onnx
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from embedding_backends import create_embedding_backend
+from knowledge_loader import load_knowledge_documents
+
+QUERIES = [
+    "vino tinto para asado", "blanco fresco para marisco", "espumoso para aperitivo",
+    "Rioja reserva con crianza en barrica", "algo para un queso azul", "vino dulce para postre",
+    "tinto ligero para pasta", "Albariño de Rías Baixas", "temperatura de servicio del cava",
+    "maridaje con cordero al horno"
+]
+
+
+def _rss_mb() -> float:
+    """RSS actual del proceso (Linux) en MB"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(args) -> dict:
+    """Medir un backend en este proceso y guardar sus embeddings del corpus"""
+    texts = [doc["content"] for doc in load_knowledge_documents(Path(args.knowledge_dir))]
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    backend = create_embedding_backend(args.worker, args.model, args.onnx_path)
+    load_s = time.perf_counter() - start
+    backend.encode(QUERIES[:2], batch_size=2)  # calentamiento
+
+    latencies = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        backend.encode([QUERIES[i % len(QUERIES)]], batch_size=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    corpus = backend.encode(texts, batch_size=args.batch_size)
+    batch_s = time.perf_counter() - start
+    queries = backend.encode(QUERIES, batch_size=args.batch_size)
+    np.save(args.embeddings_out, corpus)
+    np.save(args.embeddings_out.replace(".npy", "_queries.npy"), queries)
+
+    return {
+        "backend": args.worker,
+        "model_key": backend.model_key,
+        "load_s": round(load_s, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_model_mb": round(_rss_mb() - rss_before, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "docs_per_s": round(len(texts) / batch_s, 1),
+        "documents": len(texts)
+    }
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, k: int = 5) -> np.ndarray:
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de embeddings")
+    parser.add_argument("--backends", default="sentence_transformers,onnx")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--onnx-path", default=os.getenv("ONNX_MODEL_PATH", "/app/models/onnx"))
+    parser.add_argument("--knowledge-dir", default=os.getenv("KNOWLEDGE_BASE_PATH", "knowledge_base"))
+    parser.add_argument("--queries", type=int, default=200, help="Consultas individuales para la latencia")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--embeddings-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends.split(","):
+            out = os.path.join(tmp, f"{backend}.npy")
+            completed = subprocess.run(
+                [sys.executable, __file__, "--worker", backend, "--embeddings-out", out,
+                 "--model", args.model, "--onnx-path", args.onnx_path, "--knowledge-dir", args.knowledge_dir,
+                 "--queries", str(args.queries), "--batch-size", str(args.batch_size)],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(f"❌ {backend}: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'error'}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            result["corpus"] = np.load(out)
+            result["queries"] = np.load(out.replace(".npy", "_queries.npy"))
+            results.append(result)
+
+    if not results:
+        return
+    reference = results[0]
+    print(f"{'backend':<24}{'carga s':>9}{'RSS MB':>9}{'modelo MB':>11}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'docs/s':>9}{'coseno medio':>14}{'coseno mín':>12}{'top-5':>8}")
+    for result in results:
+        cosine = (result["corpus"] * reference["corpus"]).sum(axis=1)
+        overlap = np.mean([
+            len(set(a) & set(b)) / len(a)
+            for a, b in zip(_top_k(result["queries"], result["corpus"]), _top_k(reference["queries"], reference["corpus"]))
+        ])
+        print(f"{result['backend']:<24}{result['load_s']:>9}{result['rss_mb']:>9}{result['rss_model_mb']:>11}"
+              f"{result['query_p50_ms']:>9}{result['query_p95_ms']:>9}{result['docs_per_s']:>9}"
+              f"{cosine.mean():>14.4f}{cosine.min():>12.4f}{overlap:>8.2f}")
+    print(f"\n{reference['documents']} documentos; coseno y top-5 frente a {reference['backend']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Troceado de documentos largos de la base de conocimiento
+Divide por los encabezados del temario (romanos en mayúsculas "II. FUNDAMENTOS
+DEL VINO" y con letra "A. Componentes Básicos") y, si una sección o el documento
+entero supera el límite, en ventanas de palabras con solapamiento. Cada trozo
+lleva el ID del documento padre y el título de su sección.
+"""
+
+import os
+import re
+from typing import List, Dict, Any, Tuple
+
+# Límite por trozo en palabras: all-MiniLM-L6-v2 trunca a 256 word pieces (~1.5 por palabra en español)
+CHUNK_MAX_WORDS = int(os.getenv("CHUNK_MAX_WORDS", "160"))
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", "30"))
+
+_ROMAN_HEADING = re.compile(r"^([IVXLC]+)\.\s+(\S.*)$")
+_LETTER_HEADING = re.compile(r"^([A-Z])\.\s+(\S.*)$")
+
+
+def _is_roman_heading(line: str) -> bool:
+    match = _ROMAN_HEADING.match(line)
+    # Los capítulos van en mayúsculas; "C. Servicio" o "V. algo" serían apartados con letra
+    return bool(match) and match.group(2) == match.group(2).upper()
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """Secciones (título, cuerpo) según los encabezados romanos y con letra"""
+    sections: List[Tuple[str, List[str]]] = []
+    chapter = ""
+    title = ""
+    lines: List[str] = []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            sections.append((title, body))
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if _is_roman_heading(stripped):
+            flush()
+            chapter = stripped
+            title, lines = chapter, []
+        elif _LETTER_HEADING.match(stripped):
+            flush()
+            title = f"{chapter} > {stripped}" if chapter else stripped
+            lines = []
+        else:
+            lines.append(line.rstrip())
+    flush()
+    return sections
+
+
+def split_windows(text: str, max_words: int = None, overlap: int = None) -> List[str]:
+    """Ventanas de como mucho `max_words` palabras con `overlap` palabras compartidas"""
+    max_words = max_words or CHUNK_MAX_WORDS
+    overlap = min(overlap if overlap is not None else CHUNK_OVERLAP_WORDS, max_words - 1)
+    words = text.split()
+    if len(words) <= max_words:
+        return [text.strip()] if words else []
+    step = max_words - overlap
+    windows = []
+    for start in range(0, len(words), step):
+        windows.append(" ".join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return windows
+
+
+def chunk_document(doc_id: str, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """Trozos {id, content, metadata} de un documento, con parent_id y section"""
+    metadata = metadata or {}
+    pieces: List[Tuple[str, str]] = []
+    sections = split_sections(text)
+    if len(sections) <= 1 and not (sections and sections[0][0]):
+        # Sin encabezados: solo ventanas
+        pieces = [("", window) for window in split_windows(text)]
+    else:
+        for title, body in sections:
+            for window in split_windows(body, max(CHUNK_MAX_WORDS - len(title.split()), CHUNK_OVERLAP_WORDS + 1)):
+                # El título de la sección acompaña al contenido para dar contexto al embedding
+                pieces.append((title, f"{title}\n{window}" if title else window))
+
+    return [
+        {
+            "id": f"{doc_id}#{index}",
+            "content": content,
+            "metadata": {
+                **metadata,
+                "parent_id": doc_id,
+                "section": title,
+                "chunk_index": index,
+                "chunk_count": len(pieces)
+            }
+        }
+        for index, (title, content) in enumerate(pieces)
+    ]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Índice vectorial compacto (VECTOR_DB_TYPE=numpy con COMPACT_VECTOR_DIM > 0)
+Proyecta los embeddings sobre los primeros vectores singulares del corpus
+(PCA sin centrar: conserva los productos escalares mejor que la centrada, y con
+todas las dimensiones es una rotación exacta) y los guarda normalizados en float16: con all-MiniLM-L6-v2 y 128
+dimensiones cada documento pasa de 384 × 4 = 1536 bytes a 128 × 2 = 256 bytes.
+Las consultas se proyectan con la misma PCA; el producto se calcula en float32
+por bloques para no materializar la matriz completa en float32.
+"""
+
+import os
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from vector_index import NumpyVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Dimensiones tras la PCA (0 = índice completo en float32)
+COMPACT_VECTOR_DIM = int(os.getenv("COMPACT_VECTOR_DIM", "0"))
+# Filas por bloque al puntuar en float32
+_SCORE_BLOCK_ROWS = 8192
+
+
+class PCAProjection:
+    """Proyección sobre los componentes principales (sin centrar) de una matriz de embeddings"""
+
+    def __init__(self, components: np.ndarray, explained_variance_ratio: float):
+        self.components = components.astype(np.float32)
+        self.explained_variance_ratio = explained_variance_ratio
+
+    @classmethod
+    def fit(cls, matrix: np.ndarray, dim: int) -> "PCAProjection":
+        """Ajustar con SVD; `dim` se limita al rango disponible"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        dim = max(1, min(dim, matrix.shape[0], matrix.shape[1]))
+        _, singular, vt = np.linalg.svd(matrix, full_matrices=False)
+        energy = singular ** 2
+        ratio = float(energy[:dim].sum() / energy.sum()) if energy.sum() > 0 else 1.0
+        return cls(vt[:dim], ratio)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    def transform(self, matrix: np.ndarray) -> np.ndarray:
+        return np.asarray(matrix, dtype=np.float32) @ self.components.T
+
+
+class CompactVectorIndex(NumpyVectorIndex):
+    """Índice exacto sobre vectores PCA en float16, con la misma API que NumpyVectorIndex"""
+
+    _dtype = np.float16
+
+    def __init__(self, projection: PCAProjection, name: str = "rag_documents", initial_capacity: int = 1024):
+        super().__init__(name, initial_capacity)
+        self.projection = projection
+
+    @classmethod
+    def from_index(cls, index: NumpyVectorIndex, dim: int) -> "CompactVectorIndex":
+        """Ajustar la PCA sobre los embeddings de un índice completo y copiar sus documentos"""
+        embeddings = index.embeddings
+        compact = cls(PCAProjection.fit(embeddings, dim), index.name)
+        if index.count():
+            data = index.get(include=["documents", "metadatas"])
+            compact.add(data["ids"], embeddings, data["documents"], data["metadatas"])
+        logger.info(
+            f"Índice compacto: {embeddings.shape[1]} → {compact.projection.output_dim} dimensiones float16, "
+            f"varianza explicada {compact.projection.explained_variance_ratio:.3f}"
+        )
+        return compact
+
+    def _project(self, embeddings) -> np.ndarray:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape[1] != self.projection.input_dim:
+            raise ValueError(
+                f"Dimensión de embedding {matrix.shape[1]} distinta de la de la PCA {self.projection.input_dim}"
+            )
+        return self._normalize(self.projection.transform(matrix))
+
+    def _prepare_vectors(self, embeddings) -> np.ndarray:
+        return self._project(embeddings).astype(np.float16)
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict[str, Any] = None,
+              include: List[str] = None) -> Dict[str, Any]:
+        """Top-k por coseno en el espacio PCA"""
+        return super().query(self._project(query_embeddings), n_results, where, include)
+
+    def _similarities(self, queries: np.ndarray) -> np.ndarray:
+        matrix = self.embeddings
+        similarities = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), _SCORE_BLOCK_ROWS):
+            block = matrix[start:start + _SCORE_BLOCK_ROWS].astype(np.float32)
+            similarities[:, start:start + len(block)] = queries @ block.T
+        return similarities
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Bytes por documento de la matriz compacta frente a la float32 completa"""
+        full = self.projection.input_dim * np.dtype(np.float32).itemsize
+        compact = self.projection.output_dim * np.dtype(self._dtype).itemsize
+        return {
+            "dim": self.projection.output_dim,
+            "full_dim": self.projection.input_dim,
+            "bytes_per_document": compact,
+            "full_bytes_per_document": full,
+            "reduction": round(full / compact, 2),
+            "explained_variance": round(self.projection.explained_variance_ratio, 4),
+            "matrix_mb": round(self.count() * compact / 1e6, 3)
+        }
+
+
+def compact_index(index: NumpyVectorIndex, dim: Optional[int] = None) -> NumpyVectorIndex:
+    """Versión compacta de un índice completo si COMPACT_VECTOR_DIM está activo y el corpus no está vacío"""
+    dim = COMPACT_VECTOR_DIM if dim is None else dim
+    if dim <= 0 or isinstance(index, CompactVectorIndex) or not index.count():
+        return index
+    return CompactVectorIndex.from_index(index, dim)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Empaquetado del contexto de los prompts con presupuesto de tokens
+Las fuentes se añaden en el orden de la recuperación (de más a menos relevante)
+mientras quepan en CONTEXT_TOKEN_BUDGET; los vinos se escriben en una línea
+compacta en lugar del documento con etiquetas, y el contexto de la conversación
+como JSON sin indentación. Los tokens se estiman por longitud (sin tokenizador):
+la cifra exacta la informa el LLM en /metrics.
+"""
+
+import os
+import re
+import json
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from wine_index import is_wine, wine_fields
+
+# Tokens de contexto (fuentes) por prompt: caben las 5 fuentes por defecto aunque sean los
+# trozos de texto más largos de la base de conocimiento (~135 tokens; un vino ~47)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "700"))
+# Caracteres por token en texto español con tokenizadores BPE (estimación conservadora)
+CHARS_PER_TOKEN = 4
+
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens aproximados de un texto"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def render_wine(wine: Dict[str, Any]) -> str:
+    """Vino en una línea: nombre | tipo | región añada | precio | puntuación | maridaje | descripción"""
+    origin = " ".join(str(value) for value in (wine.get("region"), wine.get("vintage")) if value)
+    parts = [
+        wine.get("name"),
+        wine.get("wine_type"),
+        origin,
+        f"{wine['price']:g}€" if wine.get("price") is not None else None,
+        f"{wine['rating']:g}/100" if wine.get("rating") is not None else None,
+        wine.get("pairing"),
+        wine.get("description"),
+    ]
+    return " | ".join(str(part) for part in parts if part)
+
+
+def render_source(source: Dict[str, Any]) -> str:
+    """Texto de una fuente para el prompt: línea compacta si es un vino, texto sin espacios redundantes si no"""
+    metadata = source.get("metadata") or {}
+    if is_wine(metadata):
+        return render_wine(wine_fields(metadata, source.get("content", "")))
+    text = _SPACES_RE.sub(" ", source.get("content", ""))
+    return _BLANK_LINES_RE.sub("\n", "\n".join(line.strip() for line in text.splitlines())).strip()
+
+
+def compact_context(context: Optional[Dict[str, Any]]) -> str:
+    """Contexto de la conversación como JSON sin indentación ni espacios ("" si está vacío)"""
+    if not context:
+        return ""
+    return json.dumps(context, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+@dataclass
+class PackedContext:
+    """Fuentes que caben en el presupuesto, ya numeradas para citarlas"""
+    text: str
+    tokens: int
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    dropped: int = 0
+
+
+def pack_sources(sources: List[Dict[str, Any]], budget: Optional[int] = None) -> PackedContext:
+    """Llenar el presupuesto de forma voraz en orden de relevancia; una fuente que no cabe se salta
+    (las siguientes, más cortas, pueden caber). Si ni la primera cabe, se recorta."""
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    lines: List[str] = []
+    included: List[Dict[str, Any]] = []
+    used = 0
+    for source in sources:
+        line = f"[{len(included) + 1}] {render_source(source)}"
+        cost = estimate_tokens(line) + 1  # salto de línea
+        if used + cost > budget:
+            if included or budget <= 1:
+                continue
+            line = line[:(budget - 1) * CHARS_PER_TOKEN]
+            cost = estimate_tokens(line) + 1
+        lines.append(line)
+        included.append(source)
+        used += cost
+    return PackedContext("\n".join(lines), used, included, len(sources) - len(included))
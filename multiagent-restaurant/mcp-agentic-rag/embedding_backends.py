@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Backends de embeddings del servidor RAG
+- sentence_transformers: el modelo PyTorch original.
+- onnx: el mismo transformer exportado a ONNX y cuantizado dinámicamente a
+  int8, ejecutado con ONNX Runtime en CPU. Usa el tokenizer.json del modelo
+  original (mismos IDs de tokens) y reproduce el pooling y la normalización
+  del pipeline de sentence-transformers.
+
+Se elige con EMBEDDING_BACKEND. El modelo ONNX se exporta una vez (con PyTorch
+disponible) y en ejecución solo necesita onnxruntime y tokenizers:
+    python embedding_backends.py export --model all-MiniLM-L6-v2 --output data/onnx
+"""
+
+import os
+import json
+import time
+import inspect
+import logging
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence_transformers")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "/app/models/onnx")
+# Hilos de ONNX Runtime por sesión (0 = los que decida ONNX Runtime)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+BACKENDS = ("sentence_transformers", "onnx")
+ONNX_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+BACKEND_CONFIG_FILE = "backend.json"
+
+
+def embedding_model_key(backend: str, model_name: str) -> str:
+    """Clave del modelo para cachés y artefactos: los vectores int8 no son intercambiables con los float32"""
+    return model_name if backend == "sentence_transformers" else f"{model_name}:onnx-int8"
+
+
+def mean_pooling(token_embeddings: np.ndarray, attention_mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """Media de los embeddings de token sin padding y, opcionalmente, normalización L2"""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    if normalize:
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled.astype(np.float32)
+
+
+class EmbeddingBackend:
+    """Interfaz común: encode de un lote de textos a una matriz float32"""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def model_key(self) -> str:
+        return embedding_model_key(self.name, self.model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Modelo sentence-transformers sobre PyTorch"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=False).astype(np.float32)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """Transformer cuantizado int8 en ONNX Runtime con el tokenizer del modelo original"""
+
+    name = "onnx"
+
+    def __init__(self, model_dir: Path, threads: int = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        with open(model_dir / BACKEND_CONFIG_FILE, "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        super().__init__(self.config["model"])
+        self.normalize = self.config.get("normalize", True)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = ort.SessionOptions()
+        threads = ONNX_THREADS if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_dir / ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.config["dim"]), dtype=np.float32)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feed = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                "attention_mask": attention_mask,
+                "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            }
+            token_embeddings = self.session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+            batches.append(mean_pooling(token_embeddings, attention_mask, self.normalize))
+        return np.vstack(batches)
+
+
+def create_embedding_backend(backend: str = None, model_name: str = None,
+                             onnx_model_path: str = None) -> EmbeddingBackend:
+    """Backend configurado por EMBEDDING_BACKEND"""
+    backend = backend or EMBEDDING_BACKEND
+    model_name = model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    if backend == "sentence_transformers":
+        return SentenceTransformerBackend(model_name)
+    if backend == "onnx":
+        instance = OnnxBackend(Path(onnx_model_path or ONNX_MODEL_PATH))
+        if instance.model_name != model_name:
+            logger.warning(f"El modelo ONNX se exportó desde {instance.model_name}, no desde {model_name}")
+        return instance
+    raise ValueError(f"Backend de embeddings desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+
+def _is_mean_pooling(config: Dict[str, Any]) -> bool:
+    """Pooling por media según la configuración del módulo (formato antiguo y nuevo de sentence-transformers)"""
+    if "pooling_mode" in config:
+        return config["pooling_mode"] == "mean"
+    others = ("pooling_mode_cls_token", "pooling_mode_max_tokens", "pooling_mode_mean_sqrt_len_tokens",
+              "pooling_mode_weightedmean_tokens", "pooling_mode_lasttoken")
+    return bool(config.get("pooling_mode_mean_tokens")) and not any(config.get(key) for key in others)
+
+
+def export_onnx_model(model_name: str, output_dir: Path, opset: int = 14) -> Dict[str, Any]:
+    """Exportar el transformer de un modelo sentence-transformers a ONNX y cuantizarlo a int8"""
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    modules = {type(module).__name__: module for module in model}
+    transformer = modules.get("Transformer")
+    pooling = modules.get("Pooling")
+    if transformer is None or pooling is None or not _is_mean_pooling(pooling.get_config_dict()):
+        raise ValueError(f"{model_name} no es transformer + mean pooling; el backend ONNX no lo reproduce")
+    normalize = "Normalize" in modules
+
+    class _TokenEmbeddings(torch.nn.Module):
+        """Solo last_hidden_state: el pooling se hace en NumPy"""
+
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.auto_model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = model.tokenizer
+    sample = tokenizer(["Vino tinto de Rioja con crianza en barrica"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    if "token_type_ids" not in sample:
+        sample["token_type_ids"] = torch.zeros_like(sample["input_ids"])
+
+    float_path = output_dir / "model.onnx"
+    wrapper = _TokenEmbeddings(transformer.auto_model).eval()
+    # Exportador TorchScript: las versiones recientes usan dynamo por defecto y torch < 2 no tiene el argumento
+    export_options = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_options["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(sample[name] for name in input_names),
+            str(float_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **export_options
+        )
+    quantize_dynamic(str(float_path), str(output_dir / ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    float_path.unlink()
+
+    # Mismo tokenizer que el backend PyTorch
+    tokenizer.backend_tokenizer.save(str(output_dir / TOKENIZER_FILE))
+    config = {
+        "model": model_name,
+        "dim": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "normalize": normalize,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    with open(output_dir / BACKEND_CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+def main():
+    """CLI para exportar el modelo ONNX cuantizado"""
+    parser = argparse.ArgumentParser(description="Backends de embeddings del servidor RAG")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Exportar el modelo a ONNX int8")
+    export.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    export.add_argument("--output", default=ONNX_MODEL_PATH)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    config = export_onnx_model(args.model, Path(args.output))
+    size_mb = (Path(args.output) / ONNX_MODEL_FILE).stat().st_size / 1e6
+    print(f"✅ {config['model']} → {args.output}/{ONNX_MODEL_FILE} ({size_mb:.1f} MB, dim {config['dim']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de embeddings para el servidor RAG
+Direccionada por contenido: la clave es (modelo, SHA-256 del texto), así que
+solo los documentos nuevos o modificados llegan al modelo de embeddings.
+Usa SQLite para persistencia local sin dependencias externas. Pensada para los
+documentos de la base de conocimiento: las consultas no se guardan aquí (la
+caché semántica cubre las repetidas) para que no expulsen vectores de documentos.
+Los aciertos actualizan last_used en memoria y se escriben por lotes.
+"""
+
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Límite de variables por sentencia en SQLite
+_SQLITE_MAX_VARIABLES = 500
+# Accesos (last_used) pendientes antes de escribirlos en disco
+_TOUCH_FLUSH_SIZE = 256
+
+
+class EmbeddingCache:
+    """Caché de embeddings en disco con contadores de aciertos y límite de tamaño"""
+
+    def __init__(self, db_path: str = None, max_entries: int = None):
+        if db_path is None:
+            db_path = os.getenv("EMBEDDING_CACHE_PATH", "/app/data/embedding_cache.db")
+        if max_entries is None:
+            max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # La caché se usa desde el event loop y desde hilos de trabajo
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._entries = 0
+        self._init_database()
+
+    def _init_database(self):
+        """Inicializar base de datos SQLite"""
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Con WAL, NORMAL no sincroniza en cada commit; una caída solo pierde entradas recalculables
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,  -- float32
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, content_hash)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            self._conn.commit()
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Caché de embeddings inicializada en {self.db_path} ({self._entries} entradas)")
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """SHA-256 del contenido"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Recuperar embeddings cacheados; None para cada texto no encontrado"""
+        hashes = [self.content_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique_hashes), _SQLITE_MAX_VARIABLES):
+                chunk = unique_hashes[start:start + _SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                for content_hash, vector in rows:
+                    found[content_hash] = np.frombuffer(vector, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                for content_hash in found:
+                    self._touched[(model, content_hash)] = now
+                if len(self._touched) >= _TOUCH_FLUSH_SIZE:
+                    self._flush_touched()
+                    self._conn.commit()
+
+            results = [found.get(content_hash) for content_hash in hashes]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors) -> None:
+        """Guardar embeddings y aplicar el límite de tamaño"""
+        now = time.time()
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            content_hash = self.content_hash(text)
+            rows[content_hash] = (model, content_hash, vector.shape[0], vector.tobytes(), now)
+
+        with self._lock:
+            existing = self._existing_hashes(model, list(rows))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, content_hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                list(rows.values())
+            )
+            self._entries += len(rows) - len(existing)
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _existing_hashes(self, model: str, hashes: List[str]) -> Set[str]:
+        """Hashes ya presentes (para mantener el contador de entradas sin COUNT(*))"""
+        existing = set()
+        for start in range(0, len(hashes), _SQLITE_MAX_VARIABLES):
+            chunk = hashes[start:start + _SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT content_hash FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                [model, *chunk]
+            ).fetchall()
+            existing.update(content_hash for (content_hash,) in rows)
+        return existing
+
+    def _flush_touched(self):
+        """Escribir los last_used pendientes (sin commit)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND content_hash = ?",
+                [(last_used, model, content_hash) for (model, content_hash), last_used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        """Eliminar las entradas menos usadas recientemente por encima del límite"""
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._entries -= overflow
+            self.evictions += overflow
+            logger.info(f"Caché de embeddings: {overflow} entradas expulsadas")
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "path": str(self.db_path)
+        }
+
+    def close(self):
+        """Cerrar la conexión SQLite"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Ejecutor de embeddings con micro-batching dinámico
+Agrupa las peticiones concurrentes de un solo texto en un lote dentro de una
+ventana de pocos milisegundos y ejecuta el modelo en hilos de trabajo, de modo
+que el event loop de uvicorn nunca queda bloqueado por un encode.
+Las consultas pueden usar una función de encode distinta a la de los documentos
+(query_encode_fn), p. ej. sin la caché persistente de embeddings.
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+class EmbeddingExecutor:
+    """Ejecutor de embeddings fuera del event loop con micro-batching"""
+
+    def __init__(self, encode_fn: EncodeFn, max_batch_size: int = None,
+                 max_wait_ms: float = None, workers: int = None, query_encode_fn: Optional[EncodeFn] = None):
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+        if workers is None:
+            workers = int(os.getenv("EMBEDDING_WORKERS", "1"))
+
+        self.encode_fn = encode_fn
+        self.query_encode_fn = query_encode_fn or encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.workers = max(1, workers)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_observed_batch = 0
+
+    def _ensure_dispatcher(self):
+        """Arrancar el despachador en el event loop actual"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embedding de una consulta, agrupada con otras peticiones concurrentes"""
+        self._ensure_dispatcher()
+        future = self._loop.create_future()
+        self.requests += 1
+        await self._queue.put((text, future))
+        return await future
+
+    async def embed_many(self, texts: List[str], queries: bool = False) -> np.ndarray:
+        """Embedding de un lote ya formado (de documentos o de consultas), ejecutado directamente en el pool"""
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.batched_texts += len(texts)
+        self.max_observed_batch = max(self.max_observed_batch, len(texts))
+        encode_fn = self.query_encode_fn if queries else self.encode_fn
+        return await loop.run_in_executor(self._pool, encode_fn, texts)
+
+    async def _dispatch_loop(self):
+        """Recoger peticiones hasta llenar el lote o agotar la ventana de espera"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Limitar los lotes en vuelo al número de hilos de trabajo
+            await self._slots.acquire()
+            self._loop.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Ejecutar un lote en el pool y resolver el future de cada llamante"""
+        try:
+            texts = [text for text, _ in batch]
+            vectors = await self.embed_many(texts, queries=True)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            logger.error(f"Error calculando lote de embeddings: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del micro-batching"""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_observed": self.max_observed_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "workers": self.workers
+        }
+
+    async def close(self):
+        """Detener el despachador y el pool de hilos"""
+        if self._dispatcher and not self._dispatcher.done():
+            self._dispatcher.cancel()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Expansión de consultas adaptativa
+La consulta original se busca primero; la expansión (tesauro y/o LLM) solo se
+lanza si el mejor resultado vectorial no es concluyente: relevancia por debajo
+de EXPANSION_MIN_SCORE o margen con el segundo por debajo de EXPANSION_MIN_MARGIN.
+Con un presupuesto de latencia, tampoco se expande si el tiempo restante es menor
+que lo que tarda una expansión (media móvil de las observadas).
+
+Para ajustar los umbrales se cuenta el recall@k de la búsqueda sin expandir
+respecto a la expandida: en las consultas expandidas, y en una muestra de las
+que no se expandieron (EXPANSION_SHADOW_RATE), que se expanden en segundo plano
+solo para medir.
+"""
+
+import os
+import random
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class ExpansionGate:
+    """Decisión de expandir según la confianza de la búsqueda original y el tiempo restante"""
+
+    # Peso de la última observación en la media móvil de latencia de expansión
+    _LATENCY_ALPHA = 0.2
+
+    def __init__(self, enabled: bool = None, min_score: float = None, min_margin: float = None,
+                 reserve_ms: float = None, shadow_rate: float = None):
+        if enabled is None:
+            enabled = os.getenv("ADAPTIVE_EXPANSION", "true").lower() == "true"
+        if min_score is None:
+            min_score = float(os.getenv("EXPANSION_MIN_SCORE", "0.6"))
+        if min_margin is None:
+            min_margin = float(os.getenv("EXPANSION_MIN_MARGIN", "0.05"))
+        if reserve_ms is None:
+            reserve_ms = float(os.getenv("EXPANSION_RESERVE_MS", "1500"))
+        if shadow_rate is None:
+            shadow_rate = float(os.getenv("EXPANSION_SHADOW_RATE", "0"))
+
+        self.enabled = enabled
+        self.min_score = min_score
+        self.min_margin = min_margin
+        # Tiempo que se supone a una expansión hasta haber medido alguna
+        self.reserve_ms = reserve_ms
+        self.shadow_rate = shadow_rate
+
+        self.decisions = 0
+        self.reasons: Counter = Counter()
+        self._latency_ms: Optional[float] = None
+        # población -> [suma de recall, muestras]
+        self._recall = {"expanded": [0.0, 0], "skipped": [0.0, 0]}
+
+    @property
+    def expected_latency_ms(self) -> float:
+        return self._latency_ms if self._latency_ms is not None else self.reserve_ms
+
+    def decide(self, scores: List[float], remaining_ms: Optional[float] = None) -> Tuple[bool, str]:
+        """(expandir, motivo) a partir de las relevancias vectoriales ordenadas de la consulta original"""
+        self.decisions += 1
+        if remaining_ms is not None and remaining_ms < self.expected_latency_ms:
+            expand, reason = False, "budget"
+        elif not scores or scores[0] < self.min_score:
+            expand, reason = True, "low_score"
+        elif len(scores) > 1 and scores[0] - scores[1] < self.min_margin:
+            expand, reason = True, "low_margin"
+        else:
+            expand, reason = False, "confident"
+        self.reasons[reason] += 1
+        return expand, reason
+
+    def should_shadow(self) -> bool:
+        """Muestrear una consulta no expandida para medir lo que habría aportado la expansión"""
+        return self.shadow_rate > 0 and random.random() < self.shadow_rate
+
+    def observe_latency(self, latency_ms: float):
+        if self._latency_ms is None:
+            self._latency_ms = latency_ms
+        else:
+            self._latency_ms += self._LATENCY_ALPHA * (latency_ms - self._latency_ms)
+
+    def record_recall(self, original_ids: List[str], expanded_ids: List[str], expanded: bool = True):
+        """Recall@k de la búsqueda sin expandir respecto a la expandida (expanded=False: muestra en sombra)"""
+        if not expanded_ids:
+            return
+        recall = len(set(original_ids) & set(expanded_ids)) / len(expanded_ids)
+        bucket = self._recall["expanded" if expanded else "skipped"]
+        bucket[0] += recall
+        bucket[1] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Tasa de expansión, motivos y recall sin expansión por población"""
+        expanded = self.reasons["low_score"] + self.reasons["low_margin"]
+        return {
+            "enabled": self.enabled,
+            "min_score": self.min_score,
+            "min_margin": self.min_margin,
+            "decisions": self.decisions,
+            "expanded": expanded,
+            "expansion_rate": round(expanded / self.decisions, 4) if self.decisions else 0.0,
+            "reasons": dict(self.reasons),
+            "expected_expansion_ms": round(self.expected_latency_ms, 1),
+            "recall_without_expansion": {
+                population: {"mean": round(total / samples, 4) if samples else None, "samples": samples}
+                for population, (total, samples) in self._recall.items()
+            }
+        }
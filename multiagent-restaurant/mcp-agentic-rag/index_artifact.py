@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Artefacto de índice precalculado para el servidor RAG
+Construye desde knowledge_base/ un directorio versionado con:
+  - embeddings.npy  matriz float32 de embeddings normalizados
+  - records.json    IDs, contenidos y metadatos compactos
+  - manifest.json   modelo, dimensión, huellas de archivos y hashes de contenido
+El servidor lo abre con numpy.memmap al arrancar: varios workers de uvicorn en
+la misma máquina comparten la misma copia en la page cache y el arranque no
+necesita calcular embeddings.
+
+Uso:
+    python index_artifact.py build --knowledge-dir knowledge_base --output data/index
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+import numpy as np
+
+from embedding_backends import BACKENDS, EMBEDDING_BACKEND, create_embedding_backend
+from knowledge_loader import SCHEMA_VERSION, load_knowledge_documents, source_fingerprints
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.json"
+MANIFEST_FILE = "manifest.json"
+
+
+class IndexArtifact:
+    """Artefacto abierto: manifiesto, embeddings mapeados en memoria y registros"""
+
+    def __init__(self, path: Path, manifest: Dict[str, Any], embeddings: np.ndarray,
+                 ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        self.path = path
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+
+    def is_current(self, knowledge_dir: Path, model_name: str) -> bool:
+        """El artefacto corresponde al modelo, al esquema de documentos y a los archivos actuales"""
+        if self.manifest.get("model") != model_name:
+            return False
+        if self.manifest.get("schema_version") != SCHEMA_VERSION:
+            return False
+        if not knowledge_dir.exists():
+            return True
+        return self.manifest.get("sources") == source_fingerprints(knowledge_dir)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 del contenido de un documento"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_index_artifact(knowledge_dir: Path, output_dir: Path, model_name: str,
+                         encode_fn: Callable[[List[str]], np.ndarray]) -> Dict[str, Any]:
+    """Construir el artefacto y reemplazar el anterior de forma atómica"""
+    documents = load_knowledge_documents(knowledge_dir)
+    if not documents:
+        raise ValueError(f"No hay documentos en {knowledge_dir}")
+
+    contents = [doc["content"] for doc in documents]
+    embeddings = np.asarray(encode_fn(contents), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings = np.ascontiguousarray(embeddings / norms)
+
+    document_hashes = {doc["id"]: content_hash(doc["content"]) for doc in documents}
+    version = hashlib.sha256(
+        json.dumps([model_name, sorted(document_hashes.items())]).encode("utf-8")
+    ).hexdigest()[:16]
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "schema_version": SCHEMA_VERSION,
+        "version": version,
+        "model": model_name,
+        "dim": int(embeddings.shape[1]),
+        "count": len(documents),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sources": source_fingerprints(knowledge_dir),
+        "documents": document_hashes
+    }
+
+    staging = output_dir.with_name(output_dir.name + ".tmp")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    np.save(staging / EMBEDDINGS_FILE, embeddings)
+    with open(staging / RECORDS_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "ids": [doc["id"] for doc in documents],
+            "documents": contents,
+            "metadatas": [doc["metadata"] for doc in documents]
+        }, f, ensure_ascii=False, separators=(",", ":"))
+    with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    staging.rename(output_dir)
+
+    logger.info(f"Artefacto de índice {version} construido en {output_dir}: {len(documents)} documentos")
+    return manifest
+
+
+def load_index_artifact(path: Path) -> Optional[IndexArtifact]:
+    """Abrir el artefacto con los embeddings mapeados en memoria (solo lectura)"""
+    manifest_path = path / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        logger.warning(f"Formato de artefacto no soportado en {path}: {manifest.get('format_version')}")
+        return None
+
+    embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode="r")
+    with open(path / RECORDS_FILE, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    return IndexArtifact(
+        path=path,
+        manifest=manifest,
+        embeddings=embeddings,
+        ids=records["ids"],
+        documents=records["documents"],
+        metadatas=records["metadatas"]
+    )
+
+
+def main():
+    """CLI para construir el artefacto de índice"""
+    parser = argparse.ArgumentParser(description="Artefacto de índice precalculado del servidor RAG")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Construir el artefacto desde knowledge_base/")
+    build.add_argument("--knowledge-dir", default=os.getenv("KNOWLEDGE_BASE_PATH", "knowledge_base"))
+    build.add_argument("--output", default=os.getenv("INDEX_ARTIFACT_PATH", "data/index"))
+    build.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    build.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+    build.add_argument("--backend", choices=BACKENDS, default=EMBEDDING_BACKEND)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    backend = create_embedding_backend(args.backend, args.model)
+    manifest = build_index_artifact(
+        Path(args.knowledge_dir),
+        Path(args.output),
+        backend.model_key,
+        lambda texts: backend.encode(texts, batch_size=args.batch_size)
+    )
+    print(f"✅ Artefacto {manifest['version']}: {manifest['count']} documentos, dim {manifest['dim']} → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Catálogo columnar del inventario de vinos
+Columnas NumPy para precio, stock, añada y puntuación más códigos categóricos
+de región y tipo. Cada estadística es una máscara booleana y una reducción
+vectorizada, sin recorrer los documentos en Python.
+"""
+
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from text_utils import fold_accents
+from wine_index import is_wine, wine_fields
+
+logger = logging.getLogger(__name__)
+
+ALL_STATISTICS = ("stock_total", "valor_total", "precio_promedio", "por_region", "por_tipo", "por_añada")
+
+
+class _Categories:
+    """Codificación de valores categóricos (comparación sin acentos ni mayúsculas)"""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        key = fold_accents(str(value)).strip()
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.labels)
+            self._codes[key] = code
+            self.labels.append(str(value))
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._codes.get(fold_accents(value).strip())
+
+
+class InventoryCatalog:
+    """Inventario en columnas NumPy con filtros y agregados vectorizados"""
+
+    _NUMERIC = ("price", "stock", "vintage", "rating")
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._initial_capacity = initial_capacity
+        self._size = 0
+        self.version = 0
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self.regions = _Categories()
+        self.types = _Categories()
+        self._allocate(initial_capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _allocate(self, capacity: int):
+        """Reservar (o ampliar) las columnas conservando las filas existentes"""
+        columns = {field: np.full(capacity, np.nan) for field in self._NUMERIC}
+        # Stock sin dato cuenta como 0; valor = precio × stock precalculado por fila
+        columns["stock"] = np.zeros(capacity)
+        columns["value"] = np.zeros(capacity)
+        columns["region"] = np.full(capacity, -1, dtype=np.intp)
+        columns["type"] = np.full(capacity, -1, dtype=np.intp)
+        for field, column in self._columns.items():
+            columns[field][:self._size] = column[:self._size]
+        self._columns = columns
+
+    @property
+    def ids(self) -> List[str]:
+        """IDs de documento por fila"""
+        return self._ids
+
+    def column(self, field: str) -> np.ndarray:
+        """Vista de una columna (price, stock, vintage, rating, region, type)"""
+        return self._columns[field][:self._size]
+
+    def newest_vintage(self) -> Optional[int]:
+        """Añada más reciente del catálogo: referencia de edad de los vinos (None si no hay añadas)"""
+        vintages = self.column("vintage")
+        return int(np.nanmax(vintages)) if np.isfinite(vintages).any() else None
+
+    # === Escritura ===
+
+    def add(self, ids: List[str], metadatas: List[Optional[Dict[str, Any]]], contents: List[str] = None):
+        """Agregar o actualizar los vinos de un lote de documentos"""
+        contents = contents or [""] * len(ids)
+        for doc_id, metadata, content in zip(ids, metadatas, contents):
+            metadata = metadata or {}
+            if not is_wine(metadata):
+                if doc_id in self._rows:
+                    self.remove([doc_id])
+                continue
+
+            wine = wine_fields(metadata, content)
+            row = self._rows.get(doc_id)
+            if row is None:
+                if self._size == len(self._columns["price"]):
+                    self._allocate(max(self._initial_capacity, self._size * 2))
+                row = self._size
+                self._size += 1
+                self._rows[doc_id] = row
+                self._ids.append(doc_id)
+                self._names.append(wine["name"])
+            else:
+                self._names[row] = wine["name"]
+
+            for field in self._NUMERIC:
+                value = wine.get(field)
+                self._columns[field][row] = value if isinstance(value, (int, float)) else np.nan
+            if np.isnan(self._columns["stock"][row]):
+                self._columns["stock"][row] = 0.0
+            price = self._columns["price"][row]
+            self._columns["value"][row] = 0.0 if np.isnan(price) else price * self._columns["stock"][row]
+            self._columns["region"][row] = self.regions.encode(wine.get("region"))
+            self._columns["type"][row] = self.types.encode(wine.get("wine_type"))
+        self.version += 1
+
+    def remove(self, ids: List[str]):
+        """Eliminar vinos moviendo la última fila al hueco"""
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                for column in self._columns.values():
+                    column[row] = column[last]
+                self._ids[row] = self._ids[last]
+                self._names[row] = self._names[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._names.pop()
+            self._size -= 1
+        self.version += 1
+
+    def clear(self):
+        """Vaciar el catálogo"""
+        version = self.version
+        self.__init__(self._initial_capacity)
+        self.version = version + 1
+
+    # === Consultas ===
+
+    def mask(self, tipo: str = None, region: str = None, precio_min: float = None,
+             precio_max: float = None, puntuacion_min: float = None, puntuacion_max: float = None,
+             anada_min: int = None, anada_max: int = None) -> np.ndarray:
+        """Máscara booleana de los vinos que cumplen los filtros (sin dato numérico no cumple un rango)"""
+        mask = np.ones(self._size, dtype=bool)
+        if tipo:
+            code = self.types.lookup(tipo)
+            mask &= self.column("type") == (code if code is not None else -2)
+        if region:
+            code = self.regions.lookup(region)
+            mask &= self.column("region") == (code if code is not None else -2)
+        with np.errstate(invalid="ignore"):
+            if precio_min is not None:
+                mask &= self.column("price") >= precio_min
+            if precio_max is not None:
+                mask &= self.column("price") <= precio_max
+            if puntuacion_min is not None:
+                mask &= self.column("rating") >= puntuacion_min
+            if puntuacion_max is not None:
+                mask &= self.column("rating") <= puntuacion_max
+            if anada_min is not None:
+                mask &= self.column("vintage") >= anada_min
+            if anada_max is not None:
+                mask &= self.column("vintage") <= anada_max
+        return mask
+
+    def top_rated(self, mask: np.ndarray, k: int) -> List[str]:
+        """IDs de los k vinos de la máscara con mejor puntuación (a igualdad, más baratos primero)"""
+        rows = np.flatnonzero(mask)
+        if not rows.size:
+            return []
+        # Sin puntuación o sin precio van al final de su criterio
+        rating = np.nan_to_num(self.column("rating")[rows], nan=-np.inf)
+        price = np.nan_to_num(self.column("price")[rows], nan=np.inf)
+        order = np.lexsort((price, -rating))[:k]
+        return [self._ids[row] for row in rows[order]]
+
+    def _grouped(self, codes: np.ndarray, labels: List[str], stock: np.ndarray,
+                 value: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """Conteo, stock y valor por código categórico (el código -1, sin dato, se descarta)"""
+        shifted = codes + 1
+        size = len(labels) + 1
+        counts = np.bincount(shifted, minlength=size)
+        stocks = np.bincount(shifted, weights=stock, minlength=size)
+        values = np.bincount(shifted, weights=value, minlength=size)
+        return {
+            labels[bucket - 1]: {
+                "vinos": int(counts[bucket]),
+                "stock": int(stocks[bucket]),
+                "valor": round(float(values[bucket]), 2)
+            }
+            for bucket in np.flatnonzero(counts[1:]) + 1
+        }
+
+    def stats(self, tipo: str = None, region: str = None, precio_min: float = None,
+              precio_max: float = None, include: List[str] = None) -> Dict[str, Any]:
+        """Estadísticas del inventario filtrado"""
+        include = include or list(ALL_STATISTICS)
+        if any(value is not None for value in (tipo, region, precio_min, precio_max)):
+            rows = np.flatnonzero(self.mask(tipo, region, precio_min, precio_max))
+        else:
+            rows = slice(None)  # Sin filtros: vistas de las columnas, sin copiar
+        price = self.column("price")[rows]
+        stock = self.column("stock")[rows]
+        value = self.column("value")[rows]
+
+        result: Dict[str, Any] = {"vinos": int(price.size)}
+        if "stock_total" in include:
+            result["stock_total"] = int(stock.sum())
+        if "valor_total" in include:
+            result["valor_total"] = round(float(value.sum()), 2)
+        if "precio_promedio" in include:
+            priced = int(np.count_nonzero(~np.isnan(price)))
+            result["precio_promedio"] = round(float(np.nansum(price)) / priced, 2) if priced else None
+        if "por_region" in include:
+            result["por_region"] = self._grouped(self.column("region")[rows], self.regions.labels, stock, value)
+        if "por_tipo" in include:
+            result["por_tipo"] = self._grouped(self.column("type")[rows], self.types.labels, stock, value)
+        if "por_añada" in include:
+            vintages = self.column("vintage")[rows]
+            known = ~np.isnan(vintages)
+            years = vintages[known].astype(np.int64)
+            first = int(years.min()) if years.size else 0
+            labels = [str(year) for year in range(first, int(years.max()) + 1)] if years.size else []
+            result["por_añada"] = self._grouped(years - first, labels, stock[known], value[known])
+        return result
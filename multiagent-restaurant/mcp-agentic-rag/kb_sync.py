@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Sincronización incremental de la base de conocimiento
+Un manifiesto JSON guarda el hash (contenido + metadatos) de cada documento
+cargado desde knowledge_base/. Al arrancar se compara con los documentos
+actuales y solo se escriben los nuevos o modificados y se borran los que ya
+no existen, en lugar de volver a insertar todo el catálogo.
+
+Sin manifiesto (primera sincronización sobre una colección persistente) también
+se borran las copias de cargas anteriores: documentos cuyo `source` es un
+archivo de knowledge_base/ pero con otro ID (vino_{i}_{Nombre}, el .txt
+completo sin trocear) y los vinos subidos con load-wines.py (doc_type "wine")
+que la sincronización vuelve a escribir (mismo nombre y añada); los demás vinos
+subidos por la API se conservan. El manifiesto debe estar en un volumen
+persistente: sin él cada arranque es una primera sincronización.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from text_utils import fold_accents
+
+logger = logging.getLogger(__name__)
+
+KB_SYNC_MANIFEST_PATH = os.getenv("KB_SYNC_MANIFEST_PATH", "/app/data/kb_sync_manifest.json")
+# doc_type de los vinos que load-wines.py sube por la API (copias de vinos.json)
+LEGACY_WINE_DOC_TYPE = "wine"
+
+
+def document_hash(document: Dict[str, Any]) -> str:
+    """SHA-256 del contenido y los metadatos de un documento"""
+    payload = json.dumps(
+        {"content": document["content"], "metadata": document.get("metadata") or {}},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SyncPlan:
+    """Cambios necesarios para alinear la colección con knowledge_base/"""
+    added: List[Dict[str, Any]] = field(default_factory=list)
+    updated: List[Dict[str, Any]] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    manifest: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def upserts(self) -> List[Dict[str, Any]]:
+        return self.added + self.updated
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "updated": len(self.updated),
+            "deleted": len(self.deleted),
+            "unchanged": self.unchanged
+        }
+
+
+def plan_sync(documents: List[Dict[str, Any]], manifest: Dict[str, str]) -> SyncPlan:
+    """Comparar los documentos actuales con el manifiesto de la última sincronización"""
+    plan = SyncPlan()
+    for document in documents:
+        digest = document_hash(document)
+        plan.manifest[document["id"]] = digest
+        previous = manifest.get(document["id"])
+        if previous is None:
+            plan.added.append(document)
+        elif previous != digest:
+            plan.updated.append(document)
+        else:
+            plan.unchanged += 1
+    plan.deleted = [doc_id for doc_id in manifest if doc_id not in plan.manifest]
+    return plan
+
+
+def wine_key(metadata: Optional[Dict[str, Any]]) -> Optional[Tuple[str, Any]]:
+    """(nombre sin acentos, añada) de un vino: la misma botella con otro ID o formato de metadatos"""
+    name = (metadata or {}).get("name")
+    return (fold_accents(str(name)).strip(), metadata.get("vintage")) if name else None
+
+
+def stale_documents(ids: List[str], metadatas: List[Optional[Dict[str, Any]]], manifest: Dict[str, str],
+                    sources: Set[str], replacements: Set[Tuple[str, Any]]) -> List[str]:
+    """IDs de la colección que son copias de knowledge_base/ de cargas anteriores: fuera del
+    manifiesto actual y con `source` de uno de sus archivos, o subidos con load-wines.py y con
+    un vino equivalente en `replacements` (wine_key de los documentos que se escriben)"""
+    stale = []
+    for doc_id, metadata in zip(ids, metadatas):
+        metadata = metadata or {}
+        if doc_id in manifest:
+            continue
+        if metadata.get("source") in sources:
+            stale.append(doc_id)
+        elif metadata.get("doc_type") == LEGACY_WINE_DOC_TYPE and wine_key(metadata) in replacements:
+            stale.append(doc_id)
+    return stale
+
+
+def load_manifest(path: Path) -> Dict[str, str]:
+    """Manifiesto {id: hash} de la última sincronización (vacío si no existe o está corrupto)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("documents", {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Manifiesto de sincronización ilegible en {path}: {e}")
+        return {}
+
+
+def save_manifest(path: Path, manifest: Dict[str, str]):
+    """Guardar el manifiesto de forma atómica"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(path.name + ".tmp")
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump({"documents": manifest}, f, separators=(",", ":"))
+    os.replace(staging, path)
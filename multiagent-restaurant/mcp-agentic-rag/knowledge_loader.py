@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Carga de la base de conocimiento del servidor RAG
+Convierte los archivos de knowledge_base/ (textos, vinos.json y otros JSON) en
+documentos con ID, contenido y metadatos. Lo usan el arranque del servidor y la
+construcción del índice precalculado.
+"""
+
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any
+
+from chunking import chunk_document
+from wine_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_PATTERNS = ("*.txt", "*.json")
+
+# Versión del esquema de documentos y metadatos; invalida los artefactos de índice anteriores
+SCHEMA_VERSION = 4
+
+
+def wine_content(vino: Dict[str, Any]) -> str:
+    """Contenido estructurado de un vino"""
+    return f"""Vino: {vino.get('name', 'Sin nombre')}
+Tipo: {vino.get('type', 'Sin tipo')}
+Región: {vino.get('region', 'Sin región')}
+Año: {vino.get('vintage', 'Sin año')}
+Precio: {vino.get('price', 'Sin precio')}€
+Stock: {vino.get('stock', 'Sin stock')} unidades
+Maridaje: {vino.get('pairing', 'Sin maridaje')}
+Descripción: {vino.get('description', 'Sin descripción')}
+Puntuación: {vino.get('rating', 'Sin puntuación')}/100"""
+
+
+def wine_metadata(vino: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """Metadata rica para búsquedas (sin la posición en el archivo, para que insertar un vino no modifique los demás)"""
+    return {
+        "source": source,
+        "type": "vino",
+        "name": vino.get('name', ''),
+        "wine_type": vino.get('type', ''),
+        "region": vino.get('region', ''),
+        "vintage": vino.get('vintage', ''),
+        "price": vino.get('price', ''),
+        "stock": vino.get('stock', ''),
+        "rating": vino.get('rating', ''),
+        "pairing": vino.get('pairing', '')
+    }
+
+
+def wine_doc_id(vino: Dict[str, Any]) -> str:
+    """ID estable de un vino: nombre normalizado y añada, independiente de su posición en el archivo"""
+    slug = normalize_name(str(vino.get('name') or 'sin nombre')).replace(' ', '_')
+    return f"vino_{slug}_{vino.get('vintage', 'sa')}"
+
+
+def load_knowledge_documents(knowledge_dir: Path) -> List[Dict[str, Any]]:
+    """Leer la base de conocimiento como lista de documentos {id, content, metadata}"""
+    documents: List[Dict[str, Any]] = []
+
+    # Cargar archivos de texto troceados por secciones
+    for file_path in sorted(knowledge_dir.glob("*.txt")):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            chunks = chunk_document(file_path.stem, content, {"source": file_path.name, "type": "text"})
+            documents.extend(chunks)
+            logger.info(f"Documento de texto leído: {file_path.name} ({len(chunks)} trozos)")
+        except Exception as e:
+            logger.error(f"Error cargando archivo de texto {file_path}: {e}")
+
+    # Cargar archivos JSON (vinos)
+    for file_path in sorted(knowledge_dir.glob("*.json")):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            # Si es el archivo de vinos
+            if file_path.name == "vinos.json" and isinstance(data, list):
+                seen = {}
+                for vino in data:
+                    doc_id = wine_doc_id(vino)
+                    seen[doc_id] = seen.get(doc_id, 0) + 1
+                    if seen[doc_id] > 1:
+                        doc_id = f"{doc_id}_{seen[doc_id]}"
+                    documents.append({
+                        "id": doc_id,
+                        "content": wine_content(vino),
+                        "metadata": wine_metadata(vino, file_path.name)
+                    })
+                logger.info(f"{len(data)} vinos leídos desde {file_path.name}")
+            else:
+                # Para otros archivos JSON, cargar como documento único
+                documents.append({
+                    "id": file_path.stem,
+                    "content": json.dumps(data, indent=2, ensure_ascii=False),
+                    "metadata": {"source": file_path.name, "type": "json"}
+                })
+                logger.info(f"Documento JSON leído: {file_path.name}")
+
+        except Exception as e:
+            logger.error(f"Error cargando archivo JSON {file_path}: {e}")
+
+    return documents
+
+
+def source_fingerprints(knowledge_dir: Path) -> Dict[str, str]:
+    """SHA-256 de cada archivo de la base de conocimiento"""
+    fingerprints = {}
+    for pattern in KNOWLEDGE_PATTERNS:
+        for file_path in sorted(knowledge_dir.glob(pattern)):
+            fingerprints[file_path.name] = hashlib.sha256(file_path.read_bytes()).hexdigest()
+    return fingerprints
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Índice invertido BM25 para la recuperación híbrida
+Mantiene listas de postings por token normalizado (sin acentos) y se actualiza
+de forma incremental con cada documento agregado. Indexa además el nombre de
+los vinos (metadato `name`) como frase para detectar búsquedas por nombre exacto.
+"""
+
+import math
+import logging
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class LexicalIndex:
+    """Índice invertido con puntuación BM25 y búsqueda de nombres por frase"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._doc_tokens: Dict[str, Tuple[str, ...]] = {}
+        self._total_length = 0
+        self._metadatas: Dict[str, Dict[str, Any]] = {}
+        # Frase del nombre (tupla de tokens) -> IDs de documento
+        self._names: Dict[Tuple[str, ...], set] = {}
+        self._doc_names: Dict[str, Tuple[str, ...]] = {}
+        self._max_name_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # === Escritura ===
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Optional[Dict[str, Any]]] = None):
+        """Indexar documentos (reemplaza los que ya existan)"""
+        metadatas = metadatas or [None] * len(ids)
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            if doc_id in self._lengths:
+                self.remove([doc_id])
+
+            tokens = tokenize(document or "", drop_stopwords=True)
+            frequencies: Dict[str, int] = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, frequency in frequencies.items():
+                self._postings.setdefault(token, {})[doc_id] = frequency
+            self._lengths[doc_id] = len(tokens)
+            self._doc_tokens[doc_id] = tuple(frequencies)
+            self._total_length += len(tokens)
+
+            metadata = metadata or {}
+            self._metadatas[doc_id] = metadata
+            name = tuple(tokenize(str(metadata.get("name") or "")))
+            if name:
+                self._names.setdefault(name, set()).add(doc_id)
+                self._doc_names[doc_id] = name
+                self._max_name_length = max(self._max_name_length, len(name))
+
+    def remove(self, ids: List[str]):
+        """Eliminar documentos del índice"""
+        for doc_id in ids:
+            length = self._lengths.pop(doc_id, None)
+            if length is None:
+                continue
+            self._total_length -= length
+            self._metadatas.pop(doc_id, None)
+            for token in self._doc_tokens.pop(doc_id, ()):
+                del self._postings[token][doc_id]
+                if not self._postings[token]:
+                    del self._postings[token]
+            name = self._doc_names.pop(doc_id, None)
+            if name:
+                self._names[name].discard(doc_id)
+                if not self._names[name]:
+                    del self._names[name]
+
+    def clear(self):
+        """Vaciar el índice"""
+        self.__init__(self.k1, self.b)
+
+    # === Búsqueda ===
+
+    def search(self, query: str, top_k: int = 10,
+               predicate: Callable[[Dict[str, Any]], bool] = None) -> List[Tuple[str, float]]:
+        """Top-k documentos por BM25, opcionalmente filtrados por sus metadatos"""
+        total = len(self._lengths)
+        if not total:
+            return []
+        average_length = self._total_length / total or 1.0
+
+        scores: Dict[str, float] = {}
+        for token in set(tokenize(query, drop_stopwords=True)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if predicate:
+            ranked = [(doc_id, score) for doc_id, score in ranked if predicate(self._metadatas.get(doc_id, {}))]
+        return ranked[:top_k]
+
+    def match_names(self, query: str) -> List[str]:
+        """IDs de los documentos cuyo nombre completo aparece como frase en la consulta (el más largo)"""
+        tokens = tokenize(query)
+        for length in range(min(self._max_name_length, len(tokens)), 0, -1):
+            matches = set()
+            for start in range(len(tokens) - length + 1):
+                matches |= self._names.get(tuple(tokens[start:start + length]), set())
+            if matches:
+                return sorted(matches)
+        return []
+
+    def metadata(self, doc_id: str) -> Dict[str, Any]:
+        """Metadatos indexados de un documento"""
+        return self._metadatas.get(doc_id, {})
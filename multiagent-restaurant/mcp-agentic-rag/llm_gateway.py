@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Gateway LLM asíncrono para el motor RAG
+Cliente AsyncOpenAI detrás de un semáforo de concurrencia configurable, con
+timeouts por llamada y contabilidad de tokens. El backend es intercambiable
+para poder usar un LLM falso en tests.
+"""
+
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResult:
+    """Resultado de una llamada de chat completion"""
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class LLMBackend:
+    """Interfaz de backend de chat completions"""
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> LLMResult:
+        raise NotImplementedError
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[LLMResult]:
+        """Fragmentos de la respuesta; por defecto la respuesta completa en un solo fragmento"""
+        yield await self.complete(messages, **params)
+
+
+class OpenAIBackend(LLMBackend):
+    """Backend OpenAI (o compatible) usando el cliente asíncrono"""
+
+    def __init__(self, api_key: str, base_url: str, model: str):
+        import openai
+
+        self.model = model
+        self.client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> LLMResult:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **params
+        )
+        text = response.choices[0].message.content if response.choices else ""
+        usage = response.usage
+        return LLMResult(
+            text=text or "",
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0
+        )
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[LLMResult]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **params
+        )
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield LLMResult(text=chunk.choices[0].delta.content)
+                if chunk.usage:
+                    yield LLMResult(
+                        text="",
+                        prompt_tokens=chunk.usage.prompt_tokens,
+                        completion_tokens=chunk.usage.completion_tokens
+                    )
+        finally:
+            # Cerrar la conexión HTTP aunque el consumidor abandone el stream
+            await response.close()
+
+
+class LLMGateway:
+    """Acceso al LLM no bloqueante, limitado en concurrencia y con contabilidad de uso"""
+
+    def __init__(self, backend: LLMBackend, max_concurrency: int = None, timeout: float = None):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        if timeout is None:
+            timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+        self.backend = backend
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Semáforo ligado al event loop actual"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def _record_usage(self, stage: str, result: LLMResult):
+        """Acumular tokens por etapa del pipeline"""
+        stage_usage = self.usage.setdefault(stage, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        stage_usage["calls"] += 1
+        stage_usage["prompt_tokens"] += result.prompt_tokens
+        stage_usage["completion_tokens"] += result.completion_tokens
+
+    async def complete(self, messages: List[Dict[str, str]], stage: str = "default",
+                       timeout: Optional[float] = None, **params) -> LLMResult:
+        """Chat completion respetando el límite de concurrencia y el timeout"""
+        async with self._semaphore():
+            self.calls += 1
+            self.in_flight += 1
+            try:
+                result = await asyncio.wait_for(
+                    self.backend.complete(messages, **params),
+                    timeout=timeout or self.timeout
+                )
+                self._record_usage(stage, result)
+                return result
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.error(f"Timeout en llamada LLM ({stage})")
+                raise
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def stream(self, messages: List[Dict[str, str]], stage: str = "default",
+                     timeout: Optional[float] = None, **params) -> AsyncIterator[str]:
+        """Chat completion en streaming: produce los fragmentos de texto según llegan"""
+        async with self._semaphore():
+            self.calls += 1
+            self.in_flight += 1
+            usage = LLMResult(text="")
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + (timeout or self.timeout)
+            chunks = self.backend.stream(messages, **params).__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    usage.prompt_tokens += chunk.prompt_tokens
+                    usage.completion_tokens += chunk.completion_tokens
+                    if chunk.text:
+                        yield chunk.text
+                self._record_usage(stage, usage)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.error(f"Timeout en streaming LLM ({stage})")
+                raise
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                # Timeout o consumidor desconectado: cerrar el stream del backend ya, no al recolectarlo
+                aclose = getattr(chunks, "aclose", None)
+                if aclose:
+                    await aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso del LLM"""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+            "prompt_tokens": sum(stage["prompt_tokens"] for stage in self.usage.values()),
+            "completion_tokens": sum(stage["completion_tokens"] for stage in self.usage.values()),
+            "by_stage": self.usage
+        }
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Asignación de vinos a los platos de un menú
+Recibe un ranking de vinos candidatos por plato (recuperados en una sola pasada)
+y asigna a cada plato un vino distinto, priorizando los pares con más
+relevancia de todo el menú y comprobando que el stock cubre las botellas
+necesarias para los comensales.
+"""
+
+import os
+import math
+from typing import List, Dict, Any, Optional
+
+from wine_index import wine_fields
+
+# Copas de ~125 ml por botella de 750 ml; una copa por comensal y plato
+GLASSES_PER_BOTTLE = int(os.getenv("MENU_GLASSES_PER_BOTTLE", "6"))
+
+
+def bottles_needed(guests: int, glasses_per_bottle: int = None) -> int:
+    """Botellas necesarias para servir una copa a cada comensal"""
+    glasses_per_bottle = glasses_per_bottle or GLASSES_PER_BOTTLE
+    return max(1, math.ceil(guests / glasses_per_bottle))
+
+
+def _score(source: Dict[str, Any]) -> float:
+    return source.get('fusion_score', source.get('relevance_score', 0.0))
+
+
+def _course(source: Dict[str, Any], bottles: int, reserved: int = 0) -> Dict[str, Any]:
+    """Plato servido con un vino; `reserved` son las botellas ya asignadas a otros platos"""
+    wine = wine_fields(source.get('metadata', {}), source.get('content', ''))
+    stock = wine.get('stock')
+    return {
+        'source': source,
+        'wine': wine,
+        'bottles': bottles,
+        'stock_ok': stock is None or stock >= reserved + bottles,
+        'repeated': reserved > 0
+    }
+
+
+def assign_wines(rankings: List[List[Dict[str, Any]]], guests: int) -> List[Optional[Dict[str, Any]]]:
+    """Un vino por plato, sin repetir vinos entre platos y con stock suficiente si es posible"""
+    bottles = bottles_needed(guests)
+    candidates = sorted(
+        ((_score(source), dish, source) for dish, ranking in enumerate(rankings) for source in ranking),
+        key=lambda item: item[0],
+        reverse=True
+    )
+
+    courses: List[Optional[Dict[str, Any]]] = [None] * len(rankings)
+    used = set()
+
+    # 1. Pares más relevantes de todo el menú primero, con stock suficiente
+    for _, dish, source in candidates:
+        if courses[dish] is not None or source['id'] in used:
+            continue
+        course = _course(source, bottles)
+        if course['stock_ok']:
+            courses[dish] = course
+            used.add(source['id'])
+
+    # 2. Platos sin asignar: mejor vino no usado aunque falte stock; si no queda ninguno, se repite
+    for dish, ranking in enumerate(rankings):
+        if courses[dish] is not None or not ranking:
+            continue
+        unused = [source for source in ranking if source['id'] not in used]
+        if unused:
+            courses[dish] = _course(unused[0], bottles)
+            used.add(unused[0]['id'])
+        else:
+            reserved = bottles * sum(1 for course in courses if course and course['source']['id'] == ranking[0]['id'])
+            courses[dish] = _course(ranking[0], bottles, reserved)
+    return courses
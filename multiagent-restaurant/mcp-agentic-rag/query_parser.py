@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Análisis determinista de restricciones en consultas de vinos
+Extrae tipo, región, rango de precio, añada y puntuación de consultas como
+"tinto de Rioja por menos de 30€", "blanco 2018" o "espumoso con más de 90
+puntos". Tipos y regiones salen del vocabulario del propio catálogo; precios,
+puntuaciones y añadas de un conjunto de expresiones regulares sobre el texto
+sin acentos. Lo que no es restricción queda como texto libre para la
+recuperación; si no queda nada, la consulta es completamente estructurada.
+"""
+
+import re
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Optional, Tuple
+
+from inventory_catalog import InventoryCatalog
+from text_utils import STOPWORDS, fold_accents, tokenize
+from wine_filters import WineFilter
+
+# Sinónimos y plurales por tipo (clave sin acentos); solo se usan si el tipo existe en el catálogo
+TYPE_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "tinto": ("tintos",),
+    "blanco": ("blancos",),
+    "espumoso": ("espumosos", "burbujas"),
+    "rosado": ("rosados",),
+    "dulce": ("dulces",),
+    "generoso": ("generosos",),
+}
+# "pescado blanco" o "chocolate blanco" describen el plato, no el vino
+_NOT_A_TYPE_AFTER = frozenset("pescado pescados chocolate arroz pan queso quesos ajo atun".split())
+# Palabras que no aportan a la recuperación una vez extraídas las restricciones
+_FILLER = frozenset("""
+vino vinos botella botellas quiero busco buscando dame recomienda recomiendame recomendacion sugiere sugiereme
+alguno alguna algun necesito tienes hay euros eur puntos pts precio anada cosecha ano
+""".split())
+
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+_EURO = r"\s*(?:€|euros?\b|eur\b)"
+_YEAR = r"((?:19|20)\d\d)\b"
+_POINTS = r"\s*(?:puntos|pts)\b"
+
+# (patrón, tipo de restricción); se aplican en orden y cada coincidencia consume su texto
+_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(rf"\bentre\s+{_NUMBER}(?:{_EURO})?\s+y\s+{_NUMBER}{_EURO}"), "price_range"),
+    (re.compile(rf"\bde\s+{_NUMBER}(?:{_EURO})?\s+a\s+{_NUMBER}{_EURO}"), "price_range"),
+    (re.compile(rf"\b(?:por\s+)?(?:menos\s+de|por\s+debajo\s+de|debajo\s+de|hasta|maximo(?:\s+de)?|como\s+mucho|"
+                rf"no\s+mas\s+de|inferior\s+a|menor\s+(?:de|que))\s+{_NUMBER}{_EURO}"), "price_max"),
+    (re.compile(rf"\b(?:mas\s+de|desde|minimo(?:\s+de)?|por\s+encima\s+de|superior\s+a|a\s+partir\s+de|"
+                rf"al\s+menos|mayor\s+(?:de|que))\s+{_NUMBER}{_EURO}"), "price_min"),
+    (re.compile(rf"\b(?:alrededor\s+de|unos|sobre|aproximadamente|cerca\s+de)\s+{_NUMBER}{_EURO}"), "price_around"),
+    (re.compile(rf"(?:\b(?:de|por|con|presupuesto(?:\s+de)?)\s+)?{_NUMBER}{_EURO}"), "price_max"),
+    (re.compile(rf"\b(?:menos\s+de|hasta|maximo(?:\s+de)?|inferior\s+a)\s+(\d{{2,3}}){_POINTS}"), "rating_max"),
+    (re.compile(rf"\b(?:(?:con\s+)?(?:mas\s+de|al\s+menos|minimo(?:\s+de)?|desde|por\s+encima\s+de|superior\s+a|"
+                rf"mayor\s+(?:de|que))\s+)?(\d{{2,3}}){_POINTS}"), "rating_min"),
+    (re.compile(r"\b(\d{2,3})\s*\+(?:\s*(?:puntos|pts)\b)?"), "rating_min"),
+    (re.compile(r"\bpuntuacion\s+(?:(?:minima|superior|mayor)\s+(?:de|a|que)\s+|de\s+)?(\d{2,3})\b"), "rating_min"),
+    (re.compile(rf"\bentre\s+(?:(?:la|las)\s+)?(?:anadas?\s+|cosechas?\s+)?(?:de\s+)?{_YEAR}\s+y\s+(?:la\s+)?{_YEAR}"), "vintage_range"),
+    (re.compile(rf"\b(?:de\s+)?{_YEAR}\s*(?:-|a|al)\s*{_YEAR}"), "vintage_range"),
+    (re.compile(rf"\b(?:anterior(?:es)?\s+a|antes\s+del?)\s+(?:la\s+)?(?:anada\s+|cosecha\s+)?(?:de\s+)?{_YEAR}"), "vintage_before"),
+    (re.compile(rf"\b(?:posterior(?:es)?\s+a|despues\s+del?)\s+(?:la\s+)?(?:anada\s+|cosecha\s+)?(?:de\s+)?{_YEAR}"), "vintage_after"),
+    (re.compile(rf"\b(?:desde|a\s+partir\s+del?)\s+(?:la\s+)?(?:anada\s+|cosecha\s+)?(?:de\s+)?{_YEAR}"), "vintage_min"),
+    (re.compile(rf"\bhasta\s+(?:la\s+)?(?:anada\s+|cosecha\s+)?(?:de\s+)?{_YEAR}"), "vintage_max"),
+    (re.compile(rf"\b(?:(?:de\s+)?(?:la\s+)?(?:anada|cosecha|ano)\s+(?:de\s+|del\s+)?|del?\s+)?{_YEAR}"), "vintage"),
+]
+
+
+def _number(text: str) -> float:
+    value = float(text.replace(",", "."))
+    return int(value) if value.is_integer() else value
+
+
+@dataclass
+class ParsedQuery:
+    """Restricciones extraídas y texto libre restante"""
+    filters: WineFilter
+    free_text: str
+    constraints: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def has_constraints(self) -> bool:
+        return bool(self.constraints)
+
+    @property
+    def structured(self) -> bool:
+        """Todas las palabras con contenido eran restricciones"""
+        return self.has_constraints and not self.free_text
+
+
+class QueryParser:
+    """Parser de restricciones con el vocabulario (tipos y regiones) del catálogo de inventario"""
+
+    def __init__(self, catalog: InventoryCatalog):
+        self.catalog = catalog
+        self._version = None
+        self._vocabulary: List[Tuple[re.Pattern, str, str]] = []
+
+    def _ensure_vocabulary(self):
+        """Reconstruir el vocabulario si el catálogo cambió"""
+        if self._version == self.catalog.version:
+            return
+        entries = []
+        for label in self.catalog.types.labels:
+            key = fold_accents(label).strip()
+            for phrase in (key,) + TYPE_SYNONYMS.get(key, (key + "s",)):
+                entries.append((phrase, "wine_type", label))
+        for label in self.catalog.regions.labels:
+            entries.append((fold_accents(label).strip(), "region", label))
+        # Frases más largas primero: "rioja alavesa" antes que "rioja"
+        entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+        self._vocabulary = [
+            (re.compile(rf"\b{re.escape(phrase)}\b"), kind, label) for phrase, kind, label in entries if phrase
+        ]
+        self._version = self.catalog.version
+
+    def parse(self, query: str) -> ParsedQuery:
+        """Extraer las restricciones de una consulta"""
+        self._ensure_vocabulary()
+        folded = fold_accents(query)
+        # Si la normalización conserva la longitud, el texto libre se toma de la consulta original (con acentos)
+        source = query if len(folded) == len(query) else folded
+        remaining = folded
+        values: Dict[str, object] = {}
+        constraints: List[Tuple[str, str]] = []
+
+        def consume(match: re.Match):
+            nonlocal remaining
+            start, end = match.span()
+            remaining = remaining[:start] + " " * (end - start) + remaining[end:]
+            constraints.append((kind, source[start:end].strip()))
+
+        for pattern, kind in _PATTERNS:
+            for match in list(pattern.finditer(remaining)):
+                if self._apply(kind, match.groups(), values):
+                    consume(match)
+
+        for pattern, kind, label in self._vocabulary:
+            if kind in values:
+                continue
+            for match in pattern.finditer(remaining):
+                before = remaining[:match.start()].split()
+                if kind == "wine_type" and before and before[-1] in _NOT_A_TYPE_AFTER:
+                    continue
+                values[kind] = label
+                consume(match)
+                break
+
+        free_tokens = []
+        for word in re.finditer(r"\S+", remaining):
+            tokens = tokenize(word.group())
+            if any(token not in STOPWORDS and token not in _FILLER for token in tokens):
+                free_tokens.append(source[word.start():word.end()])
+        filters = WineFilter(type="vino", **values) if values else WineFilter()
+        return ParsedQuery(filters, " ".join(free_tokens), constraints)
+
+    @staticmethod
+    def _apply(kind: str, groups: Tuple[str, ...], values: Dict[str, object]) -> bool:
+        """Aplicar una coincidencia; False si la restricción ya estaba fijada o no es válida"""
+        if kind == "price_range":
+            low, high = sorted((_number(groups[0]), _number(groups[1])))
+            updates = {"price_min": low, "price_max": high}
+        elif kind == "price_around":
+            price = _number(groups[0])
+            updates = {"price_min": round(price * 0.8, 2), "price_max": round(price * 1.2, 2)}
+        elif kind in ("price_min", "price_max", "rating_min", "rating_max"):
+            value = _number(groups[0])
+            if kind.startswith("rating") and not 50 <= value <= 100:
+                return False
+            updates = {kind: value}
+        elif kind == "vintage_range":
+            low, high = sorted((int(groups[0]), int(groups[1])))
+            updates = {"vintage_min": low, "vintage_max": high}
+        elif kind == "vintage_before":
+            updates = {"vintage_max": int(groups[0]) - 1}
+        elif kind == "vintage_after":
+            updates = {"vintage_min": int(groups[0]) + 1}
+        elif kind in ("vintage_min", "vintage_max"):
+            updates = {kind: int(groups[0])}
+        else:  # vintage exacta
+            updates = {"vintage_min": int(groups[0]), "vintage_max": int(groups[0])}
+        if any(key in values for key in updates):
+            return False
+        values.update(updates)
+        return True
+
+
+def merge_filters(explicit: Optional[WineFilter], parsed: WineFilter) -> WineFilter:
+    """Filtros explícitos (argumentos de la herramienta) completados con los extraídos de la consulta"""
+    if explicit is None:
+        return parsed
+    merged = {}
+    for item in fields(WineFilter):
+        value = getattr(explicit, item.name)
+        merged[item.name] = value if value is not None else getattr(parsed, item.name)
+    return WineFilter(**merged)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Evaluación offline de la recuperación del servidor RAG
+
+Comandos:
+    recall     recall@k del índice compacto (PCA + float16) frente a los vectores
+               completos: para cada consulta, fracción del top-k exacto con los
+               vectores float32 que el índice compacto también devuelve.
+    expansion  modos de QUERY_EXPANSION con la recuperación del motor: fracción de
+               los expected_topics de cada consulta presentes en el top-k, latencia
+               de la recuperación y llamadas al LLM por consulta. Con --gated, la
+               expansión pasa por los umbrales de la expansión adaptativa
+               (EXPANSION_MIN_SCORE, EXPANSION_MIN_MARGIN) y se informa la tasa de expansión.
+
+Uso:
+    python rag_eval.py recall --queries test_data/test_queries.json --dims 64,128,192 --k 5,10
+    python rag_eval.py expansion --queries test_data/test_queries.json --modes none,thesaurus,llm,hybrid
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+
+from compact_vector_index import CompactVectorIndex
+from embedding_backends import BACKENDS, EMBEDDING_BACKEND, create_embedding_backend
+from expansion_gate import ExpansionGate
+from knowledge_loader import load_knowledge_documents
+from text_utils import fold_accents
+from thesaurus import Thesaurus
+from vector_index import NumpyVectorIndex
+
+
+def load_queries(path: Path) -> List[str]:
+    """Consultas de un JSON: {"test_queries": [{"query": ...}]} o una lista de textos/objetos"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.get("test_queries", []) if isinstance(data, dict) else data
+    return [item["query"] if isinstance(item, dict) else str(item) for item in items]
+
+
+def load_test_cases(path: Path) -> List[Dict[str, Any]]:
+    """Consultas con sus temas esperados ({"query": ..., "expected_topics": [...]})"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.get("test_queries", []) if isinstance(data, dict) else data
+    return [item for item in items if isinstance(item, dict) and item.get("expected_topics")]
+
+
+def load_test_documents(path: Path) -> List[Dict[str, Any]]:
+    """Documentos de prueba que acompañan a las consultas (se añaden al corpus)"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        return []
+    return [
+        {"id": doc.get("doc_id") or f"test_{i}", "content": doc["content"], "metadata": doc.get("metadata") or {}}
+        for i, doc in enumerate(data.get("test_documents", []))
+    ]
+
+
+def recall_at_k(full: NumpyVectorIndex, compact: NumpyVectorIndex, queries: np.ndarray, k: int) -> float:
+    """Recall@k medio del índice compacto respecto al top-k exacto del índice completo"""
+    if not len(queries):
+        return float("nan")
+    expected = full.query(queries, n_results=k, include=[])["ids"]
+    found = compact.query(queries, n_results=k, include=[])["ids"]
+    return float(np.mean([len(set(a) & set(b)) / max(1, len(a)) for a, b in zip(expected, found)]))
+
+
+def topic_recall(sources: List[Dict[str, Any]], topics: List[str]) -> float:
+    """Fracción de los temas esperados que aparecen (sin acentos ni mayúsculas) en las fuentes"""
+    text = fold_accents(" ".join(source["content"] for source in sources))
+    return sum(fold_accents(topic) in text for topic in topics) / len(topics)
+
+
+async def evaluate_expansion(engine, cases: List[Dict[str, Any]], modes: List[str], k: int,
+                             gated: bool = False) -> List[Dict[str, Any]]:
+    """Recuperación del motor (expansión + multi-consulta + BM25) con cada modo de expansión"""
+    results = []
+    for mode in modes:
+        engine.query_expansion = mode
+        engine.expansion_gate = ExpansionGate(enabled=gated)
+        search = engine.adaptive_search if gated else engine.expanded_search
+        llm_calls = engine.llm.calls if engine.llm else 0
+        recalls, latencies = [], []
+        for case in cases:
+            start = time.perf_counter()
+            sources = await search(case["query"], max_results=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(topic_recall(sources, case["expected_topics"]))
+        results.append({
+            "mode": mode,
+            "topic_recall": float(np.mean(recalls)),
+            "hit_rate": float(np.mean([recall > 0 for recall in recalls])),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "llm_calls_per_query": ((engine.llm.calls if engine.llm else 0) - llm_calls) / len(cases),
+            "expansion_rate": engine.expansion_gate.stats()["expansion_rate"] if gated else None
+        })
+    return results
+
+
+def run_expansion(args):
+    # El motor lee su configuración al importarse: índice numpy en memoria y sin cachés entre modos
+    os.environ["VECTOR_DB_TYPE"] = "numpy"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    from rag_mcp_server import AgenticRAGEngine
+    logging.getLogger().setLevel(logging.WARNING)
+
+    documents = load_knowledge_documents(Path(args.knowledge_dir)) + load_test_documents(Path(args.queries))
+    cases = load_test_cases(Path(args.queries))
+    modes = [mode.strip() for mode in args.modes.split(",")]
+
+    async def evaluate():
+        engine = AgenticRAGEngine()
+        engine.embedding_model = create_embedding_backend(args.backend, args.model)
+        engine.thesaurus = Thesaurus.load(Path(args.knowledge_dir), Path(args.thesaurus))
+        await engine.initialize()
+        await engine.add_documents([doc["content"] for doc in documents], [doc["metadata"] for doc in documents],
+                                   [doc["id"] for doc in documents])
+        if not engine.llm and {"llm", "hybrid"} & set(modes):
+            print("Sin OPENAI_API_KEY: los modos llm e hybrid no llaman al LLM")
+        return await evaluate_expansion(engine, cases, modes, args.k, args.gated)
+
+    results = asyncio.run(evaluate())
+    print(f"{len(documents)} documentos, {len(cases)} consultas con temas esperados, top-{args.k}")
+    header = f"{'modo':<11}{'temas':>8}{'aciertos':>10}{'p50 ms':>9}{'p95 ms':>9}{'LLM/consulta':>14}"
+    print(header + (f"{'expansión':>11}" if args.gated else ""))
+    for row in results:
+        line = (f"{row['mode']:<11}{row['topic_recall']:>8.3f}{row['hit_rate']:>10.3f}{row['p50_ms']:>9.1f}"
+                f"{row['p95_ms']:>9.1f}{row['llm_calls_per_query']:>14.2f}")
+        print(line + (f"{row['expansion_rate']:>11.2f}" if args.gated else ""))
+
+
+def run_recall(args):
+    documents = load_knowledge_documents(Path(args.knowledge_dir)) + load_test_documents(Path(args.queries))
+    queries = load_queries(Path(args.queries))
+    backend = create_embedding_backend(args.backend, args.model)
+
+    corpus = backend.encode([doc["content"] for doc in documents], batch_size=args.batch_size)
+    query_vectors = backend.encode(queries, batch_size=args.batch_size) if queries else np.empty((0, corpus.shape[1]))
+    # Documentos del corpus como consultas adicionales: más muestras que las pocas consultas de prueba
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(documents), size=min(args.doc_queries, len(documents)), replace=False)
+    doc_query_vectors = corpus[sample]
+
+    full = NumpyVectorIndex()
+    full.add([doc["id"] for doc in documents], corpus,
+             [doc["content"] for doc in documents], [doc["metadata"] for doc in documents])
+
+    ks = [int(k) for k in args.k.split(",")]
+    print(f"{len(documents)} documentos, {len(queries)} consultas de prueba, {len(sample)} documentos como consulta; "
+          f"backend {backend.model_key}, dim {corpus.shape[1]}")
+    header = f"{'dim':>5}{'bytes/doc':>11}{'reducción':>11}{'varianza':>10}"
+    header += "".join(f"{f'R@{k} test':>12}{f'R@{k} docs':>12}" for k in ks)
+    print(header)
+    for dim in [int(dim) for dim in args.dims.split(",")]:
+        compact = CompactVectorIndex.from_index(full, dim)
+        stats = compact.memory_stats()
+        row = f"{stats['dim']:>5}{stats['bytes_per_document']:>11}{stats['reduction']:>10}×{stats['explained_variance']:>10.3f}"
+        for k in ks:
+            row += f"{recall_at_k(full, compact, query_vectors, k):>12.3f}{recall_at_k(full, compact, doc_query_vectors, k):>12.3f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación offline de la recuperación RAG")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recall = subparsers.add_parser("recall", help="Recall@k del índice compacto frente a los vectores completos")
+    recall.add_argument("--queries", default="test_data/test_queries.json")
+    recall.add_argument("--knowledge-dir", default=os.getenv("KNOWLEDGE_BASE_PATH", "knowledge_base"))
+    recall.add_argument("--dims", default=os.getenv("COMPACT_VECTOR_DIM", "128") or "128",
+                        help="Dimensiones PCA separadas por comas")
+    recall.add_argument("--k", default="5,10")
+    recall.add_argument("--doc-queries", type=int, default=100)
+    recall.add_argument("--seed", type=int, default=0)
+    recall.add_argument("--backend", choices=BACKENDS, default=EMBEDDING_BACKEND)
+    recall.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    recall.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+
+    expansion = subparsers.add_parser("expansion", help="Temas esperados recuperados con cada modo de QUERY_EXPANSION")
+    expansion.add_argument("--queries", default="test_data/test_queries.json")
+    expansion.add_argument("--knowledge-dir", default=os.getenv("KNOWLEDGE_BASE_PATH", "knowledge_base"))
+    expansion.add_argument("--thesaurus", default=os.getenv("THESAURUS_PATH", "data/thesaurus.json"))
+    expansion.add_argument("--modes", default="none,thesaurus,llm,hybrid")
+    expansion.add_argument("--k", type=int, default=5)
+    expansion.add_argument("--gated", action="store_true",
+                           help="Expandir solo si la búsqueda original no es concluyente (expansión adaptativa)")
+    expansion.add_argument("--backend", choices=BACKENDS, default=EMBEDDING_BACKEND)
+    expansion.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+
+    args = parser.parse_args()
+    if args.command == "recall":
+        run_recall(args)
+    elif args.command == "expansion":
+        run_expansion(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,29 +5,51 @@ Implementa un sistema completo de RAG con capacidades agénticas usando MCP
 """
 
 import os
+import re
 import sys
 import json
 import asyncio
 import logging
+import threading
 import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from contextlib import asynccontextmanager, aclosing
 
 import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 
-# MCP SDK imports
+# MCP SDK imports (stdio_server se importa en main, solo en modo stdio)
 from mcp import types
 from mcp.server import Server
-from mcp.server.stdio import stdio_server
 
-# Vector DB imports
-import chromadb
-from chromadb.config import Settings
-import openai
-from sentence_transformers import SentenceTransformer
+# chromadb y el backend de embeddings se importan de forma perezosa durante el arranque en segundo plano
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from embedding_backends import EMBEDDING_BACKEND, create_embedding_backend, embedding_model_key
+from embedding_executor import EmbeddingExecutor
+from retrieval import fuse_rankings
+from llm_gateway import LLMGateway, OpenAIBackend
+from semantic_cache import SemanticCache
+from vector_index import NumpyVectorIndex
+from compact_vector_index import CompactVectorIndex, compact_index
+from knowledge_loader import load_knowledge_documents
+from wine_filters import WineFilter
+from query_parser import QueryParser, merge_filters
+from thesaurus import Thesaurus
+from expansion_gate import ExpansionGate
+from context_packing import CONTEXT_TOKEN_BUDGET, PackedContext, compact_context, pack_sources
+from lexical_index import LexicalIndex
+from wine_index import WineNameIndex, wine_fields
+from inventory_catalog import InventoryCatalog
+from recommendation_index import RecommendationIndex, wine_style
+from menu_pairing import assign_wines
+from index_artifact import IndexArtifact, load_index_artifact
+from kb_sync import KB_SYNC_MANIFEST_PATH, plan_sync, stale_documents, wine_key, load_manifest, save_manifest
+from warmup import WarmupTracker
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -40,6 +62,29 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 VECTOR_DB_TYPE = os.getenv("VECTOR_DB_TYPE", "chroma")
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
+KNOWLEDGE_BASE_PATH = os.getenv("KNOWLEDGE_BASE_PATH", "/app/knowledge_base")
+INDEX_ARTIFACT_PATH = os.getenv("INDEX_ARTIFACT_PATH", "/app/index")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Clave de caché y de artefacto: distingue los vectores del backend ONNX int8 de los de PyTorch
+EMBEDDING_MODEL_KEY = embedding_model_key(EMBEDDING_BACKEND, EMBEDDING_MODEL)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_FUSION = os.getenv("RETRIEVAL_FUSION", "rrf")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "500"))
+# Recuperación híbrida: ranking BM25 fusionado con el vectorial y atajo por nombre exacto de vino
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+# Factor de ampliación de n_results cuando una búsqueda filtrada devuelve menos de k resultados válidos
+FILTER_OVERFETCH_FACTOR = int(os.getenv("FILTER_OVERFETCH_FACTOR", "4"))
+# Vinos candidatos recuperados por plato en crear_menu_maridaje
+MENU_CANDIDATES_PER_DISH = int(os.getenv("MENU_CANDIDATES_PER_DISH", "8"))
+# Expansión de consultas: tesauro local, LLM, ambos o ninguna
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "llm").lower()
+QUERY_EXPANSION_MODES = ("thesaurus", "llm", "hybrid", "none")
+# Presupuesto de latencia por consulta RAG por defecto (0 = sin límite); limita la expansión
+QUERY_LATENCY_BUDGET_MS = float(os.getenv("QUERY_LATENCY_BUDGET_MS", "0"))
+# IDs generados para documentos sin ID explícito
+GENERATED_ID_RE = re.compile(r"^doc_(\d+)$")
 
 # Modelos de datos
 class QueryRequest(BaseModel):
@@ -52,28 +97,116 @@ class DocumentRequest(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
     doc_id: Optional[str] = None
 
+class DocumentBatchRequest(BaseModel):
+    documents: List[DocumentRequest]
+
 class RAGResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
     context_used: Dict[str, Any]
 
+def _import_chromadb():
+    """Importar chromadb (lento) fuera del event loop"""
+    import chromadb
+    from chromadb.config import Settings
+    return chromadb, Settings
+
 class AgenticRAGEngine:
     """Motor de RAG Agéntico con capacidades avanzadas"""
     
     def __init__(self):
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # El modelo se carga en segundo plano tras abrir el puerto (o en el primer embedding)
+        self.embedding_model = None
+        self._model_lock = threading.Lock()
+        self._initializing: Optional[asyncio.Future] = None
+        self.warmup = WarmupTracker(("vector_db", "knowledge", "embedding_model"))
+        self.lexical_fallbacks = 0
+        self.embedding_cache = None
+        self.embedding_executor = EmbeddingExecutor(self._embed_texts, query_encode_fn=self._encode_queries)
         self.vector_db = None
         self.collection = None
-        self.openai_client = None
+        self.llm = None
+        self.semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+        self.kb_version = 0
+        self._doc_counter = None
+        self.lexical_index = LexicalIndex()
+        # Documentos ya indexados en memoria cuyo embedding aún no se ha escrito: id -> (contenido, metadatos)
+        self._pending_documents: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self.wine_index = WineNameIndex()
+        self.inventory = InventoryCatalog()
+        self.recommendations = RecommendationIndex(self.inventory)
+        self.query_parser = QueryParser(self.inventory)
+        self.query_expansion = QUERY_EXPANSION if QUERY_EXPANSION in QUERY_EXPANSION_MODES else "llm"
+        self.thesaurus: Optional[Thesaurus] = None
+        self.thesaurus_expansions = 0
+        self.llm_expansions = 0
+        self.llm_expansion_failures = 0
+        self.expansion_gate = ExpansionGate()
+        self._background_tasks: set = set()
+        self.name_shortcuts = 0
+        self.constraint_queries = 0
+        self.structured_queries = 0
+        self.retrieval_only_queries = 0
+        self.packed_prompts = 0
+        self.packed_context_tokens = 0
+        self.packed_dropped_sources = 0
+        self.last_sync: Optional[Dict[str, int]] = None
+        
+        if EMBEDDING_CACHE_ENABLED:
+            try:
+                self.embedding_cache = EmbeddingCache()
+            except Exception as e:
+                logger.warning(f"Caché de embeddings deshabilitada: {e}")
         
         if OPENAI_API_KEY:
-            self.openai_client = openai.OpenAI(
+            self.llm = LLMGateway(OpenAIBackend(
                 api_key=OPENAI_API_KEY,
-                base_url=OPENAI_BASE_URL
-            )
+                base_url=OPENAI_BASE_URL,
+                model=OPENAI_MODEL
+            ))
+    
+    def load_embedding_model(self):
+        """Cargar el backend de embeddings una sola vez (bloqueante: llamar desde un hilo)"""
+        with self._model_lock:
+            if self.embedding_model is None:
+                with self.warmup.track("embedding_model"):
+                    self.embedding_model = create_embedding_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL)
+                logger.info(f"Backend de embeddings: {EMBEDDING_BACKEND} ({EMBEDDING_MODEL_KEY})")
+        return self.embedding_model
+    
+    @property
+    def model_ready(self) -> bool:
+        return self.embedding_model is not None
+    
+    def _lexical_only(self) -> bool:
+        """Modelo aún cargando: las búsquedas responden solo con BM25 en lugar de esperar"""
+        return HYBRID_RETRIEVAL and not self.model_ready and len(self.lexical_index) > 0
+    
+    async def ensure_initialized(self):
+        """Esperar a la vector DB, inicializándola una sola vez aunque lleguen peticiones concurrentes"""
+        if self.collection is not None:
+            return
+        if self._initializing is None or self._initializing.done():
+            self._initializing = asyncio.ensure_future(self.initialize())
+        await asyncio.shield(self._initializing)
     
     async def initialize(self):
         """Inicializar conexiones a bases de datos vectoriales"""
+        with self.warmup.track("vector_db"):
+            await self._initialize_vector_db()
+    
+    async def _initialize_vector_db(self):
+        self._doc_counter = None
+        self.lexical_index.clear()
+        self.wine_index.clear()
+        self.inventory.clear()
+        if VECTOR_DB_TYPE == "numpy":
+            # Índice exacto en memoria: sin servidor ni viaje HTTP
+            self.collection = NumpyVectorIndex("rag_documents")
+            logger.info("Vector DB inicializada exitosamente: numpy (índice exacto en memoria)")
+            return
+        
+        chromadb, Settings = await asyncio.to_thread(_import_chromadb)
         try:
             if VECTOR_DB_TYPE == "chroma":
                 # En Railway usar ChromaDB embebido, localmente usar cliente HTTP
@@ -109,6 +242,8 @@ class AgenticRAGEngine:
                         metadata={"hnsw:space": "cosine"}
                     )
                     logger.info("Colección 'rag_documents' creada exitosamente")
+                
+                self._hydrate_indexes()
             
             logger.info(f"Vector DB inicializada exitosamente: {VECTOR_DB_TYPE} ({'embebido' if use_embedded else 'HTTP client'})")
             
@@ -120,94 +255,407 @@ class AgenticRAGEngine:
             self.collection = self.vector_db.create_collection("rag_documents")
             logger.info("Vector DB mínima inicializada como fallback")
     
+    def _index_documents(self, ids: List[str], documents: List[str], metadatas: List[Optional[Dict[str, Any]]]):
+        """Actualizar los índices en memoria (BM25, nombres de vino e inventario) con documentos nuevos"""
+        if HYBRID_RETRIEVAL:
+            self.lexical_index.add(ids, documents, metadatas)
+        self.wine_index.add(ids, metadatas)
+        self.inventory.add(ids, metadatas, documents)
+    
+    def _unindex_documents(self, ids: List[str]):
+        """Quitar documentos de los índices en memoria"""
+        self.lexical_index.remove(ids)
+        self.wine_index.remove(ids)
+        self.inventory.remove(ids)
+    
+    def _hydrate_indexes(self):
+        """Reconstruir los índices en memoria con los documentos ya presentes en la colección"""
+        if not self.collection.count():
+            return
+        existing = self.collection.get(include=['documents', 'metadatas'])
+        self._index_documents(existing['ids'], existing['documents'], existing['metadatas'])
+        logger.info(f"Índices en memoria hidratados con {len(existing['ids'])} documentos")
+    
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Generar embeddings por lotes consultando primero la caché persistente"""
+        if not self.embedding_cache:
+            return self.load_embedding_model().encode(texts, batch_size=EMBEDDING_BATCH_SIZE)
+        
+        cached = self.embedding_cache.get_many(EMBEDDING_MODEL_KEY, texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self.load_embedding_model().encode(missing_texts, batch_size=EMBEDDING_BATCH_SIZE)
+            self.embedding_cache.put_many(EMBEDDING_MODEL_KEY, missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                cached[i] = vector
+        
+        return np.vstack(cached) if cached else np.empty((0, 0), dtype=np.float32)
+    
+    def _encode_queries(self, texts: List[str]) -> np.ndarray:
+        """Embeddings de consultas sin la caché persistente: son de un solo uso y expulsarían
+        vectores de documentos (las consultas repetidas las cubre la caché semántica)"""
+        return self.load_embedding_model().encode(texts, batch_size=EMBEDDING_BATCH_SIZE)
+    
     def _embed_text(self, text: str) -> List[float]:
         """Generar embeddings para texto"""
-        return self.embedding_model.encode(text).tolist()
+        return self._embed_texts([text])[0].tolist()
+    
+    async def embed_query(self, text: str) -> List[float]:
+        """Embedding de una consulta sin bloquear el event loop (micro-batching)"""
+        vector = await self.embedding_executor.embed(text)
+        return vector.tolist()
+    
+    async def embed_texts(self, texts: List[str], queries: bool = False) -> np.ndarray:
+        """Embeddings de un lote de textos sin bloquear el event loop (`queries`: sin caché persistente)"""
+        return await self.embedding_executor.embed_many(texts, queries=queries)
+    
+    def _assign_doc_ids(self, doc_ids: List[Optional[str]]) -> List[str]:
+        """Asignar IDs secuenciales por encima del mayor doc_N existente (los borrados dejan huecos:
+        contar documentos podría repetir un ID y `add` descartaría el documento nuevo)"""
+        if self._doc_counter is None:
+            existing = self.collection.get(include=[])["ids"] if self.collection.count() else []
+            self._doc_counter = max(
+                (int(match.group(1)) for match in map(GENERATED_ID_RE.match, existing) if match), default=0
+            )
+        
+        assigned = []
+        for doc_id in doc_ids:
+            if not doc_id:
+                self._doc_counter += 1
+                doc_id = f"doc_{self._doc_counter}"
+            else:
+                match = GENERATED_ID_RE.match(doc_id)
+                if match:
+                    self._doc_counter = max(self._doc_counter, int(match.group(1)))
+            assigned.append(doc_id)
+        return assigned
+    
+    def _knowledge_changed(self):
+        """Nueva versión de la base de conocimiento: invalidar respuestas cacheadas"""
+        self.kb_version += 1
+        if self.semantic_cache:
+            self.semantic_cache.invalidate()
     
     async def add_document(self, content: str, metadata: Dict[str, Any] = None, doc_id: str = None) -> str:
         """Agregar documento a la base de conocimiento"""
+        doc_ids = await self.add_documents([content], [metadata], [doc_id])
+        return doc_ids[0]
+    
+    async def add_documents(self, contents: List[str], metadatas: List[Dict[str, Any]] = None,
+                            doc_ids: List[Optional[str]] = None, embeddings: np.ndarray = None,
+                            upsert: bool = False) -> List[str]:
+        """Agregar documentos en lote: embeddings por lotes y escritura en ChromaDB por bloques.
+        Si se pasan embeddings precalculados no se llama al modelo; con upsert se reemplazan los IDs existentes."""
+        await self.ensure_initialized()
+        metadatas = metadatas or [None] * len(contents)
+        doc_ids = self._assign_doc_ids(doc_ids or [None] * len(contents))
+        # Índices en memoria antes de los embeddings: BM25, nombres e inventario responden
+        # mientras el modelo carga (p. ej. en el arranque en frío sin artefacto ni caché)
+        self._index_documents(doc_ids, contents, metadatas)
+        self._pending_documents.update(zip(doc_ids, zip(contents, metadatas)))
         try:
-            if not doc_id:
-                doc_id = f"doc_{len(self.collection.get()['ids']) + 1}"
+            write = self.collection.upsert if upsert else self.collection.add
             
-            embedding = self._embed_text(content)
+            for start in range(0, len(contents), CHROMA_WRITE_BATCH_SIZE):
+                end = start + CHROMA_WRITE_BATCH_SIZE
+                chunk = contents[start:end]
+                if embeddings is None:
+                    chunk_embeddings = await self.embed_texts(chunk)
+                else:
+                    chunk_embeddings = np.asarray(embeddings[start:end], dtype=np.float32)
+                
+                # Agregar a ChromaDB
+                write(
+                    documents=chunk,
+                    embeddings=chunk_embeddings.tolist(),
+                    metadatas=[metadata or None for metadata in metadatas[start:end]],
+                    ids=doc_ids[start:end]
+                )
+                for doc_id in doc_ids[start:end]:
+                    self._pending_documents.pop(doc_id, None)
             
-            # Agregar a ChromaDB
-            self.collection.add(
-                documents=[content],
-                embeddings=[embedding],
-                metadatas=[metadata or {}],
-                ids=[doc_id]
-            )
+            self._knowledge_changed()
             
-            logger.info(f"Documento agregado: {doc_id}")
-            return doc_id
+            if len(doc_ids) == 1:
+                logger.info(f"Documento agregado: {doc_ids[0]}")
+            else:
+                logger.info(f"{len(doc_ids)} documentos agregados en lote")
+            return doc_ids
             
         except Exception as e:
-            logger.error(f"Error agregando documento: {e}")
+            logger.error(f"Error agregando documentos: {e}")
+            # Los que no llegaron a escribirse salen de los índices en memoria
+            unwritten = [doc_id for doc_id in doc_ids if self._pending_documents.pop(doc_id, None) is not None]
+            written = set(self.collection.get(ids=unwritten, include=[])["ids"]) if unwritten else set()
+            self._unindex_documents([doc_id for doc_id in unwritten if doc_id not in written])
             raise
     
-    async def semantic_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        """Búsqueda semántica en la base de conocimiento"""
+    def delete_documents(self, doc_ids: List[str]):
+        """Eliminar documentos de la colección y de los índices en memoria"""
+        if not doc_ids:
+            return
+        self.collection.delete(ids=doc_ids)
+        self._unindex_documents(doc_ids)
+        self._knowledge_changed()
+        logger.info(f"{len(doc_ids)} documentos eliminados")
+    
+    async def sync_knowledge(self, documents: List[Dict[str, Any]], embeddings: np.ndarray = None,
+                             manifest_path: Path = None) -> Dict[str, int]:
+        """Sincronizar la colección con los documentos de knowledge_base/ escribiendo solo las diferencias"""
+        manifest_path = manifest_path or Path(KB_SYNC_MANIFEST_PATH)
+        manifest = load_manifest(manifest_path)
+        if manifest and len(self.collection.get(ids=list(manifest), include=[])["ids"]) < len(manifest):
+            # La colección no conserva lo sincronizado (efímera, en memoria o reiniciada): sincronización completa
+            logger.info("La colección no contiene el manifiesto anterior; sincronización completa")
+            manifest = {}
+        
+        plan = plan_sync(documents, manifest)
+        if not manifest and self.collection.count():
+            # Sin manifiesto: borrar las copias de cargas anteriores con otros IDs
+            existing = self.collection.get(include=["metadatas"])
+            sources = {doc["metadata"].get("source") for doc in documents if doc.get("metadata")} - {None}
+            replacements = {wine_key(doc.get("metadata")) for doc in plan.upserts} - {None}
+            stale = stale_documents(existing["ids"], existing["metadatas"], plan.manifest, sources, replacements)
+            if stale:
+                logger.info(f"{len(stale)} documentos de cargas anteriores se eliminan")
+            plan.deleted.extend(stale)
+        upserts = plan.upserts
+        if upserts:
+            upsert_embeddings = None
+            if embeddings is not None:
+                rows = {doc["id"]: row for row, doc in enumerate(documents)}
+                upsert_embeddings = np.asarray(embeddings[[rows[doc["id"]] for doc in upserts]], dtype=np.float32)
+            await self.add_documents(
+                [doc["content"] for doc in upserts],
+                [doc["metadata"] for doc in upserts],
+                [doc["id"] for doc in upserts],
+                embeddings=upsert_embeddings,
+                upsert=True
+            )
+        self.delete_documents(plan.deleted)
+        
         try:
-            query_embedding = self._embed_text(query)
-            
+            save_manifest(manifest_path, plan.manifest)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el manifiesto de sincronización {manifest_path}: {e}")
+        
+        self.last_sync = plan.counts()
+        logger.info(f"Base de conocimiento sincronizada: {self.last_sync}")
+        return self.last_sync
+    
+    def _format_results(self, results: Dict[str, Any], query_index: int = 0) -> List[Dict[str, Any]]:
+        """Convertir la respuesta de ChromaDB de una consulta en fuentes"""
+        formatted_results = []
+        if results['documents'] and results['documents'][query_index]:
+            for i, (doc_id, doc, metadata, distance) in enumerate(zip(
+                results['ids'][query_index],
+                results['documents'][query_index],
+                results['metadatas'][query_index],
+                results['distances'][query_index]
+            )):
+                formatted_results.append({
+                    'id': doc_id,
+                    'content': doc,
+                    'metadata': metadata or {},
+                    'relevance_score': 1 - distance,  # Convertir distancia a score
+                    'rank': i + 1
+                })
+        return formatted_results
+    
+    async def load_index_artifact(self, artifact: IndexArtifact):
+        """Cargar un artefacto de índice precalculado sin calcular embeddings"""
+        if isinstance(self.collection, NumpyVectorIndex):
+            # La matriz mapeada en memoria se usa directamente (compartida entre workers)
+            self.collection = NumpyVectorIndex.from_arrays(
+                artifact.ids, artifact.embeddings, artifact.documents, artifact.metadatas
+            )
+            self._doc_counter = None
+            self.lexical_index.clear()
+            self.wine_index.clear()
+            self.inventory.clear()
+            self._index_documents(artifact.ids, artifact.documents, artifact.metadatas)
+            self._knowledge_changed()
+        else:
+            documents = [
+                {"id": doc_id, "content": content, "metadata": metadata}
+                for doc_id, content, metadata in zip(artifact.ids, artifact.documents, artifact.metadatas)
+            ]
+            await self.sync_knowledge(documents, artifact.embeddings)
+        logger.info(f"Artefacto de índice {artifact.manifest['version']} cargado: {len(artifact.ids)} documentos")
+    
+    def compact_vectors(self):
+        """Con COMPACT_VECTOR_DIM, sustituir el índice numpy por su versión PCA + float16 ajustada al corpus"""
+        if isinstance(self.collection, NumpyVectorIndex):
+            self.collection = compact_index(self.collection)
+    
+    def _query_collection(self, query_embeddings: List[List[float]], n_results: int,
+                          filters: Optional[WineFilter] = None) -> List[List[Dict[str, Any]]]:
+        """Consulta vectorial con el filtro empujado como `where`; amplía n_results si faltan resultados válidos"""
+        where = filters.to_where() if filters else None
+        fetch = n_results
+        while True:
             results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=max_results,
+                query_embeddings=query_embeddings,
+                n_results=fetch,
+                where=where,
                 include=['documents', 'metadatas', 'distances']
             )
+            rankings = [self._format_results(results, i) for i in range(len(query_embeddings))]
+            if filters:
+                rankings = [[source for source in ranking if filters.matches(source['metadata'])]
+                            for ranking in rankings]
+            exhausted = all(len(ids) < fetch for ids in results['ids']) or fetch >= self.collection.count()
+            if exhausted or all(len(ranking) >= n_results for ranking in rankings):
+                break
+            fetch *= FILTER_OVERFETCH_FACTOR
+            logger.info(f"Búsqueda filtrada corta, ampliando a {fetch} resultados")
+        
+        for ranking in rankings:
+            del ranking[n_results:]
+            for rank, source in enumerate(ranking, 1):
+                source['rank'] = rank
+        return rankings
+    
+    def _hydrate_sources(self, doc_ids: List[str], known: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fuentes para IDs dados, reutilizando las ya recuperadas y leyendo el resto en una sola llamada"""
+        by_id = {source['id']: source for source in known}
+        missing = []
+        for doc_id in doc_ids:
+            if doc_id in by_id:
+                continue
+            if doc_id in self._pending_documents:
+                # Indexado pero aún sin escribir en la colección (embedding pendiente)
+                content, metadata = self._pending_documents[doc_id]
+                by_id[doc_id] = {'id': doc_id, 'content': content, 'metadata': metadata or {}, 'relevance_score': 0.0}
+            else:
+                missing.append(doc_id)
+        if missing:
+            fetched = self.collection.get(ids=missing, include=['documents', 'metadatas'])
+            for doc_id, doc, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+                by_id[doc_id] = {'id': doc_id, 'content': doc, 'metadata': metadata or {}, 'relevance_score': 0.0}
+        return [dict(by_id[doc_id]) for doc_id in doc_ids if doc_id in by_id]
+    
+    def _lexical_ranking(self, query: str, max_results: int, filters: Optional[WineFilter] = None,
+                         known: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Ranking BM25 de la consulta como fuentes (relevancia normalizada al mejor resultado)"""
+        hits = self.lexical_index.search(query, max_results, filters.matches if filters else None)
+        if not hits:
+            return []
+        sources = self._hydrate_sources([doc_id for doc_id, _ in hits], known or [])
+        top_score = hits[0][1]
+        scores = dict(hits)
+        for rank, source in enumerate(sources, 1):
+            source['bm25_score'] = scores[source['id']]
+            source['relevance_score'] = max(source.get('relevance_score', 0), scores[source['id']] / top_score)
+            source['rank'] = rank
+        return sources
+    
+    def _decisive_name_match(self, query: str, filters: Optional[WineFilter] = None) -> Optional[str]:
+        """ID del vino si la consulta contiene el nombre completo de exactamente un vino"""
+        if not HYBRID_RETRIEVAL:
+            return None
+        matches = self.lexical_index.match_names(query)
+        if len(matches) != 1:
+            return None
+        if filters and not filters.matches(self.lexical_index.metadata(matches[0])):
+            return None
+        return matches[0]
+    
+    def lookup_wines(self, names: List[str]) -> List[Dict[str, Any]]:
+        """Resolver nombres de vino con el índice de nombres y una sola lectura por IDs de la colección"""
+        resolved = [self.wine_index.resolve(name) for name in names]
+        doc_ids = list(dict.fromkeys(match[1][0] for match in resolved if match))
+        sources = {source['id']: source for source in self._hydrate_sources(doc_ids, [])} if doc_ids else {}
+        
+        lookups = []
+        for name, match in zip(names, resolved):
+            source = sources.get(match[1][0]) if match else None
+            lookups.append({
+                'query': name,
+                'source': source,
+                'wine': wine_fields(source['metadata'], source['content']) if source else None,
+                'similarity': match[2] if source else 0.0,
+                'suggestions': [] if source else self.wine_index.suggest(name)
+            })
+        return lookups
+    
+    def wines_by_id(self, doc_ids: List[str]) -> List[Dict[str, Any]]:
+        """Campos de los vinos indicados, en el mismo orden, con una sola lectura de la colección"""
+        return [wine_fields(source['metadata'], source['content']) for source in self._hydrate_sources(doc_ids, [])]
+    
+    def structured_search(self, filters: WineFilter, max_results: int = 5) -> List[Dict[str, Any]]:
+        """Vinos que cumplen los filtros, resueltos sobre el catálogo columnar sin embeddings ni LLM"""
+        mask = self.inventory.mask(
+            filters.wine_type, filters.region, filters.price_min, filters.price_max,
+            filters.rating_min, filters.rating_max, filters.vintage_min, filters.vintage_max
+        )
+        sources = self._hydrate_sources(self.inventory.top_rated(mask, max_results), [])
+        for rank, source in enumerate(sources, 1):
+            source['relevance_score'] = 1.0
+            source['rank'] = rank
+        return sources
+    
+    async def semantic_search(self, query: str, max_results: int = 5,
+                              filters: Optional[WineFilter] = None) -> List[Dict[str, Any]]:
+        """Búsqueda híbrida en la base de conocimiento: vectorial + BM25, opcionalmente filtrada por metadatos"""
+        try:
+            if self._lexical_only():
+                self.lexical_fallbacks += 1
+                return self._lexical_ranking(query, max_results, filters)
             
-            formatted_results = []
-            if results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['distances'][0]
-                )):
-                    formatted_results.append({
-                        'content': doc,
-                        'metadata': metadata,
-                        'relevance_score': 1 - distance,  # Convertir distancia a score
-                        'rank': i + 1
-                    })
+            query_embedding = await self.embed_query(query)
+            vector_ranking = self._query_collection([query_embedding], max_results, filters)[0]
+            if not HYBRID_RETRIEVAL:
+                return vector_ranking
             
-            return formatted_results
+            lexical_ranking = self._lexical_ranking(query, max_results, filters, vector_ranking)
+            return fuse_rankings([vector_ranking, lexical_ranking], RETRIEVAL_FUSION)[:max_results]
             
         except Exception as e:
             logger.error(f"Error en búsqueda semántica: {e}")
             return []
     
+    async def multi_query_search(self, queries: List[str], max_results: int = 5,
+                                 filters: Optional[WineFilter] = None) -> List[List[Dict[str, Any]]]:
+        """Búsqueda semántica de varias consultas con un solo encode y una sola consulta a ChromaDB"""
+        try:
+            query_embeddings = await self.embed_texts(queries, queries=True)
+            return self._query_collection(query_embeddings.tolist(), max_results, filters)
+            
+        except Exception as e:
+            logger.error(f"Error en búsqueda multi-consulta: {e}")
+            return []
+    
     async def agentic_query_expansion(self, query: str, context: Dict[str, Any] = None) -> List[str]:
         """Expansión agéntica de consultas usando LLM"""
-        if not self.openai_client:
+        if not self.llm:
             return [query]  # Fallback si no hay OpenAI
         
         try:
-            system_prompt = """Eres un experto en expandir consultas para mejorar la recuperación de información.
-            Dado una consulta del usuario, genera variaciones y reformulaciones que puedan ayudar a encontrar información relevante.
-            Incluye sinónimos, términos relacionados y diferentes formas de expresar la misma pregunta.
-            
-            Responde con un JSON que contenga una lista de consultas expandidas."""
-            
-            user_prompt = f"""
-            Consulta original: "{query}"
-            Contexto adicional: {json.dumps(context or {}, indent=2)}
-            
-            Genera 3-5 variaciones de esta consulta para mejorar la búsqueda.
-            """
+            system_prompt = ("Eres un experto en expandir consultas para mejorar la recuperación de información. "
+                             "Dado una consulta del usuario, genera variaciones y reformulaciones que puedan ayudar a encontrar información relevante. "
+                             "Incluye sinónimos, términos relacionados y diferentes formas de expresar la misma pregunta.\n"
+                             "Responde con un JSON que contenga una lista de consultas expandidas.")
+
+            extra_context = compact_context(context)
+            user_prompt = f'Consulta original: "{query}"\n'
+            if extra_context:
+                user_prompt += f"Contexto adicional: {extra_context}\n"
+            user_prompt += "Genera 3-5 variaciones de esta consulta para mejorar la búsqueda."
             
-            response = self.openai_client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
+            response = await self.llm.complete(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
+                stage="expansion",
                 temperature=0.7,
                 max_tokens=500
             )
             
-            result = response.choices[0].message.content
+            result = response.text
             
             # Intentar parsear JSON
             try:
@@ -216,94 +664,280 @@ class AgenticRAGEngine:
                     return [query] + expanded_queries[:4]  # Original + 4 expansiones max
                 elif isinstance(expanded_queries, dict) and 'queries' in expanded_queries:
                     return [query] + expanded_queries['queries'][:4]
-            except:
-                # Si falla el parsing, usar la consulta original
+            except json.JSONDecodeError:
                 pass
             
+            # Respuesta no interpretable: se usa la consulta original
+            self.llm_expansion_failures += 1
+            logger.warning(f"Expansión por LLM no interpretable: {result[:100]!r}")
             return [query]
             
         except Exception as e:
             logger.error(f"Error en expansión de consulta: {e}")
             return [query]
     
-    async def generate_answer(self, query: str, sources: List[Dict[str, Any]], context: Dict[str, Any] = None) -> str:
+    def load_thesaurus(self, knowledge_dir: Path):
+        """Cargar el tesauro de expansión local si QUERY_EXPANSION lo usa"""
+        if self.query_expansion not in ("thesaurus", "hybrid"):
+            return
+        try:
+            self.thesaurus = Thesaurus.load(knowledge_dir)
+            logger.info(f"Tesauro de expansión: {len(self.thesaurus)} términos")
+        except Exception as e:
+            logger.error(f"Error cargando el tesauro, se usa la consulta sin expandir: {e}")
+    
+    async def expand_query(self, query: str, context: Dict[str, Any] = None) -> Tuple[List[str], List[str]]:
+        """Expansión según QUERY_EXPANSION. Devuelve las consultas para la búsqueda vectorial y las
+        consultas para BM25: la original más las variantes del tesauro, que usan el vocabulario de los documentos"""
+        queries = [query]
+        if self.query_expansion in ("thesaurus", "hybrid") and self.thesaurus:
+            queries = self.thesaurus.expand(query)
+            if len(queries) > 1:
+                self.thesaurus_expansions += 1
+        lexical_queries = list(queries)
+        if self.query_expansion in ("llm", "hybrid") and self.llm:
+            self.llm_expansions += 1
+            expanded = await self.agentic_query_expansion(query, context)
+            queries += [variant for variant in expanded if isinstance(variant, str) and variant not in queries]
+        return queries, lexical_queries
+    
+    async def expanded_search(self, query: str, context: Dict[str, Any] = None, max_results: int = 5,
+                              filters: Optional[WineFilter] = None) -> List[Dict[str, Any]]:
+        """Expansión de la consulta, búsqueda multi-consulta en una sola pasada y fusión con BM25"""
+        expanded_queries, lexical_queries = await self.expand_query(query, context)
+        logger.info(f"Consultas expandidas: {expanded_queries}")
+        
+        rankings = await self.multi_query_search(expanded_queries, max_results=max_results, filters=filters)
+        if HYBRID_RETRIEVAL:
+            known = [source for ranking in rankings for source in ranking]
+            rankings += [self._lexical_ranking(lexical_query, max_results, filters, known)
+                         for lexical_query in lexical_queries]
+        
+        # Fusión de rankings por ID de documento
+        return fuse_rankings(rankings, RETRIEVAL_FUSION)[:max_results]
+    
+    async def adaptive_search(self, query: str, context: Dict[str, Any] = None, max_results: int = 5,
+                              filters: Optional[WineFilter] = None, deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Búsqueda con la consulta original; se expande solo si el mejor resultado vectorial no es
+        concluyente y, con `deadline` (time.monotonic()), si queda tiempo para la expansión"""
+        gate = self.expansion_gate
+        if not gate.enabled or self.query_expansion == "none":
+            return await self.expanded_search(query, context, max_results, filters)
+        
+        query_embedding = await self.embed_query(query)
+        vector_ranking = self._query_collection([query_embedding], max_results, filters)[0]
+        sources = vector_ranking
+        if HYBRID_RETRIEVAL:
+            lexical_ranking = self._lexical_ranking(query, max_results, filters, vector_ranking)
+            sources = fuse_rankings([vector_ranking, lexical_ranking], RETRIEVAL_FUSION)[:max_results]
+        
+        # La confianza se mide con la relevancia vectorial (la BM25 está normalizada al mejor resultado)
+        remaining_ms = (deadline - time.monotonic()) * 1000 if deadline is not None else None
+        expand, reason = gate.decide([source['relevance_score'] for source in vector_ranking], remaining_ms)
+        if not expand:
+            logger.info(f"Expansión omitida ({reason})")
+            if reason == "confident" and gate.should_shadow():
+                task = asyncio.create_task(self._shadow_expansion(query, context, max_results, filters, sources))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return sources
+        
+        start = time.perf_counter()
+        expanded = await self.expanded_search(query, context, max_results, filters)
+        gate.observe_latency((time.perf_counter() - start) * 1000)
+        gate.record_recall([source['id'] for source in sources], [source['id'] for source in expanded])
+        return expanded
+    
+    async def _shadow_expansion(self, query: str, context: Optional[Dict[str, Any]], max_results: int,
+                                filters: Optional[WineFilter], sources: List[Dict[str, Any]]):
+        """Expansión en segundo plano de una consulta no expandida, solo para medir su recall"""
+        try:
+            expanded = await self.expanded_search(query, context, max_results, filters)
+            self.expansion_gate.record_recall([source['id'] for source in sources],
+                                              [source['id'] for source in expanded], expanded=False)
+        except Exception as e:
+            logger.warning(f"Error en la expansión en sombra: {e}")
+    
+    def pack_context(self, sources: List[Dict[str, Any]]) -> PackedContext:
+        """Fuentes del prompt dentro de CONTEXT_TOKEN_BUDGET, contabilizadas para /metrics"""
+        packed = pack_sources(sources)
+        self.packed_prompts += 1
+        self.packed_context_tokens += packed.tokens
+        self.packed_dropped_sources += packed.dropped
+        return packed
+    
+    async def generate_answer(self, query: str, sources: List[Dict[str, Any]], context: Dict[str, Any] = None,
+                              raise_errors: bool = False) -> str:
         """Generar respuesta usando LLM con fuentes recuperadas"""
-        if not self.openai_client:
+        if not self.llm:
             # Fallback sin LLM
             return f"Basado en {len(sources)} fuentes encontradas para: '{query}'"
         
         try:
-            # Construir contexto de fuentes
-            sources_text = "\n\n".join([
-                f"Fuente {i+1} (relevancia: {source.get('relevance_score', 0):.2f}):\n{source['content']}"
-                for i, source in enumerate(sources[:3])  # Máximo 3 fuentes
-            ])
-            
-            system_prompt = """Eres un asistente inteligente que responde preguntas basándose en fuentes proporcionadas.
-            Usa SOLAMENTE la información de las fuentes para responder. Si la información no está en las fuentes, dilo claramente.
-            Cita las fuentes relevantes en tu respuesta."""
-            
-            user_prompt = f"""
-            Pregunta: {query}
-            
-            Contexto adicional: {json.dumps(context or {}, indent=2)}
-            
-            Fuentes disponibles:
-            {sources_text}
-            
-            Responde la pregunta basándote únicamente en las fuentes proporcionadas.
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
+            # Construir contexto de fuentes dentro del presupuesto de tokens (ordenadas por relevancia)
+            packed = self.pack_context(sources)
+
+            system_prompt = ("Eres un asistente inteligente que responde preguntas basándose en fuentes proporcionadas. "
+                             "Usa SOLAMENTE la información de las fuentes para responder. Si la información no está en las fuentes, dilo claramente. "
+                             "Cita las fuentes relevantes en tu respuesta por su número.")
+
+            # Sin indentación: los espacios del prompt también son tokens
+            extra_context = compact_context(context)
+            user_prompt = f"Pregunta: {query}\n"
+            if extra_context:
+                user_prompt += f"Contexto adicional: {extra_context}\n"
+            user_prompt += f"Fuentes:\n{packed.text}\n\nResponde la pregunta basándote únicamente en las fuentes proporcionadas."
+
+            response = await self.llm.complete(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
+                stage="answer",
                 temperature=0.3,
                 max_tokens=1000
             )
             
-            return response.choices[0].message.content
+            return response.text
             
         except Exception as e:
             logger.error(f"Error generando respuesta: {e}")
+            if raise_errors:
+                raise
             return f"Error generando respuesta basada en {len(sources)} fuentes para: '{query}'"
     
-    async def agentic_rag_query(self, query: str, context: Dict[str, Any] = None, max_results: int = 5) -> RAGResponse:
-        """Consulta RAG agéntica completa"""
+    async def pair_menu(self, dishes: List[str], event_style: str = "casual",
+                        guests: int = 4) -> Dict[str, Any]:
+        """Maridaje de un menú: un encode por lotes, una consulta para todos los platos y como mucho una llamada LLM"""
+        queries = [f"vino maridaje {dish} {event_style}" for dish in dishes]
+        candidates = max(MENU_CANDIDATES_PER_DISH, len(dishes) + 2)
+        filters = WineFilter(type="vino")
+        
+        # Recuperación de todos los platos en una sola pasada (vectorial + BM25 por plato)
+        if self._lexical_only():
+            self.lexical_fallbacks += 1
+            rankings = [[] for _ in dishes]
+        else:
+            query_embeddings = await self.embed_texts(queries, queries=True)
+            rankings = self._query_collection(query_embeddings.tolist(), candidates, filters)
+        if HYBRID_RETRIEVAL:
+            pool = [source for ranking in rankings for source in ranking]
+            rankings = [
+                fuse_rankings([ranking, self._lexical_ranking(dish, candidates, filters, pool)], RETRIEVAL_FUSION)
+                for dish, ranking in zip(dishes, rankings)
+            ]
+        
+        courses = assign_wines(rankings, guests)
+        narrative = None
+        if self.llm and any(courses):
+            menu_text = "\n".join(
+                f"- {dish}: {course['wine']['name']} ({course['wine'].get('wine_type')}, {course['wine'].get('region')})"
+                for dish, course in zip(dishes, courses) if course
+            )
+            try:
+                response = await self.llm.complete(
+                    [
+                        {"role": "system", "content": "Eres un sumiller. Explica brevemente por qué cada vino marida con su plato, en el orden del menú."},
+                        {"role": "user", "content": f"Evento {event_style} para {guests} comensales.\nMenú:\n{menu_text}"}
+                    ],
+                    stage="menu",
+                    temperature=0.5,
+                    max_tokens=600
+                )
+                narrative = response.text
+            except Exception as e:
+                logger.error(f"Error generando la narrativa del menú: {e}")
+        
+        return {"courses": courses, "narrative": narrative}
+    
+    async def agentic_rag_query(self, query: str, context: Dict[str, Any] = None, max_results: int = 5,
+                                filters: Optional[WineFilter] = None, parse_constraints: bool = True,
+                                latency_budget_ms: Optional[float] = None, generate: bool = True) -> RAGResponse:
+        """Consulta RAG agéntica completa; `filters` restringe la recuperación por metadatos
+        
+        Con `parse_constraints`, las restricciones de la consulta (tipo, región, precio, añada,
+        puntuación) se convierten en filtros; si no queda texto libre se responde desde el catálogo.
+        `latency_budget_ms` (por defecto QUERY_LATENCY_BUDGET_MS) desactiva la expansión si no queda tiempo.
+        Con `generate=False` solo se recuperan fuentes (sin llamada al LLM) y `answer` queda vacío.
+        """
+        budget_ms = QUERY_LATENCY_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+        deadline = time.monotonic() + budget_ms / 1000 if budget_ms > 0 else None
         try:
-            # 1. Expansión agéntica de consulta
-            expanded_queries = await self.agentic_query_expansion(query, context)
-            logger.info(f"Consultas expandidas: {expanded_queries}")
-            
-            # 2. Búsqueda semántica multi-consulta
-            all_sources = []
-            for exp_query in expanded_queries:
-                sources = await self.semantic_search(exp_query, max_results=3)
-                all_sources.extend(sources)
+            # 0. Restricciones deterministas: completan los filtros explícitos y dejan el texto libre
+            retrieval_query = query
+            structured = False
+            if parse_constraints:
+                parsed = self.query_parser.parse(query)
+                if parsed.has_constraints:
+                    self.constraint_queries += 1
+                    filters = merge_filters(filters, parsed.filters)
+                    retrieval_query = parsed.free_text or query
+                    structured = parsed.structured
+                    logger.info(f"Restricciones extraídas: {parsed.constraints}, texto libre: '{parsed.free_text}'")
             
-            # 3. Deduplicación y ranking
-            seen_content = set()
-            unique_sources = []
-            for source in all_sources:
-                content_hash = hash(source['content'][:100])  # Hash de los primeros 100 chars
-                if content_hash not in seen_content:
-                    seen_content.add(content_hash)
-                    unique_sources.append(source)
+            # Caché semántica indexada por el embedding de la consulta
+            scope = {
+                "max_results": max_results,
+                "context": context or {},
+                "filters": filters.cache_key() if filters else None
+            }
+            if not generate:
+                # Las respuestas sin texto no deben servirse a consultas que sí lo piden
+                scope["retrieval_only"] = True
+            cache_scope = json.dumps(scope, sort_keys=True, default=str)
+            query_embedding = None
+            lexical_only = self._lexical_only()
+            if self.semantic_cache and not lexical_only and not structured:
+                query_embedding = await self.embed_query(query)
+                cached = self.semantic_cache.lookup(query_embedding, self.kb_version, cache_scope)
+                if cached is not None:
+                    return cached
+            kb_version = self.kb_version
             
-            # Ordenar por relevancia
-            unique_sources.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
-            top_sources = unique_sources[:max_results]
+            named_id = self._decisive_name_match(query, filters)
+            if named_id:
+                # Atajo: la consulta nombra un vino concreto, sin expansión por LLM
+                self.name_shortcuts += 1
+                logger.info(f"Coincidencia exacta de nombre: {named_id}, se omite la expansión")
+                sources = await self.semantic_search(query, max_results, filters)
+                named = self._hydrate_sources([named_id], sources)
+                top_sources = named + [source for source in sources if source['id'] != named_id]
+                top_sources = top_sources[:max_results]
+                for rank, source in enumerate(top_sources, 1):
+                    source['rank'] = rank
+            elif structured:
+                # Consulta completamente estructurada: filtro de metadatos, sin expansión ni embeddings
+                self.structured_queries += 1
+                top_sources = self.structured_search(filters, max_results)
+            elif lexical_only:
+                # Modelo aún cargando: ranking BM25 de la consulta original
+                self.lexical_fallbacks += 1
+                top_sources = self._lexical_ranking(retrieval_query, max_results, filters)
+            else:
+                # 1-3. Búsqueda del texto libre y, si no es concluyente, expansión (tesauro y/o LLM),
+                # búsqueda multi-consulta y fusión
+                top_sources = await self.adaptive_search(retrieval_query, context, max_results, filters, deadline)
             
-            # 4. Generación de respuesta
-            answer = await self.generate_answer(query, top_sources, context)
+            # 4. Generación de respuesta (las respuestas fallidas no se cachean)
+            cacheable = bool(top_sources)
+            answer = ""
+            if not generate:
+                self.retrieval_only_queries += 1
+            else:
+                try:
+                    answer = await self.generate_answer(query, top_sources, context, raise_errors=True)
+                except Exception:
+                    answer = f"Error generando respuesta basada en {len(top_sources)} fuentes para: '{query}'"
+                    cacheable = False
             
-            return RAGResponse(
+            response = RAGResponse(
                 answer=answer,
                 sources=top_sources,
                 context_used=context or {}
             )
+            if self.semantic_cache and cacheable and query_embedding is not None:
+                self.semantic_cache.store(query_embedding, response, kb_version, cache_scope)
+            return response
             
         except Exception as e:
             logger.error(f"Error en consulta RAG agéntica: {e}")
@@ -340,6 +974,27 @@ async def list_tools() -> List[types.Tool]:
                         "minimum": 1,
                         "maximum": 20,
                         "default": 5
+                    },
+                    "tipo_vino": {
+                        "type": "string",
+                        "description": "Filtrar por tipo de vino (opcional)",
+                        "enum": ["Tinto", "Blanco", "Espumoso"]
+                    },
+                    "region": {
+                        "type": "string",
+                        "description": "Filtrar por región exacta (opcional, ej: 'Rioja')"
+                    },
+                    "precio_min": {
+                        "type": "number",
+                        "description": "Precio mínimo en euros (opcional)"
+                    },
+                    "precio_max": {
+                        "type": "number",
+                        "description": "Precio máximo en euros (opcional)"
+                    },
+                    "puntuacion_min": {
+                        "type": "number",
+                        "description": "Puntuación mínima sobre 100 (opcional)"
                     }
                 },
                 "required": ["consulta"]
@@ -631,19 +1286,175 @@ async def list_tools() -> List[types.Tool]:
         )
     ]
 
+# Temperaturas de servicio por estilo de vino
+TEMPERATURAS_SERVICIO = {
+    "tinto_joven": "14-16°C",
+    "tinto_crianza": "16-18°C",
+    "tinto_reserva": "17-19°C",
+    "blanco_joven": "8-10°C",
+    "blanco_crianza": "10-12°C",
+    "rosado": "8-10°C",
+    "espumoso": "6-8°C",
+    "dulce": "6-8°C",
+    "fortificado": "12-16°C"
+}
+
+def _quality_label(rating: Optional[float]) -> str:
+    """Calificación cualitativa a partir de la puntuación"""
+    if rating is None:
+        return "N/A"
+    if rating >= 95:
+        return "Excepcional"
+    if rating >= 90:
+        return "Excelente"
+    if rating >= 85:
+        return "Muy bueno"
+    return "Bueno"
+
+def _service_style(wine: Dict[str, Any], style: Optional[str]) -> Optional[str]:
+    """Clave de TEMPERATURAS_SERVICIO según tipo y estilo de edad del vino (sin añada: joven)"""
+    wine_type = (wine.get('wine_type') or "").lower()
+    style = style or "joven"
+    if wine_type == "tinto":
+        return {"joven": "tinto_joven", "crianza": "tinto_crianza"}.get(style, "tinto_reserva")
+    if wine_type == "blanco":
+        return "blanco_joven" if style == "joven" else "blanco_crianza"
+    return wine_type if wine_type in TEMPERATURAS_SERVICIO else None
+
+def _format_wine_analysis(wine: Dict[str, Any], aspectos: List[str], reference_year: Optional[int]) -> str:
+    """Ficha de análisis de un vino a partir de sus metadatos; la edad se mide desde `reference_year`
+    (añada más reciente del catálogo), igual que en las recomendaciones por región"""
+    vintage = wine.get('vintage')
+    style = wine_style(vintage, reference_year) if isinstance(vintage, (int, float)) else None
+    aged = style in ("reserva", "gran_reserva")
+    wine_type = (wine.get('wine_type') or "").lower()
+    
+    result = f"🍷 **Análisis de**: {wine['name']}\n\n"
+    result += f"• Tipo: {wine.get('wine_type') or 'N/A'}\n"
+    result += f"• Región: {wine.get('region') or 'N/A'}\n"
+    result += f"• Añada: {wine.get('vintage') or 'N/A'}\n"
+    result += f"• Precio: {wine['price'] if wine.get('price') is not None else 'N/A'}€\n"
+    result += f"• Puntuación: {wine['rating'] if wine.get('rating') is not None else 'N/A'}/100 ({_quality_label(wine.get('rating'))})\n\n"
+    
+    for aspecto in aspectos:
+        if aspecto in ("aromas", "sabores"):
+            # La descripción cubre ambos aspectos: se muestra una sola vez
+            if aspecto == "sabores" and "aromas" in aspectos:
+                continue
+            label = "Aromas y sabores" if {"aromas", "sabores"} <= set(aspectos) else aspecto.title()
+            result += f"**{label}**: {wine.get('description') or 'Sin descripción disponible'}\n"
+        elif aspecto == "estructura":
+            if wine_type == "tinto":
+                estructura = "taninos pulidos por la crianza y buena integración" if aged else "taninos presentes y cuerpo medio-alto"
+            elif wine_type == "espumoso":
+                estructura = "burbuja fina, acidez marcada y cuerpo ligero"
+            else:
+                estructura = "acidez fresca y cuerpo ligero-medio"
+            result += f"**Estructura**: {estructura}\n"
+        elif aspecto == "maridajes":
+            result += f"**Maridajes**: {wine.get('pairing') or 'Maridaje versátil'}\n"
+        elif aspecto == "temperatura":
+            service = _service_style(wine, style)
+            result += f"**Temperatura de servicio**: {TEMPERATURAS_SERVICIO[service] if service else 'N/A'}\n"
+        elif aspecto == "decantacion":
+            if wine_type == "tinto" and style == "gran_reserva":
+                decantacion = "decantar con cuidado para separar posibles sedimentos"
+            elif wine_type == "tinto":
+                decantacion = "decantar 30-60 minutos para oxigenar"
+            else:
+                decantacion = "no necesita decantación"
+            result += f"**Decantación**: {decantacion}\n"
+        elif aspecto == "guarda":
+            rating = wine.get('rating') or 0
+            if wine_type == "tinto" and rating >= 90:
+                guarda = "potencial de guarda alto (10+ años desde la añada)"
+            elif rating >= 90:
+                guarda = "potencial de guarda medio (5-8 años desde la añada)"
+            else:
+                guarda = "consumir preferentemente en los próximos años"
+            result += f"**Guarda**: {guarda}\n"
+    return result
+
+# Criterio de comparación -> (etiqueta, valor a mostrar)
+_COMPARISON_ROWS = {
+    "precio": ("Precio", lambda wine: f"{wine['price']}€" if wine.get('price') is not None else "N/A"),
+    "calidad": ("Calidad", lambda wine: _quality_label(wine.get('rating'))),
+    "puntuacion": ("Puntuación", lambda wine: f"{wine['rating']}/100" if wine.get('rating') is not None else "N/A"),
+    "region": ("Región", lambda wine: wine.get('region') or "N/A"),
+    "tipo": ("Tipo", lambda wine: wine.get('wine_type') or "N/A"),
+    "añada": ("Añada", lambda wine: str(wine.get('vintage') or "N/A")),
+    "maridajes": ("Maridajes", lambda wine: wine.get('pairing') or "N/A"),
+}
+
+def _format_wine_comparison(wines: List[Dict[str, Any]], criterios: List[str]) -> str:
+    """Tabla comparativa de vinos a partir de sus metadatos"""
+    result = "⚖️ **Comparación de vinos**\n\n"
+    result += "| Criterio | " + " | ".join(wine['name'] for wine in wines) + " |\n"
+    result += "|---|" + "---|" * len(wines) + "\n"
+    for criterio in criterios:
+        if criterio in _COMPARISON_ROWS:
+            label, value = _COMPARISON_ROWS[criterio]
+            result += f"| {label} | " + " | ".join(value(wine) for wine in wines) + " |\n"
+    
+    priced = [wine for wine in wines if wine.get('price')]
+    rated = [wine for wine in wines if wine.get('rating') is not None]
+    result += "\n"
+    if priced:
+        result += f"💰 **Más económico**: {min(priced, key=lambda wine: wine['price'])['name']}\n"
+    if rated:
+        result += f"🏆 **Mejor puntuado**: {max(rated, key=lambda wine: wine['rating'])['name']}\n"
+    valued = [wine for wine in priced if wine.get('rating') is not None]
+    if valued:
+        best_value = max(valued, key=lambda wine: wine['rating'] / wine['price'])
+        result += f"⭐ **Mejor relación calidad-precio**: {best_value['name']}\n"
+    return result
+
+def _format_grouped_stats(title: str, groups: Dict[str, Dict[str, Any]], by_label: bool = False) -> str:
+    """Tabla de un agregado por región, tipo o añada (ordenada por valor o por etiqueta)"""
+    result = f"\n**{title}**\n\n| | Vinos | Stock | Valor |\n|---|---|---|---|\n"
+    order = sorted(groups.items()) if by_label else sorted(groups.items(), key=lambda item: item[1]['valor'], reverse=True)
+    for label, group in order:
+        result += f"| {label} | {group['vinos']} | {group['stock']} | {group['valor']:,.2f}€ |\n"
+    return result
+
+def _format_recommendations(wines: List[Dict[str, Any]]) -> str:
+    """Lista numerada de vinos recomendados"""
+    result = ""
+    for i, wine in enumerate(wines, 1):
+        result += f"**{i}. {wine['name']}**\n"
+        result += f"   • Tipo: {wine.get('wine_type') or 'N/A'}\n"
+        result += f"   • Región: {wine.get('region') or 'N/A'}\n"
+        result += f"   • Añada: {wine.get('vintage') or 'N/A'}\n"
+        result += f"   • Precio: {wine['price'] if wine.get('price') is not None else 'N/A'}€\n"
+        result += f"   • Puntuación: {wine['rating'] if wine.get('rating') is not None else 'N/A'}/100\n"
+        result += f"   • Maridaje: {wine.get('pairing') or 'N/A'}\n\n"
+    return result
+
 @mcp_server.call_tool()
 async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
     """Ejecutar herramientas"""
     try:
+        # Durante el arranque en segundo plano las herramientas esperan a la vector DB, no al modelo
+        await rag_engine.ensure_initialized()
+        
         # === HERRAMIENTAS RAG BÁSICAS ===
         if name == "buscar_vinos":
             consulta = arguments.get("consulta", "")
             max_resultados = arguments.get("max_resultados", 5)
             
-            response = await rag_engine.agentic_rag_query(consulta, max_results=max_resultados)
-            
-            # Filtrar solo vinos
-            vinos = [source for source in response.sources if source.get('metadata', {}).get('type') == 'vino']
+            # Filtros empujados a la búsqueda vectorial: todos los resultados son vinos válidos
+            filtro = WineFilter(
+                type="vino",
+                wine_type=arguments.get("tipo_vino"),
+                region=arguments.get("region"),
+                price_min=arguments.get("precio_min"),
+                price_max=arguments.get("precio_max"),
+                rating_min=arguments.get("puntuacion_min")
+            )
+            # La herramienta solo formatea las fuentes: sin generación de respuesta
+            response = await rag_engine.agentic_rag_query(consulta, max_results=max_resultados, filters=filtro,
+                                                          generate=False)
+            vinos = response.sources
             
             result = f"🍷 **Búsqueda de vinos**: '{consulta}'\n\n"
             result += f"**Encontrados**: {len(vinos)} vinos\n\n"
@@ -681,15 +1492,12 @@ async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
             
             # Expandir la consulta para maridaje
             consulta_maridaje = f"vino maridaje {plato} {ocasion}"
-            response = await rag_engine.agentic_rag_query(consulta_maridaje, max_results=5)
-            
-            # Filtrar vinos y aplicar filtro de presupuesto si existe
-            vinos_sugeridos = []
-            for source in response.sources:
-                if source.get('metadata', {}).get('type') == 'vino':
-                    precio = source.get('metadata', {}).get('price', 0)
-                    if presupuesto_max is None or (precio and precio <= presupuesto_max):
-                        vinos_sugeridos.append(source)
+            # Solo vinos dentro del presupuesto, filtrados durante la recuperación
+            filtro = WineFilter(type="vino", price_max=presupuesto_max)
+            # El plato no se analiza como restricciones ("pescado blanco" no es un tipo de vino)
+            response = await rag_engine.agentic_rag_query(consulta_maridaje, max_results=5, filters=filtro,
+                                                          parse_constraints=False, generate=False)
+            vinos_sugeridos = response.sources
             
             result = f"🍽️ **Sugerencias de maridaje para**: {plato}\n"
             result += f"**Ocasión**: {ocasion.title()}\n"
@@ -713,12 +1521,159 @@ async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
             
             return [types.TextContent(type="text", text=result)]
 
+        elif name == "crear_menu_maridaje":
+            platos = [plato for plato in arguments.get("platos", []) if plato][:6]
+            estilo_evento = arguments.get("estilo_evento", "casual")
+            num_comensales = arguments.get("num_comensales", 4)
+            if len(platos) < 2:
+                return [types.TextContent(type="text", text="❌ El menú necesita al menos 2 platos")]
+            
+            menu = await rag_engine.pair_menu(platos, estilo_evento, num_comensales)
+            
+            result = f"🍽️ **Menú maridaje** ({estilo_evento.title()}, {num_comensales} comensales)\n\n"
+            total_botellas = 0
+            coste_total = 0.0
+            for i, (plato, curso) in enumerate(zip(platos, menu['courses']), 1):
+                result += f"**{i}. {plato}**\n"
+                if not curso:
+                    result += "   • Sin vino recomendado para este plato\n\n"
+                    continue
+                vino = curso['wine']
+                precio = vino.get('price')
+                total_botellas += curso['bottles']
+                if precio is not None:
+                    coste_total += precio * curso['bottles']
+                result += f"   • Vino: {vino['name']} ({vino.get('wine_type') or 'N/A'}, {vino.get('region') or 'N/A'})\n"
+                result += f"   • Botellas: {curso['bottles']} × {precio if precio is not None else 'N/A'}€\n"
+                if vino.get('pairing'):
+                    result += f"   • Maridaje: {vino['pairing']}\n"
+                if curso['repeated']:
+                    result += "   • ℹ️ Vino repetido de otro plato\n"
+                if not curso['stock_ok']:
+                    result += f"   • ⚠️ Stock insuficiente ({vino.get('stock')} botellas disponibles)\n"
+                result += "\n"
+            
+            result += f"**Total**: {total_botellas} botellas, {coste_total:,.2f}€\n"
+            if menu['narrative']:
+                result += f"\n**Notas del sumiller:**\n{menu['narrative']}\n"
+            return [types.TextContent(type="text", text=result)]
+
+        elif name == "analizar_vino":
+            nombre_vino = arguments.get("nombre_vino", "")
+            aspectos = arguments.get("aspectos") or ["aromas", "sabores", "maridajes"]
+            
+            lookup = rag_engine.lookup_wines([nombre_vino])[0]
+            if not lookup['wine']:
+                result = f"❌ No se encontró el vino '{nombre_vino}'\n"
+                if lookup['suggestions']:
+                    result += "\n**¿Quizás buscabas?**\n"
+                    result += "".join(f"• {sugerencia}\n" for sugerencia in lookup['suggestions'])
+                return [types.TextContent(type="text", text=result)]
+            
+            result = _format_wine_analysis(lookup['wine'], aspectos, rag_engine.inventory.newest_vintage())
+            if lookup['similarity'] < 1.0:
+                result += f"\n_Coincidencia aproximada para '{nombre_vino}'_\n"
+            return [types.TextContent(type="text", text=result)]
+        
+        elif name == "comparar_vinos":
+            nombres = arguments.get("vinos", [])[:4]
+            criterios = arguments.get("criterios") or ["precio", "calidad", "puntuacion"]
+            if len(nombres) < 2:
+                return [types.TextContent(type="text", text="❌ Indica al menos 2 vinos para comparar")]
+            
+            # Resolución de todos los nombres con una sola lectura por IDs
+            lookups = rag_engine.lookup_wines(nombres)
+            encontrados = [lookup['wine'] for lookup in lookups if lookup['wine']]
+            no_encontrados = [lookup for lookup in lookups if not lookup['wine']]
+            
+            if len(encontrados) < 2:
+                result = "❌ No se encontraron suficientes vinos para comparar\n"
+            else:
+                result = _format_wine_comparison(encontrados, criterios)
+            for lookup in no_encontrados:
+                result += f"\n⚠️ No se encontró '{lookup['query']}'"
+                if lookup['suggestions']:
+                    result += f" (¿quizás {', '.join(lookup['suggestions'])}?)"
+            return [types.TextContent(type="text", text=result)]
+
+        elif name == "calcular_inventario":
+            filtros = arguments.get("filtros") or {}
+            incluir = arguments.get("incluir_estadisticas") or ["stock_total", "valor_total", "precio_promedio"]
+            
+            stats = rag_engine.inventory.stats(
+                tipo=filtros.get("tipo"),
+                region=filtros.get("region"),
+                precio_min=filtros.get("precio_min"),
+                precio_max=filtros.get("precio_max"),
+                include=incluir
+            )
+            
+            result = "📦 **Inventario de vinos**\n"
+            if filtros:
+                result += f"**Filtros**: {', '.join(f'{clave}={valor}' for clave, valor in filtros.items())}\n"
+            result += f"\n• Vinos: {stats['vinos']}\n"
+            if "stock_total" in stats:
+                result += f"• Stock total: {stats['stock_total']} botellas\n"
+            if "valor_total" in stats:
+                result += f"• Valor total: {stats['valor_total']:,.2f}€\n"
+            if "precio_promedio" in stats:
+                precio = stats['precio_promedio']
+                result += f"• Precio promedio: {f'{precio:.2f}€' if precio is not None else 'N/A'}\n"
+            if "por_region" in stats:
+                result += _format_grouped_stats("Por región", stats['por_region'])
+            if "por_tipo" in stats:
+                result += _format_grouped_stats("Por tipo", stats['por_tipo'])
+            if "por_añada" in stats:
+                result += _format_grouped_stats("Por añada", stats['por_añada'], by_label=True)
+            
+            return [types.TextContent(type="text", text=result)]
+
+        elif name == "recomendar_por_presupuesto":
+            presupuesto_min = arguments.get("presupuesto_min")
+            presupuesto_max = arguments.get("presupuesto_max")
+            tipo_vino = arguments.get("tipo_vino", "cualquiera")
+            num_recomendaciones = arguments.get("num_recomendaciones", 3)
+            
+            # Rango de precio por búsqueda binaria y top-k por puntuación, sin embeddings ni LLM
+            doc_ids = rag_engine.recommendations.by_budget(presupuesto_min, presupuesto_max, tipo_vino, num_recomendaciones)
+            vinos = rag_engine.wines_by_id(doc_ids)
+            
+            result = f"💰 **Recomendaciones por presupuesto**: {presupuesto_min or 0}€ - {presupuesto_max}€\n"
+            result += f"**Tipo**: {tipo_vino.title()}\n\n"
+            if vinos:
+                result += _format_recommendations(vinos)
+            else:
+                result += "No hay vinos en ese rango de precio. Prueba a ampliar el presupuesto o cambiar el tipo.\n"
+            return [types.TextContent(type="text", text=result)]
+        
+        elif name == "recomendar_por_region":
+            region = arguments.get("region", "")
+            estilo = arguments.get("estilo", "cualquiera")
+            max_resultados = arguments.get("max_resultados", 5)
+            
+            regiones = rag_engine.recommendations.matching_regions(region)
+            doc_ids = rag_engine.recommendations.by_region(region, estilo, max_resultados)
+            vinos = rag_engine.wines_by_id(doc_ids)
+            
+            result = f"🗺️ **Vinos de**: {region}\n"
+            if regiones and len(regiones) > 1:
+                result += f"**Regiones incluidas**: {', '.join(rag_engine.recommendations.region_label(key) for key in regiones)}\n"
+            result += f"**Estilo**: {estilo.replace('_', ' ').title()}\n\n"
+            if vinos:
+                result += _format_recommendations(vinos)
+            elif regiones:
+                result += f"No hay vinos de estilo {estilo.replace('_', ' ')} en esta región.\n"
+            else:
+                result += "No hay vinos de esta región en el inventario.\n"
+            return [types.TextContent(type="text", text=result)]
+
         elif name == "explicar_concepto":
             concepto = arguments.get("concepto", "")
             nivel_detalle = arguments.get("nivel_detalle", "intermedio")
             
             # Buscar información del concepto en la base de conocimientos
-            response = await rag_engine.agentic_rag_query(f"concepto {concepto} sumilleria viticultura", max_results=3)
+            response = await rag_engine.agentic_rag_query(f"concepto {concepto} sumilleria viticultura", max_results=3,
+                                                          parse_constraints=False, generate=False)
             
             result = f"📚 **Concepto**: {concepto.title()}\n"
             result += f"**Nivel**: {nivel_detalle.title()}\n\n"
@@ -769,17 +1724,7 @@ async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
             tipo_vino = arguments.get("tipo_vino", "")
             contexto = arguments.get("contexto", "comida")
             
-            temperaturas = {
-                "tinto_joven": "14-16°C",
-                "tinto_crianza": "16-18°C", 
-                "tinto_reserva": "17-19°C",
-                "blanco_joven": "8-10°C",
-                "blanco_crianza": "10-12°C",
-                "rosado": "8-10°C",
-                "espumoso": "6-8°C",
-                "dulce": "6-8°C",
-                "fortificado": "12-16°C"
-            }
+            temperaturas = TEMPERATURAS_SERVICIO
             
             result = f"🌡️ **Temperaturas de Servicio**\n\n"
             
@@ -853,7 +1798,9 @@ async def read_resource(uri: str) -> str:
                 "total_documents": len(stats['ids']),
                 "collection_name": "rag_documents",
                 "vector_db_type": VECTOR_DB_TYPE,
-                "embedding_model": "all-MiniLM-L6-v2"
+                "embedding_model": EMBEDDING_MODEL,
+                "embedding_backend": EMBEDDING_BACKEND,
+                "embedding_cache": rag_engine.embedding_cache.stats() if rag_engine.embedding_cache else None
             }
             return json.dumps(response, indent=2)
         else:
@@ -885,94 +1832,135 @@ async def read_resource(uri: str) -> str:
 # FastAPI para HTTP (opcional)
 app = FastAPI(title="Agentic RAG MCP Server", version="1.0.0")
 
-@app.on_event("startup")
-async def startup_event():
-    """Inicializar al arrancar"""
-    await rag_engine.initialize()
+async def load_knowledge_base():
+    """Cargar la base de conocimiento: artefacto precalculado o sincronización incremental"""
+    knowledge_dir = Path(KNOWLEDGE_BASE_PATH)
+    
+    # Artefacto precalculado: embeddings mapeados en memoria, sin pasar por el modelo
+    try:
+        artifact = load_index_artifact(Path(INDEX_ARTIFACT_PATH))
+        if artifact and artifact.is_current(knowledge_dir, EMBEDDING_MODEL_KEY):
+            await rag_engine.load_index_artifact(artifact)
+            rag_engine.compact_vectors()
+            return
+        if artifact:
+            logger.warning(f"Artefacto de índice en {INDEX_ARTIFACT_PATH} desactualizado; se recalcula desde {knowledge_dir}")
+    except Exception as e:
+        logger.error(f"Error cargando artefacto de índice {INDEX_ARTIFACT_PATH}: {e}")
     
     # Cargar documentos de ejemplo si existen
-    knowledge_dir = Path("/app/knowledge_base")
     if knowledge_dir.exists():
-        # Cargar archivos de texto
-        for file_path in knowledge_dir.glob("*.txt"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    metadata = {"source": file_path.name, "type": "text"}
-                    await rag_engine.add_document(content, metadata, file_path.stem)
-                logger.info(f"Documento de texto cargado: {file_path.name}")
-            except Exception as e:
-                logger.error(f"Error cargando archivo de texto {file_path}: {e}")
-        
-        # Cargar archivos JSON (vinos)
-        for file_path in knowledge_dir.glob("*.json"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                # Si es el archivo de vinos
-                if file_path.name == "vinos.json" and isinstance(data, list):
-                    logger.info(f"Cargando {len(data)} vinos desde {file_path.name}")
-                    for i, vino in enumerate(data):
-                        # Crear contenido estructurado para cada vino
-                        content = f"""Vino: {vino.get('name', 'Sin nombre')}
-Tipo: {vino.get('type', 'Sin tipo')}
-Región: {vino.get('region', 'Sin región')}
-Año: {vino.get('vintage', 'Sin año')}
-Precio: {vino.get('price', 'Sin precio')}€
-Stock: {vino.get('stock', 'Sin stock')} unidades
-Maridaje: {vino.get('pairing', 'Sin maridaje')}
-Descripción: {vino.get('description', 'Sin descripción')}
-Puntuación: {vino.get('rating', 'Sin puntuación')}/100"""
-                        
-                        # Metadata rica para búsquedas
-                        metadata = {
-                            "source": file_path.name,
-                            "type": "vino",
-                            "name": vino.get('name', ''),
-                            "wine_type": vino.get('type', ''),
-                            "region": vino.get('region', ''),
-                            "vintage": vino.get('vintage', ''),
-                            "price": vino.get('price', ''),
-                            "rating": vino.get('rating', ''),
-                            "pairing": vino.get('pairing', ''),
-                            "index": i
-                        }
-                        
-                        doc_id = f"vino_{i}_{vino.get('name', 'sin_nombre').replace(' ', '_')}"
-                        await rag_engine.add_document(content, metadata, doc_id)
-                    
-                    logger.info(f"✅ {len(data)} vinos cargados exitosamente desde {file_path.name}")
-                else:
-                    # Para otros archivos JSON, cargar como documento único
-                    content = json.dumps(data, indent=2, ensure_ascii=False)
-                    metadata = {"source": file_path.name, "type": "json"}
-                    await rag_engine.add_document(content, metadata, file_path.stem)
-                    logger.info(f"Documento JSON cargado: {file_path.name}")
-                    
-            except Exception as e:
-                logger.error(f"Error cargando archivo JSON {file_path}: {e}")
+        documents = load_knowledge_documents(knowledge_dir)
+        # Solo se escriben los documentos nuevos o modificados y se borran los eliminados
+        counts = await rag_engine.sync_knowledge(documents)
+        logger.info(f"✅ Base de conocimiento {knowledge_dir}: {counts}")
+        rag_engine.compact_vectors()
+
+async def warm_up():
+    """Arranque en segundo plano: vector DB e índices, base de conocimiento y modelo de embeddings.
+    El modelo se carga en un hilo en paralelo; hasta que termina, las búsquedas usan BM25 y los
+    embeddings en caché, y las herramientas estructuradas ya responden."""
+    model_loading = asyncio.create_task(asyncio.to_thread(rag_engine.load_embedding_model))
+    try:
+        await rag_engine.ensure_initialized()
+        with rag_engine.warmup.track("knowledge"):
+            await load_knowledge_base()
+            rag_engine.load_thesaurus(Path(KNOWLEDGE_BASE_PATH))
+    except Exception as e:
+        logger.error(f"Error en el arranque en segundo plano: {e}")
+    try:
+        await model_loading
+    except Exception as e:
+        logger.error(f"Error cargando el modelo de embeddings {EMBEDDING_MODEL}: {e}")
+
+_warmup_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def startup_event():
+    """Programar la carga en segundo plano para que el puerto responda de inmediato"""
+    global _warmup_task
+    _warmup_task = asyncio.create_task(warm_up())
 
 @app.get("/health")
 async def health_check():
     """Verificación de salud"""
-    return {"status": "healthy", "vector_db": VECTOR_DB_TYPE}
+    return {"status": "healthy", "vector_db": VECTOR_DB_TYPE, "ready": rag_engine.warmup.ready}
 
-@app.post("/query")
-async def query_rag_mcp(query_data: QueryRequest):
-    start_total = time.time()
-    logger.info(f"Received query: {query_data.query}")
+@app.get("/health/live")
+async def health_live():
+    """Liveness: el proceso atiende peticiones (no espera al modelo ni a la vector DB)"""
+    return {"status": "alive"}
 
-    try:
-        # Asegurar que rag_engine esté inicializado
-        if rag_engine.collection is None:
-            await rag_engine.initialize()
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: estado y tiempo de carga de cada componente; 503 mientras el arranque no termina"""
+    snapshot = rag_engine.warmup.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas internas del motor RAG"""
+    return {
+        "embedding_cache": rag_engine.embedding_cache.stats() if rag_engine.embedding_cache else None,
+        "embedding_executor": rag_engine.embedding_executor.stats(),
+        "llm": rag_engine.llm.stats() if rag_engine.llm else None,
+        "semantic_cache": rag_engine.semantic_cache.stats() if rag_engine.semantic_cache else None,
+        "retrieval": {
+            "hybrid": HYBRID_RETRIEVAL,
+            "lexical_documents": len(rag_engine.lexical_index),
+            "indexed_wines": len(rag_engine.wine_index),
+            "recommendation_rebuilds": rag_engine.recommendations.rebuilds,
+            "name_shortcuts": rag_engine.name_shortcuts,
+            "constraint_queries": rag_engine.constraint_queries,
+            "structured_queries": rag_engine.structured_queries,
+            "retrieval_only_queries": rag_engine.retrieval_only_queries,
+            "query_expansion": rag_engine.query_expansion,
+            "thesaurus_terms": len(rag_engine.thesaurus) if rag_engine.thesaurus else 0,
+            "thesaurus_expansions": rag_engine.thesaurus_expansions,
+            "llm_expansions": rag_engine.llm_expansions,
+            "llm_expansion_failures": rag_engine.llm_expansion_failures,
+            "lexical_fallbacks": rag_engine.lexical_fallbacks
+        },
+        "context_packing": {
+            "token_budget": CONTEXT_TOKEN_BUDGET,
+            "prompts": rag_engine.packed_prompts,
+            "mean_context_tokens": round(rag_engine.packed_context_tokens / rag_engine.packed_prompts, 1) if rag_engine.packed_prompts else 0.0,
+            "dropped_sources": rag_engine.packed_dropped_sources
+        },
+        "expansion_gate": rag_engine.expansion_gate.stats(),
+        "warmup": rag_engine.warmup.snapshot(),
+        "vector_store": rag_engine.collection.memory_stats() if isinstance(rag_engine.collection, CompactVectorIndex) else None,
+        "kb_sync": rag_engine.last_sync,
+        "kb_version": rag_engine.kb_version
+    }
+
+QUERY_SYSTEM_PROMPT = "Eres un asistente sumiller experto. Usa el contexto proporcionado para responder a las preguntas sobre vinos. Si no puedes encontrar la respuesta en el contexto, indica que no tienes esa información. No alucines."
 
-        # Paso 1: Obtener embeddings de la consulta
-        start_embedding = time.time()
-        query_embedding = rag_engine._embed_text(query_data.query)
-        end_embedding = time.time()
-        logger.info(f"Tiempo para obtener embedding de la consulta: {end_embedding - start_embedding:.4f}s")
+async def _embed_query_timed(query: str, timings: Dict[str, float]) -> List[float]:
+    """Paso 1 de /query y /query/stream: obtener embeddings de la consulta"""
+    start_embedding = time.time()
+    query_embedding = await rag_engine.embed_query(query)
+    end_embedding = time.time()
+    timings["embedding_ms"] = round((end_embedding - start_embedding) * 1000, 1)
+    logger.info(f"Tiempo para obtener embedding de la consulta: {end_embedding - start_embedding:.4f}s")
+    return query_embedding
+
+async def _retrieve_query_sources(query_data: QueryRequest, timings: Dict[str, float],
+                                  query_embedding: Optional[List[float]] = None):
+    """Pasos comunes de /query y /query/stream: embedding de la consulta, búsqueda vectorial y contexto del prompt.
+    Con el modelo aún cargando, ranking BM25 en lugar de esperar al embedding."""
+    # Asegurar que rag_engine esté inicializado
+    await rag_engine.ensure_initialized()
+
+    if rag_engine._lexical_only():
+        rag_engine.lexical_fallbacks += 1
+        start_search = time.time()
+        sources = rag_engine._lexical_ranking(query_data.query, query_data.max_results)
+        timings["search_ms"] = round((time.time() - start_search) * 1000, 1)
+        timings["lexical_only"] = True
+    else:
+        if query_embedding is None:
+            query_embedding = await _embed_query_timed(query_data.query, timings)
 
         # Paso 2: Buscar documentos relevantes en ChromaDB
         start_chroma_search = time.time()
@@ -982,61 +1970,93 @@ async def query_rag_mcp(query_data: QueryRequest):
             include=['documents', 'metadatas', 'distances']
         )
         end_chroma_search = time.time()
+        timings["search_ms"] = round((end_chroma_search - start_chroma_search) * 1000, 1)
         logger.info(f"Tiempo para buscar en ChromaDB: {end_chroma_search - start_chroma_search:.4f}s")
 
-        # Procesar resultados
-        documents = results['documents'][0] if results and 'documents' in results else []
-        metadatas = results['metadatas'][0] if results and 'metadatas' in results else []
-        distances = results['distances'][0] if results and 'distances' in results else []
-
         # Construir fuentes
-        sources = []
-        context_str = ""
-        for i, (doc_content, metadata, distance) in enumerate(zip(documents, metadatas, distances)):
-            source_entry = {
-                "content": doc_content,
-                "metadata": metadata,
-                "relevance_score": 1 - distance,
-                "rank": i + 1
-            }
-            sources.append(source_entry)
-            context_str += f"Fuente {i+1}:\n{doc_content}\n\n"
+        sources = rag_engine._format_results(results)
+    packed = rag_engine.pack_context(sources)
+    timings["context_tokens"] = packed.tokens
+    return sources, packed
 
-        # Paso 3: Generar respuesta usando OpenAI
+def _query_messages(query: str, context_str: str) -> List[Dict[str, str]]:
+    """Mensajes para el LLM en /query y /query/stream"""
+    return [
+        {"role": "system", "content": QUERY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Contexto:\n{context_str}\n\nPregunta: {query}"}
+    ]
+
+@app.get("/inventory/stats")
+async def inventory_stats(tipo: Optional[str] = None, region: Optional[str] = None,
+                          precio_min: Optional[float] = None, precio_max: Optional[float] = None,
+                          incluir: Optional[str] = None):
+    """Estadísticas del inventario calculadas sobre el catálogo columnar"""
+    include = [stat.strip() for stat in incluir.split(",")] if incluir else None
+    return rag_engine.inventory.stats(tipo, region, precio_min, precio_max, include)
+
+@app.post("/query")
+async def query_rag_mcp(query_data: QueryRequest):
+    start_total = time.time()
+    logger.info(f"Received query: {query_data.query}")
+
+    try:
+        # Caché semántica: consultas casi idénticas reutilizan la respuesta sin llamar al LLM
+        # (mientras carga el modelo no hay embedding: se responde con BM25 y sin caché)
+        timings: Dict[str, float] = {}
+        await rag_engine.ensure_initialized()
+        query_embedding = None
+        if not rag_engine._lexical_only():
+            query_embedding = await _embed_query_timed(query_data.query, timings)
+        cache_scope = f"query:{query_data.max_results}"
+        if rag_engine.semantic_cache and query_embedding is not None:
+            cached = rag_engine.semantic_cache.lookup(query_embedding, rag_engine.kb_version, cache_scope)
+            if cached is not None:
+                timings["total_ms"] = round((time.time() - start_total) * 1000, 1)
+                cached["timings"] = timings
+                return cached
+        kb_version = rag_engine.kb_version
+
+        sources, packed = await _retrieve_query_sources(query_data, timings, query_embedding)
+
+        # Paso 3: Generar respuesta usando OpenAI (una respuesta vacía no se cachea)
         start_openai_call = time.time()
+        cacheable = bool(sources)
         
-        if rag_engine.openai_client:
-            messages = [
-                {"role": "system", "content": "Eres un asistente sumiller experto. Usa el contexto proporcionado para responder a las preguntas sobre vinos. Si no puedes encontrar la respuesta en el contexto, indica que no tienes esa información. No alucines."},
-                {"role": "user", "content": f"Contexto:\n{context_str}\n\nPregunta: {query_data.query}"}
-            ]
-            
-            response = rag_engine.openai_client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=messages,
+        if rag_engine.llm:
+            response = await rag_engine.llm.complete(
+                _query_messages(query_data.query, packed.text),
+                stage="query",
                 temperature=0.7,
                 max_tokens=1024,
                 top_p=1,
                 frequency_penalty=0,
-                presence_penalty=0,
-                stream=False
+                presence_penalty=0
             )
             
-            llm_answer = response.choices[0].message.content if response.choices else "No se pudo obtener una respuesta del modelo."
+            llm_answer = response.text or "No se pudo obtener una respuesta del modelo."
+            cacheable = cacheable and bool(response.text)
         else:
             llm_answer = f"Basado en {len(sources)} fuentes encontradas para: '{query_data.query}'"
         
         end_openai_call = time.time()
+        timings["llm_ms"] = round((end_openai_call - start_openai_call) * 1000, 1)
         logger.info(f"Tiempo para la llamada a OpenAI: {end_openai_call - start_openai_call:.4f}s")
 
         end_total = time.time()
+        timings["total_ms"] = round((end_total - start_total) * 1000, 1)
         logger.info(f"Tiempo total de la solicitud /query: {end_total - start_total:.4f}s")
 
-        return {
+        result = {
             "answer": llm_answer,
             "sources": sources,
-            "context_used": {"query": query_data.query, "context": context_str}
+            "context_used": {"query": query_data.query, "context": packed.text,
+                             "context_tokens": packed.tokens, "dropped_sources": packed.dropped}
         }
+        if rag_engine.semantic_cache and cacheable and query_embedding is not None:
+            rag_engine.semantic_cache.store(query_embedding, result, kb_version, cache_scope)
+        # Tiempos de esta petición (no se cachean)
+        result["timings"] = timings
+        return result
 
     except Exception as e:
         logger.error(f"Error en /query: {e}")
@@ -1046,6 +2066,53 @@ async def query_rag_mcp(query_data: QueryRequest):
             "context_used": {"query": query_data.query, "error": str(e)}
         }
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Formatear un evento server-sent events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/query/stream")
+async def query_stream(query_data: QueryRequest):
+    """Consulta RAG en streaming (SSE): fuentes, fragmentos de respuesta y tiempos por etapa"""
+    logger.info(f"Received streaming query: {query_data.query}")
+
+    async def event_stream():
+        start_total = time.time()
+        timings: Dict[str, float] = {}
+        try:
+            sources, packed = await _retrieve_query_sources(query_data, timings)
+            yield _sse_event("sources", {"sources": sources, "dropped_sources": packed.dropped})
+
+            start_llm = time.time()
+            if rag_engine.llm:
+                # aclosing: si el cliente se desconecta, el stream del LLM se cierra en el acto
+                async with aclosing(rag_engine.llm.stream(
+                    _query_messages(query_data.query, packed.text),
+                    stage="query",
+                    temperature=0.7,
+                    max_tokens=1024
+                )) as tokens:
+                    async for token in tokens:
+                        if "first_token_ms" not in timings:
+                            timings["first_token_ms"] = round((time.time() - start_total) * 1000, 1)
+                        yield _sse_event("token", {"text": token})
+            else:
+                timings["first_token_ms"] = round((time.time() - start_total) * 1000, 1)
+                yield _sse_event("token", {"text": f"Basado en {len(sources)} fuentes encontradas para: '{query_data.query}'"})
+            timings["llm_ms"] = round((time.time() - start_llm) * 1000, 1)
+            timings["total_ms"] = round((time.time() - start_total) * 1000, 1)
+
+            yield _sse_event("done", {"timings": timings})
+
+        except Exception as e:
+            logger.error(f"Error en /query/stream: {e}")
+            yield _sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/documents")
 async def add_document_endpoint(request: DocumentRequest):
     """Endpoint HTTP para agregar documentos"""
@@ -1056,6 +2123,16 @@ async def add_document_endpoint(request: DocumentRequest):
     )
     return {"doc_id": doc_id, "status": "added"}
 
+@app.post("/documents/batch")
+async def add_documents_endpoint(request: DocumentBatchRequest):
+    """Endpoint HTTP para agregar documentos en lote"""
+    doc_ids = await rag_engine.add_documents(
+        [doc.content for doc in request.documents],
+        [doc.metadata for doc in request.documents],
+        [doc.doc_id for doc in request.documents]
+    )
+    return {"doc_ids": doc_ids, "count": len(doc_ids), "status": "added"}
+
 async def main():
     """Función principal para ejecutar como servidor MCP"""
     import sys
@@ -1066,13 +2143,12 @@ async def main():
         import uvicorn
         uvicorn.run(app, host="0.0.0.0", port=8000)
     else:
-        # Modo MCP stdio por defecto
-        await rag_engine.initialize()
-        
-        # Cargar documentos desde directorio local si existe
+        # Modo MCP stdio por defecto: el arranque se completa antes de atender al cliente
         knowledge_dir = Path("knowledge_base")
         if knowledge_dir.exists():
-            await startup_event()
+            await warm_up()
+        else:
+            await rag_engine.initialize()
         
         async with stdio_server() as (read_stream, write_stream):
             await mcp_server.run(
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Índices de recomendación deterministas sobre el catálogo de inventario
+- Por presupuesto: por tipo de vino, filas ordenadas por precio (búsqueda binaria
+  del rango) con una sparse table de máximos de puntuación para extraer el top-k
+  del rango en O(log n + k log k).
+- Por región: región -> estilo (joven/crianza/reserva/gran_reserva) -> filas
+  ordenadas por puntuación. El estilo sale de la edad de la añada respecto a la
+  más reciente del catálogo (no del año en curso: el catálogo no envejece solo).
+Se reconstruyen de forma perezosa cuando cambia la versión del catálogo.
+"""
+
+import heapq
+import logging
+from itertools import islice
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from inventory_catalog import InventoryCatalog
+from text_utils import fold_accents
+
+logger = logging.getLogger(__name__)
+
+ANY = "cualquiera"
+STYLES = ("joven", "crianza", "reserva", "gran_reserva")
+
+
+def wine_style(vintage: Optional[float], reference_year: Optional[int]) -> Optional[str]:
+    """Estilo aproximado por la edad de la añada respecto a `reference_year` (el catálogo no tiene la crianza explícita)
+    Umbrales únicos para las recomendaciones por región y la ficha de `analizar_vino`."""
+    if vintage is None or reference_year is None or np.isnan(vintage):
+        return None
+    age = reference_year - int(vintage)
+    if age <= 2:
+        return "joven"
+    if age <= 4:
+        return "crianza"
+    if age <= 7:
+        return "reserva"
+    return "gran_reserva"
+
+
+class _RangeMaxTable:
+    """Sparse table: posición de la puntuación máxima de cualquier rango [lo, hi) en O(1)"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        size = len(values)
+        self.levels = [np.arange(size)]
+        width = 1
+        while 2 * width <= size:
+            previous = self.levels[-1]
+            left = previous[:size - 2 * width + 1]
+            right = previous[width:size - width + 1]
+            # En empate gana la izquierda (más barata)
+            self.levels.append(np.where(values[right] > values[left], right, left))
+            width *= 2
+
+    def argmax(self, lo: int, hi: int) -> int:
+        level = (hi - lo).bit_length() - 1
+        left = self.levels[level][lo]
+        right = self.levels[level][hi - (1 << level)]
+        return int(right if self.values[right] > self.values[left] else left)
+
+    def top_k(self, lo: int, hi: int, k: int) -> List[int]:
+        """Posiciones de las k puntuaciones más altas del rango, en orden descendente"""
+        heap = []
+
+        def push(start: int, end: int):
+            if start < end:
+                best = self.argmax(start, end)
+                heapq.heappush(heap, (-self.values[best], best, start, end))
+
+        push(lo, hi)
+        result = []
+        while heap and len(result) < k:
+            _, best, start, end = heapq.heappop(heap)
+            result.append(best)
+            push(start, best)
+            push(best + 1, end)
+        return result
+
+
+class _PriceIndex:
+    """Filas de un tipo de vino ordenadas por precio"""
+
+    def __init__(self, rows: np.ndarray, prices: np.ndarray, ratings: np.ndarray):
+        order = np.argsort(prices, kind="stable")
+        self.rows = rows[order]
+        self.prices = prices[order]
+        self.table = _RangeMaxTable(np.nan_to_num(ratings[order], nan=-np.inf))
+
+    def top_k(self, precio_min: Optional[float], precio_max: Optional[float], k: int) -> List[int]:
+        lo = int(np.searchsorted(self.prices, precio_min, side="left")) if precio_min is not None else 0
+        hi = int(np.searchsorted(self.prices, precio_max, side="right")) if precio_max is not None else len(self.prices)
+        return [int(self.rows[position]) for position in self.table.top_k(lo, hi, k)]
+
+
+class RecommendationIndex:
+    """Recomendaciones por presupuesto y por región sin embeddings ni LLM"""
+
+    def __init__(self, catalog: InventoryCatalog):
+        self.catalog = catalog
+        self._version = None
+        self._by_type: Dict[str, _PriceIndex] = {}
+        self._by_region: Dict[str, Dict[str, List[int]]] = {}
+        self._region_labels: Dict[str, str] = {}
+        self.rebuilds = 0
+
+    def _ensure_current(self):
+        """Reconstruir los índices si el catálogo cambió desde la última construcción"""
+        if self._version == self.catalog.version:
+            return
+        catalog = self.catalog
+        prices = catalog.column("price")
+        ratings = catalog.column("rating")
+        types = catalog.column("type")
+        priced = np.flatnonzero(~np.isnan(prices))
+
+        self._by_type = {ANY: _PriceIndex(priced, prices[priced], ratings[priced])}
+        for code, label in enumerate(catalog.types.labels):
+            rows = priced[types[priced] == code]
+            if rows.size:
+                self._by_type[fold_accents(label)] = _PriceIndex(rows, prices[rows], ratings[rows])
+
+        # Orden global por puntuación descendente (empate: más barato primero)
+        order = np.lexsort((np.nan_to_num(prices, nan=np.inf), -np.nan_to_num(ratings, nan=-np.inf)))
+        vintages = catalog.column("vintage")
+        reference_year = catalog.newest_vintage()
+        regions = catalog.column("region")
+        self._by_region = {}
+        self._region_labels = {}
+        for row in order:
+            code = regions[row]
+            if code < 0:
+                continue
+            label = catalog.regions.labels[code]
+            key = fold_accents(label)
+            partitions = self._by_region.setdefault(key, {ANY: []})
+            self._region_labels[key] = label
+            partitions[ANY].append(int(row))
+            style = wine_style(vintages[row], reference_year)
+            if style:
+                partitions.setdefault(style, []).append(int(row))
+
+        self._version = catalog.version
+        self.rebuilds += 1
+        logger.info(f"Índices de recomendación reconstruidos: {len(catalog)} vinos, {len(self._by_region)} regiones")
+
+    def by_budget(self, precio_min: Optional[float], precio_max: Optional[float], tipo: str = ANY,
+                  k: int = 3) -> List[str]:
+        """IDs de los k vinos mejor puntuados dentro del rango de precio"""
+        self._ensure_current()
+        index = self._by_type.get(fold_accents(tipo or ANY))
+        if index is None:
+            return []
+        return [self.catalog.ids[row] for row in index.top_k(precio_min, precio_max, k)]
+
+    def matching_regions(self, region: str) -> List[str]:
+        """Regiones que coinciden exactamente o, si no hay, que contienen el texto buscado"""
+        self._ensure_current()
+        key = fold_accents(region).strip()
+        if key in self._by_region:
+            return [key]
+        return sorted(candidate for candidate in self._by_region if key and key in candidate)
+
+    def region_label(self, key: str) -> str:
+        return self._region_labels.get(key, key)
+
+    def by_region(self, region: str, estilo: str = ANY, k: int = 5) -> List[str]:
+        """IDs de los k vinos mejor puntuados de la región (y sus subregiones si no hay exacta)"""
+        keys = self.matching_regions(region)
+        partitions = [self._by_region[key].get(estilo or ANY, []) for key in keys]
+        if len(partitions) == 1:
+            rows = partitions[0][:k]
+        else:
+            ratings = self.catalog.column("rating")
+            merged = heapq.merge(*partitions, key=lambda row: -np.nan_to_num(ratings[row], nan=-np.inf))
+            rows = list(islice(merged, k))
+        return [self.catalog.ids[row] for row in rows]
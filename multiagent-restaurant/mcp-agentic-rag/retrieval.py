@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Utilidades de recuperación para el motor RAG
+Fusión de rankings de varias consultas por ID de documento.
+"""
+
+from typing import List, Dict, Any
+
+# Constante estándar de Reciprocal Rank Fusion
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], k: int = RRF_K) -> List[Dict[str, Any]]:
+    """Fusionar rankings por ID con Reciprocal Rank Fusion: score = Σ 1 / (k + rank)"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+
+    for ranking in rankings:
+        for position, source in enumerate(ranking, 1):
+            doc_id = source['id']
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + position)
+            best = fused.get(doc_id)
+            if best is None or source.get('relevance_score', 0) > best.get('relevance_score', 0):
+                fused[doc_id] = source
+
+    return _rerank(fused, scores)
+
+
+def max_score_fusion(rankings: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Fusionar rankings por ID quedándose con la mejor relevancia de cada documento"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+
+    for ranking in rankings:
+        for source in ranking:
+            doc_id = source['id']
+            score = source.get('relevance_score', 0)
+            if doc_id not in scores or score > scores[doc_id]:
+                scores[doc_id] = score
+                fused[doc_id] = source
+
+    return _rerank(fused, scores)
+
+
+def fuse_rankings(rankings: List[List[Dict[str, Any]]], method: str = "rrf") -> List[Dict[str, Any]]:
+    """Fusionar rankings con el método indicado ('rrf' o 'max')"""
+    if method == "max":
+        return max_score_fusion(rankings)
+    return reciprocal_rank_fusion(rankings)
+
+
+def _rerank(fused: Dict[str, Dict[str, Any]], scores: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Ordenar por score de fusión y reasignar posiciones"""
+    ordered = sorted(fused, key=lambda doc_id: scores[doc_id], reverse=True)
+    results = []
+    for rank, doc_id in enumerate(ordered, 1):
+        source = dict(fused[doc_id])
+        source['fusion_score'] = scores[doc_id]
+        source['rank'] = rank
+        results.append(source)
+    return results
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Caché semántica de respuestas para el pipeline RAG
+Indexada por el embedding de la consulta: una consulta nueva reutiliza la
+respuesta de la consulta cacheada más cercana si supera el umbral de coseno
+y se calculó con la misma versión de la base de conocimiento.
+"""
+
+import os
+import copy
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Caché de respuestas por similitud de consulta con TTL y expulsión LRU"""
+
+    def __init__(self, threshold: float = None, ttl_seconds: float = None, max_entries: int = None):
+        if threshold is None:
+            threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+        if max_entries is None:
+            max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+        # clave -> (embedding normalizado, ámbito, versión KB, instante, valor)
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, str, int, float, Any]]" = OrderedDict()
+        self._next_key = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _purge_expired(self, now: float):
+        """Eliminar entradas con TTL vencido"""
+        expired = [key for key, entry in self._entries.items() if now - entry[3] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+
+    def lookup(self, embedding, kb_version: int, scope: str = "") -> Optional[Any]:
+        """Buscar la respuesta de la consulta cacheada más cercana"""
+        now = time.time()
+        self._purge_expired(now)
+
+        candidates = [
+            (key, entry) for key, entry in self._entries.items()
+            if entry[1] == scope and entry[2] == kb_version
+        ]
+        if not candidates:
+            self.misses += 1
+            return None
+
+        query = self._normalize(embedding)
+        matrix = np.vstack([entry[0] for _, entry in candidates])
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        key, entry = candidates[best]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        logger.info(f"Acierto en caché semántica (similitud {similarities[best]:.3f})")
+        # Copia: quien recibe la respuesta puede modificarla sin alterar la entrada
+        return copy.deepcopy(entry[4])
+
+    def store(self, embedding, value: Any, kb_version: int, scope: str = ""):
+        """Guardar (una copia de) una respuesta y expulsar la menos usada si se supera el límite"""
+        entry = (self._normalize(embedding), scope, kb_version, time.time(), copy.deepcopy(value))
+        self._entries[self._next_key] = entry
+        self._next_key += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self):
+        """Vaciar la caché (la base de conocimiento cambió)"""
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la caché semántica"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el troceado de documentos por secciones
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chunking import chunk_document, split_sections, split_windows
+
+TEMARIO = """I. INTRODUCCIÓN
+
+A. Qué es un Sumiller
+Un sumiller asesora sobre vinos.
+
+B. Historia
+Los cellararii gestionaban bodegas.
+
+II. MARIDAJE
+Texto introductorio del capítulo.
+
+A. Principios
+1. Intensidad
+2. Acidez
+"""
+
+
+class TestChunking:
+    """Tests de secciones, ventanas y metadatos"""
+
+    def test_split_sections(self):
+        """Test: encabezados romanos y con letra forman la ruta de la sección"""
+        titles = [title for title, _ in split_sections(TEMARIO)]
+        assert titles == [
+            "I. INTRODUCCIÓN > A. Qué es un Sumiller",
+            "I. INTRODUCCIÓN > B. Historia",
+            "II. MARIDAJE",
+            "II. MARIDAJE > A. Principios",
+        ]
+
+    def test_split_windows_overlap(self):
+        """Test: ventanas acotadas con solapamiento"""
+        text = " ".join(f"p{i}" for i in range(25))
+        windows = split_windows(text, max_words=10, overlap=3)
+        assert all(len(window.split()) <= 10 for window in windows)
+        assert windows[1].split()[:3] == windows[0].split()[-3:]
+        assert windows[-1].split()[-1] == "p24"
+
+    def test_chunk_metadata(self):
+        """Test: cada trozo lleva padre, sección y posición"""
+        chunks = chunk_document("teoria", TEMARIO, {"source": "teoria.txt", "type": "text"})
+        assert [chunk["id"] for chunk in chunks] == ["teoria#0", "teoria#1", "teoria#2", "teoria#3"]
+        first = chunks[0]
+        assert first["metadata"]["parent_id"] == "teoria"
+        assert first["metadata"]["source"] == "teoria.txt"
+        assert first["metadata"]["chunk_count"] == 4
+        assert first["content"].startswith("I. INTRODUCCIÓN > A. Qué es un Sumiller\n")
+
+    def test_plain_text_falls_back_to_windows(self):
+        """Test: sin encabezados se trocea en ventanas sin sección"""
+        text = " ".join(["palabra"] * 400)
+        chunks = chunk_document("largo", text)
+        assert len(chunks) > 1
+        assert all(chunk["metadata"]["section"] == "" for chunk in chunks)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el índice vectorial compacto (PCA + float16)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compact_vector_index import CompactVectorIndex, PCAProjection, compact_index
+from vector_index import NumpyVectorIndex
+from rag_eval import recall_at_k
+
+
+def low_rank_corpus(n=300, dim=384, rank=16, seed=0):
+    """Embeddings que viven en un subespacio de `rank` dimensiones"""
+    rng = np.random.default_rng(seed)
+    return (rng.normal(size=(n, rank)) @ rng.normal(size=(rank, dim))).astype(np.float32)
+
+
+def full_index(vectors):
+    index = NumpyVectorIndex()
+    index.add(
+        [f"doc{i}" for i in range(len(vectors))],
+        vectors,
+        [f"documento {i}" for i in range(len(vectors))],
+        [{"type": "vino" if i % 2 else "text", "price": float(i)} for i in range(len(vectors))]
+    )
+    return index
+
+
+class TestPCAProjection:
+    """Tests de la proyección ajustada sobre el corpus"""
+
+    def test_low_rank_corpus_is_fully_explained(self):
+        """Test: Un corpus de rango 16 se explica con 16 componentes"""
+        projection = PCAProjection.fit(low_rank_corpus(), 16)
+        assert projection.output_dim == 16
+        assert projection.explained_variance_ratio == pytest.approx(1.0, abs=1e-4)
+
+    def test_dim_is_capped_by_corpus_size(self):
+        """Test: No se piden más componentes que documentos"""
+        projection = PCAProjection.fit(low_rank_corpus(n=10, rank=8), 128)
+        assert projection.output_dim == 10
+
+
+class TestCompactVectorIndex:
+    """Tests del índice compacto frente al índice completo"""
+
+    def test_memory_per_document_drops_six_times(self):
+        """Test: 384 float32 → 128 float16 es 6× menos memoria por documento"""
+        compact = CompactVectorIndex.from_index(full_index(low_rank_corpus()), 128)
+        stats = compact.memory_stats()
+        assert compact.embeddings.dtype == np.float16
+        assert stats["bytes_per_document"] == 256
+        assert stats["reduction"] == 6.0
+
+    def test_recall_against_full_vectors(self):
+        """Test: Sin pérdida de información el top-k coincide con el exacto"""
+        vectors = low_rank_corpus()
+        full = full_index(vectors)
+        compact = CompactVectorIndex.from_index(full, 16)
+        queries = vectors[:50] + np.random.default_rng(1).normal(scale=0.01, size=(50, vectors.shape[1]))
+        assert recall_at_k(full, compact, queries, 5) >= 0.95
+
+    def test_filters_and_upserts_after_compaction(self):
+        """Test: Los filtros siguen funcionando y los nuevos vectores se proyectan"""
+        vectors = low_rank_corpus()
+        compact = CompactVectorIndex.from_index(full_index(vectors), 16)
+        result = compact.query([vectors[3]], n_results=3, where={"type": "vino"})
+        assert result["ids"][0][0] == "doc3"
+        assert all(metadata["type"] == "vino" for metadata in result["metadatas"][0])
+
+        compact.upsert(["nuevo"], [vectors[7] * 2], ["nuevo"], [{"type": "vino"}])
+        assert compact.count() == len(vectors) + 1
+        assert set(compact.query([vectors[7]], n_results=2)["ids"][0]) == {"doc7", "nuevo"}
+
+    def test_dimension_mismatch(self):
+        """Test: Un embedding de otra dimensión se rechaza"""
+        compact = CompactVectorIndex.from_index(full_index(low_rank_corpus()), 16)
+        with pytest.raises(ValueError):
+            compact.query([np.ones(10)], n_results=1)
+
+    def test_disabled_or_empty_keeps_full_index(self):
+        """Test: Con dimensión 0 o sin documentos se conserva el índice completo"""
+        full = full_index(low_rank_corpus())
+        assert compact_index(full, 0) is full
+        empty = NumpyVectorIndex()
+        assert compact_index(empty, 128) is empty
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el empaquetado del contexto con presupuesto de tokens
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from context_packing import compact_context, estimate_tokens, pack_sources, render_source
+
+
+def wine(name, price=25.5):
+    return {
+        "content": f"Vino: {name}\nTipo: Tinto\nRegión: Rioja\nAño: 2018\nPrecio: {price}€\nStock: 12 unidades\n"
+                   f"Maridaje: Ideal con carnes rojas.\nDescripción: Vino tinto elaborado con Tempranillo.\nPuntuación: 91/100",
+        "metadata": {"type": "vino", "name": name, "wine_type": "Tinto", "region": "Rioja", "vintage": 2018,
+                     "price": price, "rating": 91, "pairing": "Ideal con carnes rojas."},
+    }
+
+
+class TestRendering:
+    """Tests de la representación compacta de fuentes y contexto"""
+
+    def test_wine_on_one_line(self):
+        """Test: un vino se escribe en una línea sin etiquetas ni stock"""
+        line = render_source(wine("Viña Alta"))
+        assert line == ("Viña Alta | Tinto | Rioja 2018 | 25.5€ | 91/100 | Ideal con carnes rojas. | "
+                        "Vino tinto elaborado con Tempranillo.")
+        assert estimate_tokens(line) < estimate_tokens(wine("Viña Alta")["content"])
+
+    def test_text_and_context_without_indentation(self):
+        """Test: texto y contexto JSON sin indentación ni espacios redundantes"""
+        source = {"content": "  Título\n\n\n    1.   Primero\n\t2. Segundo  ", "metadata": {"type": "text"}}
+        assert render_source(source) == "Título\n1. Primero\n2. Segundo"
+        assert compact_context({"plato": "cordero asado", "invitados": 4}) == '{"plato":"cordero asado","invitados":4}'
+        assert compact_context(None) == ""
+
+
+class TestPacking:
+    """Tests del llenado voraz del presupuesto"""
+
+    def test_budget_is_respected_in_order(self):
+        """Test: se incluyen fuentes en orden mientras quepan y se informa de los tokens usados"""
+        sources = [wine(f"Vino {i}") for i in range(6)]
+        packed = pack_sources(sources, budget=100)
+        assert packed.sources == sources[:len(packed.sources)]
+        assert 0 < len(packed.sources) < 6
+        assert packed.dropped == 6 - len(packed.sources)
+        assert packed.tokens <= 100
+        assert packed.text.startswith("[1] Vino 0 |")
+
+    def test_shorter_source_fills_the_gap(self):
+        """Test: una fuente que no cabe se salta y la siguiente, más corta, entra"""
+        long_text = {"content": "palabra " * 60, "metadata": {"type": "text"}}
+        short_text = {"content": "breve", "metadata": {"type": "text"}}
+        first = wine("Primero")
+        packed = pack_sources([first, long_text, short_text], budget=60)
+        assert packed.sources == [first, short_text]
+        assert packed.dropped == 1
+        assert packed.text.endswith("[2] breve")
+
+    def test_default_budget_keeps_default_results(self):
+        """Test: con el presupuesto por defecto caben los 5 resultados por defecto de /query"""
+        packed = pack_sources([wine(f"Vino de la casa {i}") for i in range(5)])
+        assert packed.dropped == 0
+
+    def test_first_source_is_truncated(self):
+        """Test: si la fuente más relevante no cabe sola, se recorta en lugar de dejar el prompt vacío"""
+        packed = pack_sources([{"content": "x" * 1000, "metadata": {}}], budget=20)
+        assert len(packed.sources) == 1
+        assert packed.tokens <= 20
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para los backends de embeddings
+La paridad ONNX int8 vs PyTorch exporta el modelo a un directorio temporal;
+se omite si faltan onnx/onnxruntime o el modelo original no está disponible.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_backends import create_embedding_backend, embedding_model_key, export_onnx_model, mean_pooling
+from knowledge_loader import load_knowledge_documents
+
+KNOWLEDGE_DIR = Path(__file__).resolve().parent.parent / "knowledge_base"
+
+# Umbrales de paridad de la cuantización dinámica int8 frente a float32
+MIN_MEAN_COSINE = 0.98
+MIN_COSINE = 0.95
+
+
+class TestMeanPooling:
+    """Tests del pooling que reproduce sentence-transformers"""
+
+    def test_padding_is_ignored(self):
+        """Test: Los tokens de padding no cuentan en la media"""
+        tokens = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+        pooled = mean_pooling(tokens, np.array([[1, 1, 0]]), normalize=False)
+        np.testing.assert_allclose(pooled, [[2.0, 0.0]])
+
+    def test_normalized_output(self):
+        """Test: Con normalización los vectores tienen norma 1"""
+        tokens = np.random.default_rng(0).normal(size=(4, 6, 8)).astype(np.float32)
+        pooled = mean_pooling(tokens, np.ones((4, 6), dtype=np.int64))
+        np.testing.assert_allclose(np.linalg.norm(pooled, axis=1), 1.0, rtol=1e-5)
+
+
+class TestBackendSelection:
+    """Tests de selección de backend y claves de modelo"""
+
+    def test_model_keys_do_not_collide(self):
+        """Test: Los vectores ONNX no reutilizan la caché de los de PyTorch"""
+        assert embedding_model_key("sentence_transformers", "all-MiniLM-L6-v2") == "all-MiniLM-L6-v2"
+        assert embedding_model_key("onnx", "all-MiniLM-L6-v2") == "all-MiniLM-L6-v2:onnx-int8"
+
+    def test_unknown_backend(self):
+        """Test: Un backend desconocido falla con un error claro"""
+        with pytest.raises(ValueError):
+            create_embedding_backend("tensorflow")
+
+
+@pytest.fixture(scope="module")
+def torch_backend():
+    """Backend PyTorch del modelo configurado (se omite si no se puede cargar)"""
+    pytest.importorskip("sentence_transformers")
+    try:
+        return create_embedding_backend("sentence_transformers", os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    except Exception as e:
+        pytest.skip(f"modelo original no disponible: {e}")
+
+
+@pytest.fixture(scope="module")
+def onnx_backend(torch_backend, tmp_path_factory):
+    """El mismo modelo exportado a ONNX int8 en un directorio temporal"""
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    model_dir = tmp_path_factory.mktemp("onnx")
+    export_onnx_model(torch_backend.model_name, model_dir)
+    return create_embedding_backend("onnx", torch_backend.model_name, onnx_model_path=str(model_dir))
+
+
+class TestOnnxParity:
+    """Paridad del backend ONNX int8 con el backend PyTorch sobre el corpus de vinos"""
+
+    def test_cosine_agreement_on_wine_corpus(self, torch_backend, onnx_backend):
+        """Test: Los embeddings int8 coinciden con los float32 en coseno"""
+        texts = [doc["content"] for doc in load_knowledge_documents(KNOWLEDGE_DIR)]
+        if not texts:
+            pytest.skip("sin corpus de vinos en knowledge_base")
+        reference = torch_backend.encode(texts)
+        quantized = onnx_backend.encode(texts)
+
+        assert onnx_backend.model_key != torch_backend.model_key
+        assert quantized.shape == reference.shape
+        cosine = (reference * quantized).sum(axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1)
+        )
+        assert cosine.mean() >= MIN_MEAN_COSINE
+        assert cosine.min() >= MIN_COSINE
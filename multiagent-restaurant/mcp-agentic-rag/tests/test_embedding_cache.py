@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la caché persistente de embeddings
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache:
+    """Tests para la clase EmbeddingCache"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Crear caché temporal para tests"""
+        cache = EmbeddingCache(db_path=str(tmp_path / "embeddings.db"), max_entries=3)
+        yield cache
+        cache.close()
+
+    def test_miss_then_hit(self, cache):
+        """Test: Un texto nuevo es un fallo y tras guardarlo es un acierto"""
+        assert cache.get_many("modelo", ["tinto de Rioja"]) == [None]
+
+        cache.put_many("modelo", ["tinto de Rioja"], [np.arange(4, dtype=np.float32)])
+        cached = cache.get_many("modelo", ["tinto de Rioja"])
+
+        np.testing.assert_array_equal(cached[0], np.arange(4, dtype=np.float32))
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_key_includes_model(self, cache):
+        """Test: El mismo contenido con otro modelo no comparte entrada"""
+        cache.put_many("modelo-a", ["blanco"], [np.ones(4)])
+        assert cache.get_many("modelo-b", ["blanco"]) == [None]
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test: Los embeddings sobreviven a un reinicio"""
+        db_path = str(tmp_path / "embeddings.db")
+        first = EmbeddingCache(db_path=db_path)
+        first.put_many("modelo", ["espumoso"], [np.ones(4)])
+        first.close()
+
+        second = EmbeddingCache(db_path=db_path)
+        assert second.get_many("modelo", ["espumoso"])[0] is not None
+        second.close()
+
+    def test_size_limit_evicts_least_recently_used(self, cache):
+        """Test: Al superar el límite se expulsan las entradas menos usadas"""
+        cache.put_many("modelo", ["a", "b", "c"], [np.ones(4)] * 3)
+        cache.get_many("modelo", ["a"])
+        cache.put_many("modelo", ["d"], [np.ones(4)])
+
+        stats = cache.stats()
+        assert stats["entries"] == 3
+        assert stats["evictions"] == 1
+        assert cache.get_many("modelo", ["a"])[0] is not None
+
+    def test_entry_count_ignores_replacements(self, tmp_path):
+        """Test: Reescribir un texto ya cacheado no cuenta como entrada nueva"""
+        db_path = str(tmp_path / "embeddings.db")
+        cache = EmbeddingCache(db_path=db_path, max_entries=3)
+        cache.put_many("modelo", ["a", "a", "b"], [np.ones(4)] * 3)
+        cache.put_many("modelo", ["a"], [np.zeros(4)])
+        assert cache.stats()["entries"] == 2
+        assert cache.evictions == 0
+        cache.close()
+
+        reopened = EmbeddingCache(db_path=db_path)
+        assert reopened.stats()["entries"] == 2
+        reopened.close()
+
+    def test_hits_are_written_in_batches(self, tmp_path, monkeypatch):
+        """Test: Un acierto no escribe en disco; last_used se guarda con la siguiente escritura o al cerrar"""
+        db_path = str(tmp_path / "embeddings.db")
+        clock = iter([100.0, 200.0])
+        monkeypatch.setattr("embedding_cache.time.time", lambda: next(clock))
+        cache = EmbeddingCache(db_path=db_path)
+        assert cache._conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+        cache.put_many("modelo", ["a"], [np.ones(4)])
+        cache.get_many("modelo", ["a"])
+        last_used = "SELECT last_used FROM embeddings"
+        assert cache._conn.execute(last_used).fetchone()[0] == 100.0
+        cache.close()
+
+        reopened = EmbeddingCache(db_path=db_path)
+        assert reopened._conn.execute(last_used).fetchone()[0] == 200.0
+        reopened.close()
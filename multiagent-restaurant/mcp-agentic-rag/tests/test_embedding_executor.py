@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el ejecutor de embeddings con micro-batching
+"""
+
+import os
+import sys
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_executor import EmbeddingExecutor
+
+
+class RecordingEncoder:
+    """Encoder falso que registra los lotes recibidos y el hilo que lo ejecuta"""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.threads.add(threading.current_thread().name)
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+class TestEmbeddingExecutor:
+    """Tests para la clase EmbeddingExecutor"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_batch(self):
+        """Test: Peticiones concurrentes se resuelven con un único lote"""
+        encoder = RecordingEncoder()
+        executor = EmbeddingExecutor(encoder, max_batch_size=16, max_wait_ms=20, workers=1)
+
+        texts = ["tinto", "blanco", "rosado", "espumoso"]
+        vectors = await asyncio.gather(*(executor.embed(text) for text in texts))
+
+        assert [vector[0] for vector in vectors] == [len(text) for text in texts]
+        assert len(encoder.batches) == 1
+        assert all(name.startswith("embedding") for name in encoder.threads)
+        await executor.close()
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_is_respected(self):
+        """Test: Ningún lote supera el tamaño máximo configurado"""
+        encoder = RecordingEncoder()
+        executor = EmbeddingExecutor(encoder, max_batch_size=2, max_wait_ms=20, workers=2)
+
+        await asyncio.gather(*(executor.embed(str(i)) for i in range(5)))
+
+        assert max(len(batch) for batch in encoder.batches) <= 2
+        assert sum(len(batch) for batch in encoder.batches) == 5
+        await executor.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_callers(self):
+        """Test: Un fallo del modelo llega a cada llamante del lote"""
+        def failing_encoder(texts):
+            raise RuntimeError("modelo no disponible")
+
+        executor = EmbeddingExecutor(failing_encoder, max_wait_ms=1)
+        with pytest.raises(RuntimeError):
+            await executor.embed("tinto")
+        await executor.close()
+
+    @pytest.mark.asyncio
+    async def test_queries_use_query_encoder(self):
+        """Test: Las consultas usan su propio encode y los lotes de documentos el principal"""
+        documents, queries = RecordingEncoder(), RecordingEncoder()
+        executor = EmbeddingExecutor(documents, max_wait_ms=1, query_encode_fn=queries)
+
+        await executor.embed("tinto")
+        await executor.embed_many(["blanco", "rosado"], queries=True)
+        await executor.embed_many(["Vino: Viña Roja"])
+
+        assert queries.batches == [["tinto"], ["blanco", "rosado"]]
+        assert documents.batches == [["Vino: Viña Roja"]]
+        await executor.close()
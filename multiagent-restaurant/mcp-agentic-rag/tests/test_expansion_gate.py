@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la expansión de consultas adaptativa
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from expansion_gate import ExpansionGate
+
+
+@pytest.fixture
+def gate():
+    return ExpansionGate(enabled=True, min_score=0.6, min_margin=0.05, reserve_ms=500, shadow_rate=0)
+
+
+class TestExpansionGate:
+    """Tests de la decisión de expandir y sus contadores"""
+
+    def test_confident_match_skips_expansion(self, gate):
+        """Test: un mejor resultado alto y destacado no se expande"""
+        assert gate.decide([0.82, 0.61, 0.60]) == (False, "confident")
+
+    def test_low_score_or_margin_expands(self, gate):
+        """Test: relevancia baja, margen estrecho o sin resultados se expanden"""
+        assert gate.decide([0.45, 0.40]) == (True, "low_score")
+        assert gate.decide([0.80, 0.78]) == (True, "low_margin")
+        assert gate.decide([]) == (True, "low_score")
+        stats = gate.stats()
+        assert stats["expanded"] == 3
+        assert stats["expansion_rate"] == 1.0
+
+    def test_latency_budget(self, gate):
+        """Test: sin tiempo para la expansión observada no se expande"""
+        assert gate.decide([0.3], remaining_ms=400) == (False, "budget")
+        assert gate.decide([0.3], remaining_ms=600) == (True, "low_score")
+        gate.observe_latency(900)
+        assert gate.decide([0.3], remaining_ms=600) == (False, "budget")
+        assert gate.stats()["reasons"] == {"budget": 2, "low_score": 1}
+
+    def test_recall_by_population(self, gate):
+        """Test: recall sin expansión separado entre consultas expandidas y muestras en sombra"""
+        gate.record_recall(["a", "b", "c", "d"], ["a", "b", "x", "y"])
+        gate.record_recall(["a", "b"], ["a", "b"], expanded=False)
+        recall = gate.stats()["recall_without_expansion"]
+        assert recall["expanded"] == {"mean": 0.5, "samples": 1}
+        assert recall["skipped"] == {"mean": 1.0, "samples": 1}
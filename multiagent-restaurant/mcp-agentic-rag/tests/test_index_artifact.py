@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el artefacto de índice precalculado
+"""
+
+import os
+import sys
+import json
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_artifact import build_index_artifact, load_index_artifact
+from vector_index import NumpyVectorIndex
+
+
+def fake_encode(texts):
+    """Encoder determinista: longitud y número de palabras"""
+    return np.array([[len(text), len(text.split()), 1.0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def knowledge_dir(tmp_path):
+    """Base de conocimiento mínima con un texto y dos vinos"""
+    kb = tmp_path / "knowledge_base"
+    kb.mkdir()
+    (kb / "maridaje.txt").write_text("El tinto acompaña carnes rojas", encoding="utf-8")
+    (kb / "vinos.json").write_text(json.dumps([
+        {"name": "Rioja Reserva", "type": "Tinto", "region": "Rioja", "price": 25},
+        {"name": "Albariño", "type": "Blanco", "region": "Rías Baixas", "price": 15},
+    ]), encoding="utf-8")
+    return kb
+
+
+class TestIndexArtifact:
+    """Tests de construcción y carga del artefacto"""
+
+    def test_build_and_load_memmap(self, knowledge_dir, tmp_path):
+        """Test: el artefacto se abre mapeado en memoria con los mismos registros"""
+        output = tmp_path / "index"
+        manifest = build_index_artifact(knowledge_dir, output, "fake-model", fake_encode)
+        artifact = load_index_artifact(output)
+
+        assert manifest["count"] == 3
+        assert isinstance(artifact.embeddings, np.memmap)
+        assert artifact.embeddings.shape == (3, 3)
+        assert "vino_rioja_reserva_sa" in artifact.ids
+        assert np.allclose(np.linalg.norm(artifact.embeddings, axis=1), 1.0)
+
+    def test_is_current_detects_changes(self, knowledge_dir, tmp_path):
+        """Test: cambiar el modelo o un archivo deja el artefacto obsoleto"""
+        output = tmp_path / "index"
+        build_index_artifact(knowledge_dir, output, "fake-model", fake_encode)
+        artifact = load_index_artifact(output)
+
+        assert artifact.is_current(knowledge_dir, "fake-model")
+        assert not artifact.is_current(knowledge_dir, "otro-modelo")
+
+        (knowledge_dir / "maridaje.txt").write_text("El blanco acompaña pescados", encoding="utf-8")
+        assert not artifact.is_current(knowledge_dir, "fake-model")
+
+    def test_missing_artifact(self, tmp_path):
+        """Test: sin manifiesto no hay artefacto"""
+        assert load_index_artifact(tmp_path / "no_existe") is None
+
+    def test_index_over_memmap_copies_on_write(self, knowledge_dir, tmp_path):
+        """Test: el índice consulta el memmap y lo copia solo al escribir"""
+        output = tmp_path / "index"
+        build_index_artifact(knowledge_dir, output, "fake-model", fake_encode)
+        artifact = load_index_artifact(output)
+        index = NumpyVectorIndex.from_arrays(
+            artifact.ids, artifact.embeddings, artifact.documents, artifact.metadatas
+        )
+
+        query = index.query(query_embeddings=[artifact.embeddings[0]], n_results=1)
+        assert query["ids"][0] == [artifact.ids[0]]
+
+        index.add(ids=["nuevo"], embeddings=[[1.0, 1.0, 1.0]], documents=["nuevo"])
+        index.delete(ids=[artifact.ids[0]])
+        assert index.count() == 3
+        assert artifact.embeddings.shape == (3, 3)
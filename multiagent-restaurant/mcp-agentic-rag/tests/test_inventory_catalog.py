@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el catálogo columnar del inventario
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_catalog import InventoryCatalog
+
+
+@pytest.fixture
+def catalog():
+    """Catálogo con tres vinos y un documento de texto"""
+    catalog = InventoryCatalog(initial_capacity=2)
+    catalog.add(
+        ["a", "b", "c", "teoria"],
+        [
+            {"type": "vino", "name": "A", "wine_type": "Tinto", "region": "Rioja", "vintage": 2018, "price": 20.0, "stock": 10, "rating": 90},
+            {"type": "vino", "name": "B", "wine_type": "Blanco", "region": "Rías Baixas", "vintage": 2022, "price": 15.0, "stock": 4, "rating": 88},
+            {"type": "Tinto", "doc_type": "wine", "name": "C", "region": "Rioja", "vintage": 2018, "price": 50.0, "stock": 2, "rating": 94},
+            {"type": "text"},
+        ],
+    )
+    return catalog
+
+
+class TestInventoryCatalog:
+    """Tests de filtros y agregados"""
+
+    def test_totals(self, catalog):
+        """Test: stock, valor y precio promedio de todo el inventario"""
+        stats = catalog.stats()
+        assert len(catalog) == 3
+        assert stats["stock_total"] == 16
+        assert stats["valor_total"] == 360.0
+        assert stats["precio_promedio"] == pytest.approx(28.33, abs=0.01)
+
+    def test_filters_accent_insensitive(self, catalog):
+        """Test: los filtros categóricos ignoran acentos y mayúsculas"""
+        assert catalog.stats(region="rias baixas")["vinos"] == 1
+        assert catalog.stats(tipo="tinto", precio_max=30)["vinos"] == 1
+        assert catalog.stats(region="Borgoña")["vinos"] == 0
+
+    def test_grouped(self, catalog):
+        """Test: agregados por región, tipo y añada"""
+        stats = catalog.stats(include=["por_region", "por_tipo", "por_añada"])
+        assert stats["por_region"]["Rioja"] == {"vinos": 2, "stock": 12, "valor": 300.0}
+        assert stats["por_tipo"]["Blanco"]["stock"] == 4
+        assert stats["por_añada"]["2018"]["vinos"] == 2
+        assert "stock_total" not in stats
+
+    def test_update_and_remove(self, catalog):
+        """Test: actualizar stock y eliminar vinos"""
+        catalog.add(["b"], [{"type": "vino", "name": "B", "wine_type": "Blanco", "price": 15.0, "stock": 0}])
+        catalog.remove(["a"])
+        stats = catalog.stats()
+        assert stats["vinos"] == 2
+        assert stats["stock_total"] == 2
+
+    def test_newest_vintage(self, catalog):
+        """Test: la añada más reciente sigue las altas y bajas; sin añadas es None"""
+        assert catalog.newest_vintage() == 2022
+        catalog.remove(["b"])
+        assert catalog.newest_vintage() == 2018
+        assert InventoryCatalog().newest_vintage() is None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la sincronización incremental de la base de conocimiento
+"""
+
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kb_sync import plan_sync, stale_documents, wine_key, load_manifest, save_manifest
+from knowledge_loader import load_knowledge_documents
+
+
+def doc(doc_id, content, **metadata):
+    return {"id": doc_id, "content": content, "metadata": metadata}
+
+
+def write_wines(kb, wines):
+    (kb / "vinos.json").write_text(json.dumps(wines), encoding="utf-8")
+
+
+class TestPlanSync:
+    """Tests del cálculo de diferencias contra el manifiesto"""
+
+    def test_first_sync_adds_everything(self):
+        """Test: Sin manifiesto todos los documentos son nuevos"""
+        plan = plan_sync([doc("a", "uno"), doc("b", "dos")], {})
+        assert [d["id"] for d in plan.upserts] == ["a", "b"]
+        assert plan.counts() == {"added": 2, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    def test_second_sync_is_idempotent(self):
+        """Test: Repetir la sincronización sin cambios no escribe nada"""
+        documents = [doc("a", "uno", type="text"), doc("b", "dos")]
+        plan = plan_sync(documents, plan_sync(documents, {}).manifest)
+        assert plan.upserts == [] and plan.deleted == []
+        assert plan.unchanged == 2
+
+    def test_detects_updates_and_deletions(self):
+        """Test: Cambios de contenido o metadatos se actualizan y los ausentes se borran"""
+        manifest = plan_sync([doc("a", "uno"), doc("b", "dos", price=10), doc("c", "tres")], {}).manifest
+        plan = plan_sync([doc("a", "uno"), doc("b", "dos", price=12), doc("d", "cuatro")], manifest)
+
+        assert [d["id"] for d in plan.updated] == ["b"]
+        assert [d["id"] for d in plan.added] == ["d"]
+        assert plan.deleted == ["c"]
+        assert set(plan.manifest) == {"a", "b", "d"}
+
+    def test_stale_legacy_documents(self):
+        """Test: Copias de cargas anteriores (otros IDs del mismo archivo, load-wines.py) se detectan"""
+        plan = plan_sync([doc("vino_alta_2018", "Alta", source="vinos.json", name="Viña Alta", vintage=2018)], {})
+        replacements = {wine_key(d["metadata"]) for d in plan.upserts}
+        ids = ["vino_alta_2018", "vino_0_Alta", "wine_0_alta", "wine_1_alta", "wine_2_privado",
+               "teoria_sumiller", "doc_1"]
+        metadatas = [{"source": "vinos.json"}, {"source": "vinos.json"},
+                     {"doc_type": "wine", "name": "Vina Alta", "vintage": 2018},
+                     {"doc_type": "wine", "name": "Viña Alta", "vintage": 2015},
+                     {"doc_type": "wine", "name": "Reserva Privada", "vintage": 2018},
+                     {"source": "teoria_sumiller.txt"}, None]
+
+        stale = stale_documents(ids, metadatas, plan.manifest, {"vinos.json", "teoria_sumiller.txt"}, replacements)
+        assert stale == ["vino_0_Alta", "wine_0_alta", "teoria_sumiller"]
+
+
+class TestManifest:
+    """Tests de persistencia del manifiesto"""
+
+    def test_roundtrip(self, tmp_path):
+        """Test: El manifiesto guardado se vuelve a leer igual"""
+        path = tmp_path / "data" / "manifest.json"
+        save_manifest(path, {"a": "hash"})
+        assert load_manifest(path) == {"a": "hash"}
+        assert not (tmp_path / "data" / "manifest.json.tmp").exists()
+
+    def test_missing_or_corrupt_manifest_is_empty(self, tmp_path):
+        """Test: Un manifiesto ausente o corrupto fuerza una sincronización completa"""
+        corrupt = tmp_path / "manifest.json"
+        corrupt.write_text("{no es json", encoding="utf-8")
+        assert load_manifest(tmp_path / "missing.json") == {}
+        assert load_manifest(corrupt) == {}
+
+
+class TestStableIds:
+    """Tests de IDs de vino independientes de la posición en vinos.json"""
+
+    def test_inserting_a_wine_only_adds_it(self, tmp_path):
+        """Test: Insertar un vino al principio no modifica los demás documentos"""
+        rioja = {"name": "Rioja Reserva", "type": "Tinto", "vintage": 2018, "price": 25}
+        albarino = {"name": "Albariño", "type": "Blanco", "vintage": 2022, "price": 15}
+        write_wines(tmp_path, [rioja, albarino])
+        manifest = plan_sync(load_knowledge_documents(tmp_path), {}).manifest
+
+        write_wines(tmp_path, [{"name": "Cava Brut", "type": "Espumoso", "vintage": 2020}, rioja, albarino])
+        plan = plan_sync(load_knowledge_documents(tmp_path), manifest)
+
+        assert [d["id"] for d in plan.added] == ["vino_cava_brut_2020"]
+        assert plan.counts() == {"added": 1, "updated": 0, "deleted": 0, "unchanged": 2}
+
+    def test_duplicate_wines_get_distinct_ids(self, tmp_path):
+        """Test: Dos entradas con el mismo nombre y añada no colisionan"""
+        wine = {"name": "Rioja Reserva", "vintage": 2018}
+        write_wines(tmp_path, [wine, wine])
+        ids = [d["id"] for d in load_knowledge_documents(tmp_path)]
+        assert ids == ["vino_rioja_reserva_2018", "vino_rioja_reserva_2018_2"]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el índice léxico BM25 y la normalización de texto
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lexical_index import LexicalIndex
+from text_utils import fold_accents, tokenize
+
+
+@pytest.fixture
+def index():
+    """Índice con tres vinos y un texto"""
+    index = LexicalIndex()
+    index.add(
+        ids=["senorio", "estrellas", "luna", "teoria"],
+        documents=[
+            "Vino: Señorío de de Luna\nTipo: Tinto\nRegión: Rioja",
+            "Vino: Viña de las Estrellas\nTipo: Espumoso\nRegión: Penedès",
+            "Vino: Colina de la Luna\nTipo: Blanco\nRegión: Rueda",
+            "Los taninos aportan estructura al vino tinto",
+        ],
+        metadatas=[
+            {"type": "vino", "name": "Señorío de de Luna"},
+            {"type": "vino", "name": "Viña de las Estrellas"},
+            {"type": "vino", "name": "Colina de la Luna"},
+            {"type": "text"},
+        ],
+    )
+    return index
+
+
+class TestTextUtils:
+    """Tests de normalización"""
+
+    def test_fold_accents(self):
+        """Test: minúsculas sin acentos ni eñes"""
+        assert fold_accents("Señorío PENEDÈS") == "senorio penedes"
+
+    def test_tokenize_stopwords(self):
+        """Test: las palabras vacías se eliminan solo si se pide"""
+        assert tokenize("Viña de las Estrellas") == ["vina", "de", "las", "estrellas"]
+        assert tokenize("Viña de las Estrellas", drop_stopwords=True) == ["vina", "estrellas"]
+
+
+class TestLexicalIndex:
+    """Tests de BM25 y nombres"""
+
+    def test_search_accent_insensitive(self, index):
+        """Test: la búsqueda ignora acentos"""
+        hits = index.search("senorio", top_k=3)
+        assert hits[0][0] == "senorio"
+
+    def test_search_predicate(self, index):
+        """Test: el predicado filtra por metadatos"""
+        hits = index.search("tinto", top_k=5, predicate=lambda metadata: metadata.get("type") == "vino")
+        assert [doc_id for doc_id, _ in hits] == ["senorio"]
+
+    def test_match_names(self, index):
+        """Test: el nombre completo en la consulta identifica el vino"""
+        assert index.match_names("¿qué tal el Viña de las Estrellas?") == ["estrellas"]
+        assert index.match_names("vino de luna") == []
+
+    def test_incremental_update(self, index):
+        """Test: reemplazar y eliminar documentos actualiza postings y nombres"""
+        index.add(["estrellas"], ["Vino: Cielo Abierto"], [{"type": "vino", "name": "Cielo Abierto"}])
+        assert index.match_names("Viña de las Estrellas") == []
+        assert index.search("cielo")[0][0] == "estrellas"
+
+        index.remove(["estrellas"])
+        assert len(index) == 3
+        assert index.search("cielo") == []
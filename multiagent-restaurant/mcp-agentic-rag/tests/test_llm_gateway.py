@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el gateway LLM asíncrono
+"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_gateway import LLMGateway, LLMBackend, LLMResult
+
+
+class FakeBackend(LLMBackend):
+    """Backend LLM local que simula latencia y registra la concurrencia"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def complete(self, messages, **params):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return LLMResult(text=f"eco: {messages[-1]['content']}", prompt_tokens=10, completion_tokens=5)
+        finally:
+            self.active -= 1
+
+
+class TestLLMGateway:
+    """Tests para la clase LLMGateway"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_limited(self):
+        """Test: Nunca hay más llamadas en vuelo que el límite configurado"""
+        backend = FakeBackend()
+        gateway = LLMGateway(backend, max_concurrency=2, timeout=5)
+
+        messages = [{"role": "user", "content": "hola"}]
+        results = await asyncio.gather(*(gateway.complete(messages) for _ in range(6)))
+
+        assert all(result.text == "eco: hola" for result in results)
+        assert backend.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_token_usage_by_stage(self):
+        """Test: Los tokens se acumulan por etapa"""
+        gateway = LLMGateway(FakeBackend(), max_concurrency=4, timeout=5)
+        messages = [{"role": "user", "content": "hola"}]
+
+        await gateway.complete(messages, stage="expansion")
+        await gateway.complete(messages, stage="answer")
+        await gateway.complete(messages, stage="answer")
+
+        stats = gateway.stats()
+        assert stats["calls"] == 3
+        assert stats["prompt_tokens"] == 30
+        assert stats["by_stage"]["answer"]["completion_tokens"] == 10
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_enforced(self):
+        """Test: Una llamada lenta se corta con el timeout por llamada"""
+        gateway = LLMGateway(FakeBackend(delay=1), timeout=5)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await gateway.complete([{"role": "user", "content": "hola"}], timeout=0.01)
+        assert gateway.stats()["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_text_and_accounts_usage(self):
+        """Test: El streaming entrega el texto por fragmentos y contabiliza tokens"""
+
+        class StreamingBackend(FakeBackend):
+            async def stream(self, messages, **params):
+                for word in ["un ", "tinto ", "joven"]:
+                    yield LLMResult(text=word)
+                yield LLMResult(text="", prompt_tokens=12, completion_tokens=3)
+
+        gateway = LLMGateway(StreamingBackend(), timeout=5)
+        chunks = [chunk async for chunk in gateway.stream([{"role": "user", "content": "hola"}], stage="query")]
+
+        assert "".join(chunks) == "un tinto joven"
+        assert gateway.stats()["by_stage"]["query"] == {"calls": 1, "prompt_tokens": 12, "completion_tokens": 3}
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_closes_backend(self):
+        """Test: Si el consumidor abandona el stream, el del backend se cierra y el hueco se libera"""
+
+        class ClosingBackend(FakeBackend):
+            closed = False
+
+            async def stream(self, messages, **params):
+                try:
+                    for word in ["un ", "tinto ", "joven"]:
+                        yield LLMResult(text=word)
+                finally:
+                    self.closed = True
+
+        backend = ClosingBackend()
+        gateway = LLMGateway(backend, max_concurrency=1, timeout=5)
+        stream = gateway.stream([{"role": "user", "content": "hola"}])
+        assert await stream.__anext__() == "un "
+        await stream.aclose()
+
+        assert backend.closed
+        assert gateway.stats()["in_flight"] == 0
+        result = await gateway.complete([{"role": "user", "content": "hola"}])
+        assert result.text == "eco: hola"
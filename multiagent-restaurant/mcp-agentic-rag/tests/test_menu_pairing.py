@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la asignación de vinos del menú maridaje
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from menu_pairing import assign_wines, bottles_needed
+
+
+def wine(doc_id, score, stock=None):
+    """Fuente de un vino candidato"""
+    metadata = {"type": "vino", "name": doc_id.title(), "wine_type": "Tinto", "price": 20.0}
+    if stock is not None:
+        metadata["stock"] = stock
+    return {"id": doc_id, "content": "", "metadata": metadata, "relevance_score": score}
+
+
+class TestMenuPairing:
+    """Tests de deduplicación y stock"""
+
+    def test_bottles_needed(self):
+        """Test: una copa por comensal, 6 copas por botella"""
+        assert bottles_needed(1) == 1
+        assert bottles_needed(6) == 1
+        assert bottles_needed(20) == 4
+
+    def test_dedupes_by_global_relevance(self):
+        """Test: el par más relevante del menú se queda el vino compartido"""
+        rankings = [
+            [wine("rioja", 0.7), wine("toro", 0.6)],
+            [wine("rioja", 0.9), wine("rueda", 0.5)],
+        ]
+        courses = assign_wines(rankings, guests=4)
+        assert [course["source"]["id"] for course in courses] == ["toro", "rioja"]
+        assert not any(course["repeated"] for course in courses)
+
+    def test_skips_wines_without_stock(self):
+        """Test: se prefiere un vino con stock suficiente para los comensales"""
+        rankings = [[wine("rioja", 0.9, stock=2), wine("toro", 0.8, stock=10)]]
+        course = assign_wines(rankings, guests=30)[0]
+        assert course["source"]["id"] == "toro"
+        assert course["bottles"] == 5 and course["stock_ok"]
+
+    def test_fallback_when_nothing_fits(self):
+        """Test: sin stock suficiente se asigna el mejor y se marca; sin candidatos libres se repite"""
+        rankings = [
+            [wine("rioja", 0.9, stock=1)],
+            [wine("rioja", 0.8, stock=1)],
+            [],
+        ]
+        courses = assign_wines(rankings, guests=12)
+        assert courses[0]["source"]["id"] == "rioja" and not courses[0]["stock_ok"]
+        assert courses[1]["repeated"]
+        assert courses[2] is None
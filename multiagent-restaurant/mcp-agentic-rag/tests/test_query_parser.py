@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el análisis determinista de restricciones de consultas
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_catalog import InventoryCatalog
+from query_parser import QueryParser, merge_filters
+from wine_filters import WineFilter
+
+
+@pytest.fixture
+def catalog():
+    """Catálogo con el vocabulario de tipos y regiones de los tests"""
+    catalog = InventoryCatalog()
+    catalog.add(
+        ["a", "b", "c", "d", "e"],
+        [
+            {"type": "vino", "name": "A", "wine_type": "Tinto", "region": "Rioja", "vintage": 2016, "price": 25.0, "rating": 91},
+            {"type": "vino", "name": "B", "wine_type": "Tinto", "region": "Rioja Alavesa", "vintage": 2014, "price": 45.0, "rating": 94},
+            {"type": "vino", "name": "C", "wine_type": "Blanco", "region": "Rías Baixas", "vintage": 2018, "price": 18.0, "rating": 90},
+            {"type": "vino", "name": "D", "wine_type": "Espumoso", "region": "Champagne", "vintage": 2015, "price": 60.0, "rating": 95},
+            {"type": "vino", "name": "E", "wine_type": "Tinto", "region": "Rioja", "vintage": 2019, "price": 12.0, "rating": 91},
+        ],
+    )
+    return catalog
+
+
+@pytest.fixture
+def parser(catalog):
+    return QueryParser(catalog)
+
+
+class TestQueryParser:
+    """Tests de extracción de restricciones"""
+
+    def test_type_region_and_price(self, parser):
+        """Test: "tinto de Rioja por menos de 30€" es completamente estructurada"""
+        parsed = parser.parse("tinto de Rioja por menos de 30€")
+        assert parsed.structured
+        assert parsed.filters == WineFilter(type="vino", wine_type="Tinto", region="Rioja", price_max=30)
+
+    def test_vintage_and_rating(self, parser):
+        """Test: añada exacta y puntuación mínima"""
+        assert parser.parse("blanco 2018").filters == WineFilter(
+            type="vino", wine_type="Blanco", vintage_min=2018, vintage_max=2018
+        )
+        parsed = parser.parse("espumoso con más de 90 puntos")
+        assert parsed.structured
+        assert parsed.filters.rating_min == 90
+
+    def test_longest_region_and_vintage_bounds(self, parser):
+        """Test: "Rioja Alavesa" gana a "Rioja"; "anterior a" excluye el año citado"""
+        parsed = parser.parse("tinto de Rioja Alavesa anterior a 2016 con 92+")
+        assert parsed.structured
+        assert parsed.filters.region == "Rioja Alavesa"
+        assert parsed.filters.vintage_max == 2015 and parsed.filters.vintage_min is None
+        assert parsed.filters.rating_min == 92
+
+    def test_ranges(self, parser):
+        """Test: rangos de precio y de añadas"""
+        assert parser.parse("entre 20 y 40 euros").filters.price_min == 20
+        filters = parser.parse("tintos 2015-2018").filters
+        assert (filters.wine_type, filters.vintage_min, filters.vintage_max) == ("Tinto", 2015, 2018)
+        filters = parser.parse("algo sobre 50€").filters
+        assert (filters.price_min, filters.price_max) == (40, 60)
+
+    def test_free_text_is_kept(self, parser):
+        """Test: lo que no es restricción queda como texto libre con sus acentos"""
+        parsed = parser.parse("tinto afrutado para cordero asado por menos de 30€")
+        assert not parsed.structured
+        assert parsed.free_text == "afrutado cordero asado"
+
+        parsed = parser.parse("¿Qué es el maridaje?")
+        assert not parsed.has_constraints
+        assert parsed.filters == WineFilter()
+
+    def test_dish_colour_is_not_a_wine_type(self, parser):
+        """Test: "pescado blanco" describe el plato, no el tipo de vino"""
+        parsed = parser.parse("vino para pescado blanco")
+        assert parsed.filters.wine_type is None
+        assert "blanco" in parsed.free_text
+
+    def test_vocabulary_follows_catalog(self, catalog, parser):
+        """Test: una región nueva en el catálogo se reconoce sin reconstruir el parser"""
+        assert parser.parse("vinos de Priorat").filters.region is None
+        catalog.add(["f"], [{"type": "vino", "name": "F", "wine_type": "Tinto", "region": "Priorat", "price": 30.0}])
+        assert parser.parse("vinos de Priorat").filters.region == "Priorat"
+
+
+class TestStructuredRouting:
+    """Tests del filtrado sobre el catálogo y la combinación con filtros explícitos"""
+
+    def test_top_rated_matches(self, catalog, parser):
+        """Test: los vinos que cumplen se ordenan por puntuación y, a igualdad, por precio"""
+        filters = parser.parse("tinto de Rioja 90+").filters
+        mask = catalog.mask(filters.wine_type, filters.region, puntuacion_min=filters.rating_min)
+        assert catalog.top_rated(mask, 5) == ["e", "a"]
+        assert catalog.top_rated(catalog.mask(anada_max=2015), 1) == ["d"]
+
+    def test_explicit_filters_win(self, parser):
+        """Test: los argumentos de la herramienta prevalecen sobre lo extraído de la consulta"""
+        explicit = WineFilter(type="vino", price_max=20)
+        merged = merge_filters(explicit, parser.parse("blanco por menos de 50€").filters)
+        assert merged.price_max == 20
+        assert merged.wine_type == "Blanco"
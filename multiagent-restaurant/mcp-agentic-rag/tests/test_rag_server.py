@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Tests del motor RAG y los endpoints HTTP sobre el índice numpy en memoria,
+con un encoder determinista y un LLM falso (sin modelos descargados ni red)
+"""
+
+import os
+import sys
+import json
+import zlib
+import asyncio
+import threading
+
+import httpx
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# La configuración del servidor se lee al importar el módulo
+os.environ["VECTOR_DB_TYPE"] = "numpy"
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ.pop("OPENAI_API_KEY", None)
+
+import rag_mcp_server as server
+from embedding_backends import EmbeddingBackend
+from embedding_cache import EmbeddingCache
+from llm_gateway import LLMGateway, LLMBackend, LLMResult
+
+
+class FakeEncoder(EmbeddingBackend):
+    """Bolsa de palabras con hash: textos con palabras comunes quedan cerca"""
+
+    name = "fake"
+
+    def encode(self, texts, batch_size=64):
+        matrix = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                matrix[row, zlib.crc32(word.encode("utf-8")) % 64] += 1.0
+        return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+class FakeLLM(LLMBackend):
+    """LLM local que registra las llamadas"""
+
+    def __init__(self, text="respuesta del sumiller"):
+        self.text = text
+        self.calls = []
+
+    async def complete(self, messages, **params):
+        self.calls.append(messages)
+        return LLMResult(text=self.text, prompt_tokens=10, completion_tokens=5)
+
+    async def stream(self, messages, **params):
+        self.calls.append(messages)
+        for word in self.text.split():
+            yield LLMResult(text=word + " ", completion_tokens=1)
+
+
+def wine_doc(name, wine_type="Tinto", region="Rioja", price=20.0, stock=10):
+    metadata = {"type": "vino", "name": name, "wine_type": wine_type, "region": region,
+                "price": price, "stock": stock, "rating": 90, "pairing": "Ideal con carnes rojas."}
+    content = f"Vino: {name}\nTipo: {wine_type}\nRegión: {region}\nMaridaje: Ideal con carnes rojas."
+    return content, metadata
+
+
+def sse_events(body):
+    """[(evento, datos)] de una respuesta server-sent events"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def add_wines(engine, *names):
+    documents = [wine_doc(name) for name in names]
+    await engine.add_documents([content for content, _ in documents], [metadata for _, metadata in documents],
+                               [f"vino_{i}" for i in range(len(documents))])
+
+
+@pytest.fixture
+async def engine(monkeypatch):
+    """Motor con el modelo ya cargado, sin expansión y publicado como `rag_engine` para los endpoints"""
+    engine = server.AgenticRAGEngine()
+    engine.embedding_model = FakeEncoder("bolsa")
+    engine.query_expansion = "none"
+    engine.llm = LLMGateway(FakeLLM(), timeout=5)
+    monkeypatch.setattr(server, "rag_engine", engine)
+    await engine.ensure_initialized()
+    yield engine
+    await engine.embedding_executor.close()
+
+
+@pytest.fixture
+def client(engine):
+    """Cliente HTTP sobre la app ASGI (sin el arranque en segundo plano)"""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+
+class TestAddDocuments:
+    """Tests de la ingesta por lotes y la asignación de IDs"""
+
+    async def test_writes_in_batches(self, engine, monkeypatch):
+        """Test: la escritura se divide en bloques de CHROMA_WRITE_BATCH_SIZE y los IDs explícitos se respetan"""
+        monkeypatch.setattr(server, "CHROMA_WRITE_BATCH_SIZE", 2)
+        batches = []
+        add = engine.collection.add
+        monkeypatch.setattr(engine.collection, "add", lambda **kwargs: batches.append(len(kwargs["ids"])) or add(**kwargs))
+
+        ids = await engine.add_documents([f"texto {i}" for i in range(5)], doc_ids=[None, "propio", None, None, None])
+
+        assert batches == [2, 2, 1]
+        assert ids == ["doc_1", "propio", "doc_2", "doc_3", "doc_4"]
+        assert engine.collection.count() == 5
+        assert len(engine.lexical_index) == 5
+
+    async def test_generated_ids_skip_deleted_gaps(self, engine):
+        """Test: tras borrar documentos (y reiniciar el contador) los IDs nuevos no repiten uno existente"""
+        await engine.add_documents(["uno", "dos", "tres"])
+        engine.delete_documents(["doc_1"])
+        engine._doc_counter = None
+
+        assert await engine.add_document("cuatro") == "doc_4"
+        assert engine.collection.count() == 3
+        assert engine.collection.get(ids=["doc_3"])["documents"] == ["tres"]
+
+    async def test_documents_batch_endpoint(self, engine, client):
+        """Test: POST /documents/batch agrega todos los documentos en una llamada"""
+        content, metadata = wine_doc("Viña Test")
+        response = await client.post("/documents/batch", json={"documents": [
+            {"content": content, "metadata": metadata, "doc_id": "vino_test"},
+            {"content": "notas de cata"}
+        ]})
+
+        assert response.status_code == 200
+        assert response.json() == {"doc_ids": ["vino_test", "doc_1"], "count": 2, "status": "added"}
+        assert engine.collection.count() == 2
+        assert engine.inventory.stats()["vinos"] == 1
+
+
+class TestQueryStream:
+    """Tests de la secuencia de eventos de /query/stream"""
+
+    async def test_sources_tokens_done(self, engine, client):
+        """Test: fuentes, un evento por fragmento y done con los tiempos por etapa"""
+        await add_wines(engine, "Viña Roja", "Monte Tinto")
+        response = await client.post("/query/stream", json={"query": "tinto de Rioja", "max_results": 2})
+        events = sse_events(response.text)
+
+        assert [name for name, _ in events] == ["sources", "token", "token", "token", "done"]
+        assert len(events[0][1]["sources"]) == 2
+        assert events[0][1]["dropped_sources"] == 0
+        assert "".join(data["text"] for name, data in events if name == "token") == "respuesta del sumiller "
+        assert {"embedding_ms", "search_ms", "context_tokens", "first_token_ms", "llm_ms", "total_ms"} <= set(events[-1][1]["timings"])
+
+    async def test_llm_failure_emits_error(self, engine, client):
+        """Test: un fallo del LLM a mitad de respuesta termina con un evento error"""
+
+        class FailingLLM(FakeLLM):
+            async def stream(self, messages, **params):
+                yield LLMResult(text="un ")
+                raise RuntimeError("conexión perdida")
+
+        engine.llm = LLMGateway(FailingLLM(), timeout=5)
+        await add_wines(engine, "Viña Roja")
+        response = await client.post("/query/stream", json={"query": "tinto", "max_results": 1})
+
+        assert [name for name, _ in sse_events(response.text)] == ["sources", "token", "error"]
+        assert sse_events(response.text)[-1][1] == {"error": "conexión perdida"}
+
+
+class TestQueryEndpoint:
+    """Tests de /query con la caché semántica"""
+
+    async def test_answers_are_cached_with_timings(self, engine, client):
+        """Test: una consulta repetida sale de la caché y ambas informan embedding_ms"""
+        await add_wines(engine, "Viña Roja")
+        first = (await client.post("/query", json={"query": "tinto de Rioja", "max_results": 1})).json()
+        second = (await client.post("/query", json={"query": "tinto de Rioja", "max_results": 1})).json()
+
+        assert len(engine.llm.backend.calls) == 1
+        assert second["answer"] == "respuesta del sumiller"
+        assert len(second["sources"]) == 1
+        assert "embedding_ms" in first["timings"] and "embedding_ms" in second["timings"]
+
+    async def test_cached_response_is_a_copy(self, engine):
+        """Test: modificar una respuesta de agentic_rag_query no altera la que sirve la caché"""
+        await add_wines(engine, "Viña Roja", "Monte Tinto")
+        first = await engine.agentic_rag_query("tinto de la casa", max_results=2)
+        first.sources.clear()
+        second = await engine.agentic_rag_query("tinto de la casa", max_results=2)
+
+        assert engine.semantic_cache.stats()["hits"] == 1
+        assert len(second.sources) == 2
+
+    async def test_dropped_sources_are_reported(self, engine, client, monkeypatch):
+        """Test: la respuesta indica cuántas fuentes recuperadas no cupieron en el contexto"""
+        await add_wines(engine, "Viña Roja", "Monte Tinto", "Sierra Alta")
+        full = (await client.post("/query", json={"query": "tinto de Rioja", "max_results": 3})).json()
+        monkeypatch.setattr("context_packing.CONTEXT_TOKEN_BUDGET", 20)
+        packed = (await client.post("/query", json={"query": "vino de Rioja", "max_results": 3})).json()
+
+        assert full["context_used"]["dropped_sources"] == 0
+        assert len(packed["sources"]) == 3
+        assert packed["context_used"]["dropped_sources"] == 2
+
+    async def test_empty_answer_is_not_cached(self, engine, client):
+        """Test: la respuesta de reserva por texto vacío del modelo no se cachea"""
+        engine.llm = LLMGateway(FakeLLM(text=""), timeout=5)
+        await add_wines(engine, "Viña Roja")
+        for _ in range(2):
+            response = (await client.post("/query", json={"query": "tinto de Rioja", "max_results": 1})).json()
+            assert response["answer"] == "No se pudo obtener una respuesta del modelo."
+
+        assert len(engine.llm.backend.calls) == 2
+        assert engine.semantic_cache.stats()["entries"] == 0
+
+
+class TestEmbeddingCache:
+    """Tests de la caché persistente de embeddings en el motor"""
+
+    async def test_queries_are_not_persisted(self, engine, tmp_path):
+        """Test: Solo los documentos ocupan la caché; las consultas no la consultan ni la llenan"""
+        engine.embedding_cache = EmbeddingCache(db_path=str(tmp_path / "embeddings.db"))
+        await add_wines(engine, "Viña Roja", "Monte Tinto")
+        await engine.agentic_rag_query("tinto de la casa", max_results=2)
+        await engine.multi_query_search(["tinto joven", "tinto crianza"], max_results=2)
+
+        stats = engine.embedding_cache.stats()
+        assert stats["entries"] == 2
+        assert stats["hits"] + stats["misses"] == 2
+        engine.embedding_cache.close()
+
+
+class TestWineAge:
+    """Tests de la edad de los vinos compartida por las herramientas MCP"""
+
+    async def test_analysis_agrees_with_region_style(self, engine):
+        """Test: analizar_vino y recomendar_por_region miden la edad desde la añada más reciente"""
+        wines = {"Toro Nuevo": 2021, "Toro Viejo": 2016}
+        metadatas = []
+        for name, vintage in wines.items():
+            _, metadata = wine_doc(name, region="Toro")
+            metadatas.append({**metadata, "vintage": vintage})
+        await engine.add_documents([f"Vino: {name}" for name in wines], metadatas, ["vino_0", "vino_1"])
+
+        async def tool_text(name, arguments):
+            return (await server.call_tool(name, arguments))[0].text
+
+        jovenes = await tool_text("recomendar_por_region", {"region": "Toro", "estilo": "joven"})
+        nuevo = await tool_text("analizar_vino", {"nombre_vino": "Toro Nuevo", "aspectos": ["temperatura"]})
+        viejo = await tool_text("analizar_vino", {"nombre_vino": "Toro Viejo", "aspectos": ["temperatura", "estructura"]})
+
+        assert "Toro Nuevo" in jovenes and "Toro Viejo" not in jovenes
+        assert server.TEMPERATURAS_SERVICIO["tinto_joven"] in nuevo
+        assert server.TEMPERATURAS_SERVICIO["tinto_reserva"] in viejo
+        assert "pulidos por la crianza" in viejo
+
+
+class TestRetrievalOnly:
+    """Tests de agentic_rag_query(generate=False), usado por las herramientas MCP"""
+
+    async def test_no_llm_call_and_empty_answer(self, engine):
+        """Test: solo se recuperan fuentes, sin llamada al LLM y con respuesta vacía"""
+        await add_wines(engine, "Viña Roja", "Monte Tinto")
+        response = await engine.agentic_rag_query("tinto de la casa", max_results=2, generate=False)
+
+        assert engine.llm.backend.calls == []
+        assert response.answer == ""
+        assert len(response.sources) == 2
+        assert engine.retrieval_only_queries == 1
+
+    async def test_cache_scope_is_separate(self, engine):
+        """Test: la respuesta vacía cacheada no se sirve a una consulta que pide generación"""
+        await add_wines(engine, "Viña Roja", "Monte Tinto")
+        await engine.agentic_rag_query("tinto de la casa", max_results=2, generate=False)
+        full = await engine.agentic_rag_query("tinto de la casa", max_results=2)
+        again = await engine.agentic_rag_query("tinto de la casa", max_results=2, generate=False)
+
+        assert full.answer == "respuesta del sumiller"
+        assert len(engine.llm.backend.calls) == 1
+        assert again.answer == ""
+        assert engine.semantic_cache.stats()["entries"] == 2
+        assert engine.semantic_cache.stats()["hits"] == 1
+
+
+class TestSyncKnowledge:
+    """Tests de la sincronización de knowledge_base/ sobre una colección persistente"""
+
+    @pytest.fixture
+    def knowledge(self, tmp_path):
+        wines = [{"name": name, "type": "Tinto", "region": "Rioja", "vintage": 2018, "price": 20.0, "stock": 6,
+                  "description": "Vino tinto elaborado con Tempranillo.", "pairing": "Ideal con carnes rojas."}
+                 for name in ("Viña Alta", "Monte Bajo")]
+        (tmp_path / "vinos.json").write_text(json.dumps(wines), encoding="utf-8")
+        (tmp_path / "teoria_sumiller.txt").write_text("I. MARIDAJE\nA. Principios\nIntensidad y acidez.", encoding="utf-8")
+        return server.load_knowledge_documents(tmp_path)
+
+    async def test_first_sync_removes_legacy_copies(self, engine, knowledge, tmp_path):
+        """Test: la primera sincronización borra los IDs de cargas anteriores y cada vino queda una vez;
+        un vino subido por la API que no está en vinos.json se conserva"""
+        legacy = [
+            ("vino_0_Viña_Alta", {"source": "vinos.json", "type": "vino", "name": "Viña Alta", "wine_type": "Tinto", "stock": 6}),
+            ("vino_1_Monte_Bajo", {"source": "vinos.json", "type": "vino", "name": "Monte Bajo", "wine_type": "Tinto", "stock": 6}),
+            ("wine_0_viña_alta", {"doc_type": "wine", "type": "Tinto", "name": "Viña Alta", "vintage": 2018, "stock": 6}),
+            ("wine_9_casa", {"doc_type": "wine", "type": "Tinto", "name": "Vino de la Casa", "vintage": 2018, "stock": 3}),
+            ("teoria_sumiller", {"source": "teoria_sumiller.txt", "type": "text"}),
+            ("nota_sala", {"type": "text"}),
+        ]
+        await engine.add_documents([f"legado {doc_id}" for doc_id, _ in legacy], [m for _, m in legacy],
+                                   [doc_id for doc_id, _ in legacy])
+
+        counts = await engine.sync_knowledge(knowledge, manifest_path=tmp_path / "manifest.json")
+
+        expected = {doc["id"] for doc in knowledge} | {"wine_9_casa", "nota_sala"}
+        assert set(engine.collection.get(include=[])["ids"]) == expected
+        assert counts["deleted"] == 4
+        assert engine.inventory.stats(include=["stock_total"]) == {"vinos": 3, "stock_total": 15}
+        assert len(engine.lexical_index) == len(expected)
+
+    async def test_incomplete_collection_forces_full_sync(self, engine, knowledge, tmp_path):
+        """Test: una colección reiniciada y rellenada por la API (mismo número de documentos) se resincroniza"""
+        manifest_path = tmp_path / "manifest.json"
+        await engine.sync_knowledge(knowledge, manifest_path=manifest_path)
+        engine.delete_documents(engine.collection.get(include=[])["ids"])
+        await engine.add_documents([f"nota {i}" for i in range(len(knowledge))])
+
+        counts = await engine.sync_knowledge(knowledge, manifest_path=manifest_path)
+
+        assert counts["added"] == len(knowledge)
+        assert engine.collection.count() == 2 * len(knowledge)
+
+
+class TestWarmUp:
+    """Tests del arranque en segundo plano en frío (sin artefacto ni caché de embeddings)"""
+
+    @pytest.fixture
+    def cold_start(self, engine, tmp_path, monkeypatch):
+        """Base de conocimiento en tmp_path y un modelo que no termina de cargar hasta `loaded.set()`"""
+        wines = [{"name": name, "type": "Tinto", "region": "Rioja", "vintage": 2018, "price": 20.0, "stock": 6,
+                  "description": "Vino tinto elaborado con Tempranillo.", "pairing": "Ideal con carnes rojas."}
+                 for name in ("Viña Alta", "Monte Bajo")]
+        (tmp_path / "vinos.json").write_text(json.dumps(wines), encoding="utf-8")
+        monkeypatch.setattr(server, "KNOWLEDGE_BASE_PATH", str(tmp_path))
+        monkeypatch.setattr(server, "INDEX_ARTIFACT_PATH", str(tmp_path / "index"))
+        monkeypatch.setattr(server, "KB_SYNC_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+
+        loaded = threading.Event()
+
+        def slow_backend(backend, model_name):
+            loaded.wait(timeout=10)
+            return FakeEncoder(model_name)
+
+        monkeypatch.setattr(server, "create_embedding_backend", slow_backend)
+        engine.embedding_model = None
+        engine.collection = None
+        yield loaded
+        loaded.set()
+
+    async def test_structured_answers_before_the_model(self, engine, client, cold_start):
+        """Test: con el modelo cargando, BM25 y el inventario ya responden; ready al terminar"""
+        warm_up = asyncio.create_task(server.warm_up())
+        for _ in range(200):
+            if len(engine.lexical_index):
+                break
+            await asyncio.sleep(0.01)
+
+        assert not engine.model_ready
+        assert (await client.get("/health/live")).json() == {"status": "alive"}
+        ready = await client.get("/health/ready")
+        assert ready.status_code == 503
+        assert ready.json()["components"]["embedding_model"]["status"] != "ready"
+        assert engine.inventory.stats(include=["stock_total"]) == {"vinos": 2, "stock_total": 12}
+
+        response = (await client.post("/query", json={"query": "Viña Alta", "max_results": 1})).json()
+        assert response["timings"]["lexical_only"] is True
+        assert response["sources"][0]["metadata"]["name"] == "Viña Alta"
+        assert engine.semantic_cache.stats()["entries"] == 0
+
+        cold_start.set()
+        await asyncio.wait_for(warm_up, timeout=10)
+        assert (await client.get("/health/ready")).status_code == 200
+        assert engine.collection.count() == 2
+        assert engine._pending_documents == {}
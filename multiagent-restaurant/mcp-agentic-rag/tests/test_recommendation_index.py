@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para los índices de recomendación por presupuesto y región
+"""
+
+import os
+import sys
+import random
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_catalog import InventoryCatalog
+from knowledge_loader import load_knowledge_documents
+from recommendation_index import RecommendationIndex, STYLES, wine_style
+
+KNOWLEDGE_DIR = Path(__file__).resolve().parent.parent / "knowledge_base"
+
+
+@pytest.fixture
+def wines():
+    """Catálogo aleatorio reproducible de 300 vinos"""
+    rng = random.Random(7)
+    return [
+        {
+            "type": "vino",
+            "name": f"Vino {i}",
+            "wine_type": rng.choice(["Tinto", "Blanco", "Espumoso"]),
+            "region": rng.choice(["Rioja", "Rioja Alavesa", "Rías Baixas", "Priorat"]),
+            "vintage": rng.randint(2010, 2024),
+            "price": round(rng.uniform(5, 300), 2),
+            "rating": rng.randint(80, 100),
+        }
+        for i in range(300)
+    ]
+
+
+@pytest.fixture
+def index(wines):
+    catalog = InventoryCatalog()
+    catalog.add([f"v{i}" for i in range(len(wines))], wines)
+    return RecommendationIndex(catalog)
+
+
+def _expected(wines, predicate, k):
+    """Top-k por fuerza bruta: puntuación descendente, empate por precio"""
+    matching = [(i, wine) for i, wine in enumerate(wines) if predicate(wine)]
+    matching.sort(key=lambda item: (-item[1]["rating"], item[1]["price"]))
+    return [item[1]["rating"] for item in matching[:k]]
+
+
+class TestRecommendationIndex:
+    """Tests contra búsqueda por fuerza bruta"""
+
+    def test_by_budget_matches_brute_force(self, index, wines):
+        """Test: el top-k del rango de precio coincide con la fuerza bruta"""
+        ratings = {f"v{i}": wine["rating"] for i, wine in enumerate(wines)}
+        for precio_min, precio_max, tipo in [(None, 50, "cualquiera"), (20, 80, "tinto"), (100, 300, "Blanco")]:
+            ids = index.by_budget(precio_min, precio_max, tipo, k=5)
+            expected = _expected(wines, lambda wine: (
+                (precio_min is None or wine["price"] >= precio_min) and wine["price"] <= precio_max
+                and (tipo == "cualquiera" or wine["wine_type"].lower() == tipo.lower())
+            ), 5)
+            assert [ratings[doc_id] for doc_id in ids] == expected
+            for doc_id in ids:
+                wine = wines[int(doc_id[1:])]
+                assert wine["price"] <= precio_max
+
+    def test_empty_range(self, index):
+        """Test: rango sin vinos"""
+        assert index.by_budget(1, 2, "cualquiera", k=3) == []
+        assert index.by_budget(None, 50, "rosado", k=3) == []
+
+    def test_by_region_and_style(self, index, wines):
+        """Test: región exacta ordenada por puntuación y partición por estilo"""
+        ids = index.by_region("rias baixas", k=4)
+        ratings = [wines[int(doc_id[1:])]["rating"] for doc_id in ids]
+        assert ratings == _expected(wines, lambda wine: wine["region"] == "Rías Baixas", 4)
+
+        newest = max(wine["vintage"] for wine in wines)
+        jovenes = index.by_region("Priorat", estilo="joven", k=10)
+        assert jovenes
+        for doc_id in jovenes:
+            assert wine_style(wines[int(doc_id[1:])]["vintage"], newest) == "joven"
+
+    def test_style_is_relative_to_newest_vintage(self):
+        """Test: la edad se mide desde la añada más reciente del catálogo, no desde el año en curso"""
+        catalog = InventoryCatalog()
+        vintages = [2010, 2015, 2017, 2019, 2021]
+        catalog.add([f"v{year}" for year in vintages],
+                    [{"type": "vino", "name": f"V{year}", "region": "Toro", "vintage": year, "rating": 90}
+                     for year in vintages])
+        index = RecommendationIndex(catalog)
+        assert index.by_region("Toro", estilo="joven") == ["v2019", "v2021"]
+        assert index.by_region("Toro", estilo="crianza") == ["v2017"]
+        assert index.by_region("Toro", estilo="reserva") == ["v2015"]
+        assert index.by_region("Toro", estilo="gran_reserva") == ["v2010"]
+
+    def test_region_contains_merges_subregions(self, index):
+        """Test: sin coincidencia exacta se combinan las regiones que contienen el texto"""
+        assert index.matching_regions("Rioja") == ["rioja"]
+        assert index.matching_regions("alavesa") == ["rioja alavesa"]
+        assert len(index.by_region("rio", k=7)) == 7
+
+    def test_rebuild_on_catalog_change(self, index):
+        """Test: los índices se reconstruyen cuando cambia el catálogo"""
+        index.by_budget(None, 10, k=1)
+        index.catalog.add(["nuevo"], [{"type": "vino", "name": "Nuevo", "wine_type": "Tinto", "price": 1.0, "rating": 100}])
+        assert index.by_budget(None, 2, k=1) == ["nuevo"]
+        assert index.rebuilds == 2
+
+
+@pytest.mark.skipif(not (KNOWLEDGE_DIR / "vinos.json").exists(), reason="knowledge_base/vinos.json no disponible")
+class TestShippedCatalog:
+    """Tests sobre el catálogo real de knowledge_base/vinos.json"""
+
+    def test_every_style_has_wines(self):
+        """Test: con el catálogo real todos los estilos tienen vinos, también en Rioja"""
+        documents = [doc for doc in load_knowledge_documents(KNOWLEDGE_DIR) if doc["metadata"].get("type") == "vino"]
+        catalog = InventoryCatalog()
+        catalog.add([doc["id"] for doc in documents], [doc["metadata"] for doc in documents],
+                    [doc["content"] for doc in documents])
+        index = RecommendationIndex(catalog)
+        for estilo in STYLES:
+            assert index.by_region("Rioja", estilo=estilo, k=1000), estilo
+        assert sum(len(index.by_region("Rioja", estilo=estilo, k=1000)) for estilo in STYLES) == \
+            len(index.by_region("Rioja", k=1000))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la fusión de rankings
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from retrieval import reciprocal_rank_fusion, max_score_fusion, fuse_rankings
+
+
+def source(doc_id, score):
+    return {"id": doc_id, "content": f"contenido {doc_id}", "metadata": {}, "relevance_score": score}
+
+
+class TestFusion:
+    """Tests para la fusión de rankings por ID"""
+
+    def test_rrf_rewards_documents_found_by_several_queries(self):
+        """Test: Un documento presente en varios rankings sube en RRF"""
+        rankings = [
+            [source("a", 0.90), source("b", 0.80)],
+            [source("c", 0.85), source("b", 0.70)],
+            [source("b", 0.75), source("d", 0.60)],
+        ]
+        fused = reciprocal_rank_fusion(rankings)
+
+        assert fused[0]["id"] == "b"
+        assert [s["rank"] for s in fused] == list(range(1, len(fused) + 1))
+        assert len({s["id"] for s in fused}) == len(fused)
+
+    def test_rrf_keeps_best_relevance_per_document(self):
+        """Test: La fuente fusionada conserva la mejor relevancia observada"""
+        fused = reciprocal_rank_fusion([[source("a", 0.4)], [source("a", 0.9)]])
+        assert fused[0]["relevance_score"] == 0.9
+
+    def test_max_score_orders_by_relevance(self):
+        """Test: La fusión por máximo ordena por la mejor relevancia"""
+        fused = max_score_fusion([[source("a", 0.5), source("b", 0.4)], [source("b", 0.95)]])
+        assert [s["id"] for s in fused] == ["b", "a"]
+
+    def test_same_content_prefix_is_not_deduplicated(self):
+        """Test: Documentos distintos con el mismo inicio no se pierden"""
+        first, second = source("a", 0.9), source("b", 0.8)
+        second["content"] = first["content"]
+        assert len(fuse_rankings([[first, second]], "rrf")) == 2
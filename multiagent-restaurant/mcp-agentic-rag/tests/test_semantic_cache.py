@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la caché semántica de respuestas
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """Tests para la clase SemanticCache"""
+
+    def test_near_duplicate_query_hits(self):
+        """Test: Una consulta casi idéntica reutiliza la respuesta"""
+        cache = SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0, 0.0], "respuesta asado", kb_version=1)
+
+        assert cache.lookup([0.99, 0.05, 0.0], kb_version=1) == "respuesta asado"
+        assert cache.lookup([0.0, 1.0, 0.0], kb_version=1) is None
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_kb_version_and_scope_must_match(self):
+        """Test: Una versión distinta de la base o de ámbito no reutiliza la respuesta"""
+        cache = SemanticCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0], "respuesta", kb_version=1, scope="max_results=5")
+
+        assert cache.lookup([1.0, 0.0], kb_version=2, scope="max_results=5") is None
+        assert cache.lookup([1.0, 0.0], kb_version=1, scope="max_results=3") is None
+
+    def test_ttl_expiration(self):
+        """Test: Las entradas caducan pasado el TTL"""
+        cache = SemanticCache(threshold=0.9, ttl_seconds=0.01, max_entries=10)
+        cache.store([1.0, 0.0], "respuesta", kb_version=1)
+        time.sleep(0.02)
+
+        assert cache.lookup([1.0, 0.0], kb_version=1) is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_lru_eviction(self):
+        """Test: Se expulsa la entrada usada hace más tiempo"""
+        cache = SemanticCache(threshold=0.99, ttl_seconds=60, max_entries=2)
+        cache.store([1.0, 0.0, 0.0], "a", kb_version=1)
+        cache.store([0.0, 1.0, 0.0], "b", kb_version=1)
+        cache.lookup([1.0, 0.0, 0.0], kb_version=1)
+        cache.store([0.0, 0.0, 1.0], "c", kb_version=1)
+
+        assert cache.lookup([1.0, 0.0, 0.0], kb_version=1) == "a"
+        assert cache.lookup([0.0, 1.0, 0.0], kb_version=1) is None
+
+    def test_entries_are_copied(self):
+        """Test: Modificar la respuesta guardada o la devuelta no altera la entrada de la caché"""
+        cache = SemanticCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        result = {"answer": "respuesta", "sources": [{"id": "a"}]}
+        cache.store([1.0, 0.0], result, kb_version=1)
+        result["sources"].append({"id": "b"})
+
+        hit = cache.lookup([1.0, 0.0], kb_version=1)
+        hit["sources"][0]["id"] = "modificado"
+        assert cache.lookup([1.0, 0.0], kb_version=1) == {"answer": "respuesta", "sources": [{"id": "a"}]}
+
+    def test_invalidate(self):
+        """Test: Invalidar vacía la caché"""
+        cache = SemanticCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.store(np.ones(3), "respuesta", kb_version=1)
+        cache.invalidate()
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el tesauro de expansión local de consultas
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from thesaurus import Thesaurus, build_thesaurus
+
+
+def wine(name, wine_type, region, grapes, pairing):
+    return {
+        "id": name,
+        "content": f"Vino: {name}\nMaridaje: {pairing}\nDescripción: Vino elaborado con {grapes}. Expresivo.",
+        "metadata": {"type": "vino", "name": name, "wine_type": wine_type, "region": region, "pairing": pairing},
+    }
+
+
+@pytest.fixture
+def thesaurus():
+    """Tesauro minado de un corpus pequeño: Godello concentrado en Valdeorras"""
+    documents = [wine(f"g{i}", "Blanco", "Valdeorras", "Godello", "Ideal con mariscos.") for i in range(5)]
+    documents += [wine(f"t{i}", "Tinto", region, "Tempranillo, Garnacha", "Ideal con carnes rojas.")
+                  for i, region in enumerate(["Rioja", "Toro", "Bierzo", "Priorat", "Rioja"] * 3)]
+    documents.append({
+        "id": "teoria#0",
+        "content": "VI. REGIONES VITIVINÍCOLAS > B. España\n1. Rioja: Tempranillo\n2. Ródano: Syrah y mezclas",
+        "metadata": {"type": "text"},
+    })
+    return Thesaurus(build_thesaurus(documents))
+
+
+class TestThesaurusExpansion:
+    """Tests de expansión por sinónimos, platos y uvas"""
+
+    def test_dish_maps_to_pairing_phrase(self, thesaurus):
+        """Test: un plato se expande con la frase de maridaje y el tipo dominante del inventario"""
+        assert thesaurus.expand("vino para un chuletón") == [
+            "vino para un chuletón", "Vino tinto. Maridaje: Ideal con carnes rojas."
+        ]
+        assert "Vino blanco. Maridaje: Ideal con mariscos." in thesaurus.expand("unas ostras")
+
+    def test_synonyms(self, thesaurus):
+        """Test: "rojo" se expande con "tinto" y "burbujas" con "cava\""""
+        assert "tinto" in thesaurus.expand("vino rojo con cuerpo")[1].split()
+        assert "cava" in thesaurus.expand("algo con burbujas")[1].split()
+
+    def test_grape_regions_from_theory_and_inventory(self, thesaurus):
+        """Test: uva → regiones de la teoría y las sobrerrepresentadas en el inventario"""
+        data = thesaurus.data["grapes"]
+        assert data["tempranillo"]["regions"][0] == "Rioja"
+        assert data["godello"]["regions"] == ["Valdeorras"]
+        assert "mezclas" not in data
+        assert thesaurus.expand("un Godello")[1] == "Vino elaborado con Godello. Región: Valdeorras"
+
+    def test_unknown_terms_keep_the_query(self, thesaurus):
+        """Test: sin términos conocidos solo queda la consulta original"""
+        assert thesaurus.expand("¿Qué es el Protocolo de Contexto de Modelo?") == [
+            "¿Qué es el Protocolo de Contexto de Modelo?"
+        ]
+
+
+class TestThesaurusArtifact:
+    """Tests del tesauro precalculado"""
+
+    def test_stale_artifact_is_rebuilt(self, tmp_path):
+        """Test: un tesauro de otra versión de la base de conocimiento se reconstruye"""
+        knowledge_dir = tmp_path / "knowledge_base"
+        knowledge_dir.mkdir()
+        vinos = [{"name": f"V{i}", "type": "Tinto", "region": "Toro", "vintage": 2018,
+                  "description": "Vino tinto elaborado con Tinta de Toro.", "pairing": "Ideal con estofados."}
+                 for i in range(5)]
+        (knowledge_dir / "vinos.json").write_text(json.dumps(vinos), encoding="utf-8")
+        path = tmp_path / "thesaurus.json"
+        Thesaurus.from_knowledge(knowledge_dir).save(path)
+        assert Thesaurus.load(knowledge_dir, path).data == json.loads(path.read_text(encoding="utf-8"))
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["sources"] = {}
+        data["pairings"] = {}
+        path.write_text(json.dumps(data), encoding="utf-8")
+        assert "estofados" in Thesaurus.load(knowledge_dir, path).data["pairings"]
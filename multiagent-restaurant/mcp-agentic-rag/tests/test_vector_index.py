@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el índice vectorial exacto con NumPy
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_index import NumpyVectorIndex
+
+
+@pytest.fixture
+def index():
+    """Índice con cuatro vinos de ejemplo"""
+    index = NumpyVectorIndex(initial_capacity=2)
+    index.add(
+        ids=["tinto_rioja", "blanco_rueda", "espumoso_cava", "tinto_toro"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [0.9, 0.1, 0.0]],
+        documents=["Tinto Rioja", "Blanco Rueda", "Espumoso Cava", "Tinto Toro"],
+        metadatas=[
+            {"type": "vino", "wine_type": "Tinto", "region": "Rioja", "price": 20.0},
+            {"type": "vino", "wine_type": "Blanco", "region": "Rueda", "price": 12.0},
+            {"type": "vino", "wine_type": "Espumoso", "region": "Penedès", "price": 35.0},
+            {"type": "vino", "wine_type": "Tinto", "region": "Toro", "price": 55.0},
+        ],
+    )
+    return index
+
+
+class TestNumpyVectorIndex:
+    """Tests para la clase NumpyVectorIndex"""
+
+    def test_exact_cosine_top_k(self, index):
+        """Test: El top-k coincide con el orden exacto por coseno"""
+        results = index.query(query_embeddings=[[1.0, 0.05, 0.0]], n_results=2)
+
+        assert results["ids"][0] == ["tinto_rioja", "tinto_toro"]
+        assert results["distances"][0][0] == pytest.approx(1 - 1 / np.sqrt(1.0025), abs=1e-5)
+
+    def test_where_filters_use_masks(self, index):
+        """Test: Los filtros de metadatos restringen los candidatos"""
+        where = {"$and": [{"wine_type": "Tinto"}, {"price": {"$lte": 30}}]}
+        results = index.query(query_embeddings=[[0.0, 1.0, 0.0]], n_results=5, where=where)
+
+        assert results["ids"][0] == ["tinto_rioja"]
+        assert index.get(where={"region": {"$in": ["Rueda", "Toro"]}})["ids"] == ["blanco_rueda", "tinto_toro"]
+
+    def test_multiple_queries_in_one_call(self, index):
+        """Test: Varias consultas se resuelven en una sola llamada"""
+        results = index.query(query_embeddings=[[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]], n_results=1)
+        assert results["ids"] == [["tinto_rioja"], ["espumoso_cava"]]
+
+    def test_add_rejects_duplicates_and_upsert_replaces(self, index):
+        """Test: add rechaza IDs existentes y upsert los reemplaza"""
+        with pytest.raises(ValueError):
+            index.add(ids=["tinto_rioja"], embeddings=[[1.0, 0.0, 0.0]])
+
+        index.upsert(ids=["tinto_rioja"], embeddings=[[0.0, 1.0, 0.0]], documents=["Rioja nuevo"],
+                     metadatas=[{"wine_type": "Tinto"}])
+        assert index.count() == 4
+        assert index.get(ids=["tinto_rioja"])["documents"] == ["Rioja nuevo"]
+
+    def test_delete_keeps_index_consistent(self, index):
+        """Test: Borrar mantiene la correspondencia entre filas e IDs"""
+        index.delete(ids=["tinto_rioja", "blanco_rueda"])
+
+        assert index.count() == 2
+        results = index.query(query_embeddings=[[0.9, 0.1, 0.0]], n_results=1)
+        assert results["ids"][0] == ["tinto_toro"]
+        assert index.get(ids=["espumoso_cava"])["metadatas"][0]["region"] == "Penedès"
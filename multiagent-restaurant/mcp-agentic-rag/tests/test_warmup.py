@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el seguimiento del arranque en segundo plano
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from warmup import WarmupTracker, PENDING, READY, FAILED
+
+
+class TestWarmupTracker:
+    """Tests del estado y tiempos de carga por componente"""
+
+    def test_not_ready_until_every_component_loads(self):
+        """Test: La readiness exige todos los componentes cargados"""
+        tracker = WarmupTracker(("vector_db", "embedding_model"))
+        assert tracker.snapshot()["components"]["vector_db"]["status"] == PENDING
+
+        with tracker.track("vector_db"):
+            pass
+        assert tracker.is_ready("vector_db")
+        assert not tracker.ready
+
+        with tracker.track("embedding_model"):
+            pass
+        snapshot = tracker.snapshot()
+        assert snapshot["ready"] is True
+        assert snapshot["components"]["embedding_model"]["status"] == READY
+        assert snapshot["components"]["embedding_model"]["load_ms"] >= 0
+
+    def test_failure_is_recorded_and_reraised(self):
+        """Test: Un fallo de carga queda registrado con su error"""
+        tracker = WarmupTracker(("knowledge",))
+        with pytest.raises(RuntimeError):
+            with tracker.track("knowledge"):
+                raise RuntimeError("sin disco")
+
+        component = tracker.snapshot()["components"]["knowledge"]
+        assert component["status"] == FAILED
+        assert component["error"] == "sin disco"
+        assert not tracker.ready
+
+    def test_retry_clears_previous_error(self):
+        """Test: Un reintento correcto deja el componente listo y sin error"""
+        tracker = WarmupTracker(("vector_db",))
+        with pytest.raises(ValueError):
+            with tracker.track("vector_db"):
+                raise ValueError("timeout")
+        with tracker.track("vector_db"):
+            pass
+        assert tracker.snapshot()["components"]["vector_db"]["error"] is None
+        assert tracker.ready
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para los filtros estructurados de vinos
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wine_filters import WineFilter
+from vector_index import NumpyVectorIndex
+
+
+class TestWineFilter:
+    """Tests de traducción y evaluación de filtros"""
+
+    def test_empty_filter(self):
+        """Test: sin restricciones no hay cláusula where"""
+        assert WineFilter().to_where() is None
+        assert WineFilter().matches({})
+
+    def test_single_clause(self):
+        """Test: una sola restricción no se envuelve en $and"""
+        assert WineFilter(type="vino").to_where() == {"type": {"$eq": "vino"}}
+
+    def test_combined_clauses(self):
+        """Test: varias restricciones se combinan con $and"""
+        where = WineFilter(type="vino", region="Rioja", price_max=30).to_where()
+        assert where == {"$and": [
+            {"type": {"$eq": "vino"}},
+            {"region": {"$eq": "Rioja"}},
+            {"price": {"$lte": 30}},
+        ]}
+
+    def test_matches(self):
+        """Test: la evaluación en Python coincide con la cláusula"""
+        filtro = WineFilter(type="vino", price_min=10, price_max=30, rating_min=90)
+        assert filtro.matches({"type": "vino", "price": 20.0, "rating": 92})
+        assert not filtro.matches({"type": "vino", "price": 40.0, "rating": 92})
+        assert not filtro.matches({"type": "vino", "price": 20.0, "rating": 85})
+        assert not filtro.matches({"type": "text"})
+
+    def test_where_on_numpy_index(self):
+        """Test: la cláusula generada filtra también en el índice NumPy"""
+        index = NumpyVectorIndex()
+        index.add(
+            ids=["a", "b", "c"],
+            embeddings=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+            metadatas=[
+                {"type": "vino", "price": 50.0},
+                {"type": "vino", "price": 15.0},
+                {"type": "text"},
+            ],
+        )
+        where = WineFilter(type="vino", price_max=20).to_where()
+        result = index.query(query_embeddings=[[1.0, 0.0]], n_results=3, where=where)
+        assert result["ids"][0] == ["b"]
+
+    def test_cache_key_ignores_unset(self):
+        """Test: la clave de caché solo incluye campos definidos"""
+        assert WineFilter(type="vino").cache_key() == '{"type": "vino"}'
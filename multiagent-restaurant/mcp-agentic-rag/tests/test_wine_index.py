@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el índice de vinos por nombre
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wine_index import WineNameIndex, normalize_name, wine_fields
+
+
+@pytest.fixture
+def index():
+    """Índice con vinos de los dos esquemas de metadatos y un documento de texto"""
+    index = WineNameIndex()
+    index.add(
+        ["vino_0", "wine_1", "teoria"],
+        [
+            {"type": "vino", "name": "Señorío de de Luna", "wine_type": "Tinto", "price": 42.0},
+            {"type": "Espumoso", "doc_type": "wine", "name": "Viña de las Estrellas", "price": 30.0},
+            {"type": "text", "source": "teoria_sumiller.txt"},
+        ],
+    )
+    return index
+
+
+class TestWineNameIndex:
+    """Tests de resolución de nombres"""
+
+    def test_exact_normalized(self, index):
+        """Test: la coincidencia exacta ignora acentos, mayúsculas y espacios"""
+        name, ids, similarity = index.resolve("  SENORIO de  de luna ")
+        assert (name, ids, similarity) == ("Señorío de de Luna", ["vino_0"], 1.0)
+
+    def test_fuzzy(self, index):
+        """Test: errores tipográficos se resuelven por trigramas"""
+        name, ids, similarity = index.resolve("Viña de las Estreyas")
+        assert ids == ["wine_1"]
+        assert 0.55 <= similarity < 1.0
+
+    def test_no_match(self, index):
+        """Test: nombres sin parecido no se resuelven"""
+        assert index.resolve("Château Margaux") is None
+        assert len(index) == 2
+
+    def test_remove(self, index):
+        """Test: eliminar un vino lo quita del mapa y del buscador difuso"""
+        index.remove(["vino_0"])
+        assert index.resolve("Señorío de de Luna") is None
+        assert "Señorío de de Luna" not in index.suggest("Señorío")
+
+
+class TestWineFields:
+    """Tests de normalización de esquemas"""
+
+    def test_both_schemas(self):
+        """Test: tipo de vino y descripción con cualquiera de los esquemas"""
+        startup = wine_fields(
+            {"type": "vino", "name": "A", "wine_type": "Tinto", "rating": 90},
+            "Vino: A\nDescripción: Intenso y frutal\nPuntuación: 90/100"
+        )
+        loader = wine_fields({"type": "Blanco", "doc_type": "wine", "name": "B", "price": ""})
+        assert startup["wine_type"] == "Tinto"
+        assert startup["description"] == "Intenso y frutal"
+        assert loader["wine_type"] == "Blanco"
+        assert loader["price"] is None
+
+    def test_normalize_name(self):
+        """Test: normalización del nombre"""
+        assert normalize_name("Viña  de las ESTRELLAS") == "vina de las estrellas"
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Normalización de texto en español para búsquedas léxicas
+Minúsculas, eliminación de acentos (ñ → n, á → a) y tokenización por palabras.
+"""
+
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Palabras vacías frecuentes que no aportan a la puntuación BM25
+STOPWORDS = frozenset("""
+a al algo con de del el en es la las lo los mas me mi muy o para pero por que se sin su sus un una unos unas y
+""".split())
+
+
+def fold_accents(text: str) -> str:
+    """Minúsculas y sin diacríticos"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str, drop_stopwords: bool = False) -> List[str]:
+    """Tokens normalizados de un texto"""
+    tokens = _TOKEN_RE.findall(fold_accents(text))
+    if drop_stopwords:
+        return [token for token in tokens if token not in STOPWORDS]
+    return tokens
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Tesauro de vinos para la expansión local de consultas (QUERY_EXPANSION=thesaurus|hybrid)
+Se construye offline a partir de la base de conocimiento:
+- uvas → regiones: las citadas en la teoría ("Rioja: Tempranillo") y aquellas donde la
+  uva está sobrerrepresentada en vinos.json (lift sobre la frecuencia de la región)
+- platos → frases de maridaje de los propios vinos ("Ideal con carnes rojas."), con un
+  léxico semilla de platos por categoría; solo se conservan las categorías del inventario
+- sinónimos de tipo y de vocabulario de sumillería (tinto/rojo, espumoso/cava)
+Expandir es buscar términos en un diccionario: microsegundos y sin LLM.
+
+Uso:
+    python thesaurus.py build --knowledge-dir knowledge_base --output data/thesaurus.json
+    python thesaurus.py expand "vino para un chuletón"
+"""
+
+import os
+import re
+import json
+import logging
+import argparse
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from knowledge_loader import load_knowledge_documents, source_fingerprints
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Ruta del tesauro construido offline (si no existe o está desactualizado se construye al arrancar)
+THESAURUS_PATH = os.getenv("THESAURUS_PATH", "/app/data/thesaurus.json")
+THESAURUS_VERSION = 1
+# Máximo de variantes por consulta, como la expansión por LLM
+MAX_EXPANSIONS = 4
+
+# Grupos de sinónimos (sin acentos); cada término se expande con el resto de su grupo
+SYNONYM_GROUPS = [
+    ("tinto", "rojo", "tintos", "rojos"),
+    ("espumoso", "cava", "champan", "champagne", "burbujas", "espumosos"),
+    ("rosado", "clarete", "rosados"),
+    ("dulce", "postre", "postres", "dulces"),
+    ("maridaje", "maridar", "acompanar", "combinar"),
+    ("sumiller", "sommelier"),
+    ("cata", "degustacion", "catar"),
+    ("anada", "cosecha"),
+    ("crianza", "barrica", "roble"),
+    ("taninos", "astringencia", "astringente"),
+    ("afrutado", "frutal", "frutosidad"),
+]
+
+# Léxico semilla de platos por categoría de maridaje (clave = frase de maridaje sin "Ideal con")
+DISH_LEXICON = {
+    "carnes rojas": "carne, chuleton, chuleta, entrecot, solomillo, ternera, buey, vaca, cordero, lechazo, cochinillo, "
+                    "asado, parrillada, barbacoa, brasa, hamburguesa",
+    "platos de caza": "caza, jabali, ciervo, venado, perdiz, codorniz, faisan, liebre, pato",
+    "estofados": "estofado, guiso, rabo de toro, cocido, fabada, ragu, carrillada",
+    "mariscos": "marisco, gamba, langostino, ostra, mejillon, almeja, cigala, bogavante, langosta, navaja, percebe, "
+                "pulpo, centolla, vieira",
+    "arroces marineros": "paella, arroz, fideua, arroz negro, arroz caldoso",
+    "pescados blancos": "pescado, merluza, lubina, dorada, bacalao, rape, lenguado, rodaballo",
+    "sushi": "sashimi, nigiri, maki, japones, japonesa",
+    "quesos curados": "queso, manchego, idiazabal, parmesano, curado",
+    "embutidos ibericos": "jamon, chorizo, salchichon, lomo, iberico, embutido",
+    "foie": "pate, higado",
+    "caviar": "huevas, esturion",
+    "tapas ligeras": "tapa, pintxo, pincho, croqueta",
+    "ensaladas": "ensalada, verdura, vegetal",
+    "aperitivo": "brindis, brindar, celebracion, canape, entrante, vermut",
+}
+
+# Uvas en la descripción de los vinos ("Vino tinto elaborado con Garnacha, Mencía.")
+_GRAPES_RE = re.compile(r"elaborado con ([^.]+)\.")
+# Línea "Región: uvas" en la sección de regiones de la teoría
+_REGION_LINE_RE = re.compile(r"^\s*\d+\.\s*([^:]+):\s*(.+)$", re.MULTILINE)
+_PAIRING_RE = re.compile(r"^ideal\s+(?:con|como)\s+", re.IGNORECASE)
+# Una región cuenta para una uva si aparece al menos este número de veces y con este lift
+_MIN_GRAPE_REGION_COUNT = 5
+_MIN_GRAPE_REGION_LIFT = 2.0
+# Tipo dominante de una categoría de maridaje
+_MIN_TYPE_SHARE = 0.6
+
+
+def _key(text: str) -> str:
+    """Clave normalizada: tokens sin acentos separados por espacios"""
+    return " ".join(tokenize(text))
+
+
+def build_thesaurus(documents: List[Dict[str, Any]], sources: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Minar el tesauro de los documentos de la base de conocimiento"""
+    grape_counts: Counter = Counter()
+    grape_regions: Dict[str, Counter] = defaultdict(Counter)
+    region_counts: Counter = Counter()
+    pairing_types: Dict[str, Counter] = defaultdict(Counter)
+    pairing_phrases: Dict[str, str] = {}
+    grape_names: Dict[str, str] = {}
+    theory_regions: Dict[str, List[str]] = defaultdict(list)
+    wines = 0
+
+    for doc in documents:
+        metadata = doc.get("metadata") or {}
+        if metadata.get("type") == "vino":
+            wines += 1
+            region = metadata.get("region") or ""
+            region_counts[region] += 1
+            match = _GRAPES_RE.search(doc["content"])
+            for grape in (match.group(1).split(",") if match else []):
+                grape = grape.strip()
+                grape_names.setdefault(_key(grape), grape)
+                grape_counts[_key(grape)] += 1
+                grape_regions[_key(grape)][region] += 1
+            pairing = (metadata.get("pairing") or "").strip()
+            if pairing:
+                key = _key(_PAIRING_RE.sub("", pairing))
+                pairing_phrases.setdefault(key, pairing)
+                pairing_types[key][metadata.get("wine_type") or ""] += 1
+        elif "REGIONES" in doc["content"].split("\n", 1)[0].upper():
+            for region, grapes in _REGION_LINE_RE.findall(doc["content"]):
+                for grape in re.split(r",|\s+y\s+", grapes):
+                    grape = grape.strip()
+                    # Solo nombres propios: "Syrah y mezclas" o "Vinos tintos estructurados" no son uvas
+                    if grape[:1].isupper() and not grape.lower().startswith("vinos"):
+                        grape_names.setdefault(_key(grape), grape)
+                        theory_regions[_key(grape)].append(region.strip())
+
+    grapes = {}
+    for key in set(grape_counts) | set(theory_regions):
+        regions = list(theory_regions.get(key, []))
+        counts = grape_regions.get(key, Counter())
+        lifts = {
+            region: (count / grape_counts[key]) / (region_counts[region] / wines)
+            for region, count in counts.items() if count >= _MIN_GRAPE_REGION_COUNT
+        }
+        regions += [region for region, lift in sorted(lifts.items(), key=lambda item: -item[1])
+                    if lift >= _MIN_GRAPE_REGION_LIFT and region not in regions]
+        if regions:
+            grapes[key] = {"name": grape_names[key], "regions": regions[:3]}
+
+    pairings = {}
+    for key, phrase in pairing_phrases.items():
+        types = pairing_types[key]
+        total = sum(types.values())
+        dominant = [wine_type for wine_type, count in types.most_common() if wine_type and count / total >= _MIN_TYPE_SHARE]
+        dishes = sorted({_key(dish) for dish in DISH_LEXICON.get(key, "").split(",") if dish.strip()} - {key})
+        pairings[key] = {"phrase": phrase, "types": dominant, "dishes": dishes}
+
+    return {
+        "version": THESAURUS_VERSION,
+        "sources": sources,
+        "synonyms": [list(group) for group in SYNONYM_GROUPS],
+        "grapes": grapes,
+        "pairings": pairings,
+    }
+
+
+class Thesaurus:
+    """Expansión de consultas por búsqueda de términos en el tesauro"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        # término → lista de (tipo, valor); términos de varias palabras primero
+        entries: Dict[str, List[tuple]] = defaultdict(list)
+        for group in data.get("synonyms", []):
+            for term in group:
+                entries[term].append(("synonym", [other for other in group if other != term]))
+        for key, grape in data.get("grapes", {}).items():
+            entries[key].append(("grape", grape))
+        for key, pairing in data.get("pairings", {}).items():
+            for term in [key] + pairing["dishes"]:
+                entries[term].append(("pairing", pairing))
+                # Plurales simples de platos de una palabra ("ostras", "mejillones")
+                if " " not in term:
+                    entries[term + ("es" if term[-1] not in "aeiou" else "s")].append(("pairing", pairing))
+        self._entries = sorted(entries.items(), key=lambda item: -len(item[0]))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def from_knowledge(cls, knowledge_dir: Path) -> "Thesaurus":
+        documents = load_knowledge_documents(knowledge_dir)
+        return cls(build_thesaurus(documents, source_fingerprints(knowledge_dir)))
+
+    @classmethod
+    def load(cls, knowledge_dir: Path, path: Path = None) -> "Thesaurus":
+        """Tesauro precalculado si está al día con la base de conocimiento; si no, se construye en memoria"""
+        path = Path(path or THESAURUS_PATH)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == THESAURUS_VERSION and data.get("sources") == source_fingerprints(knowledge_dir):
+                return cls(data)
+            logger.warning(f"Tesauro {path} desactualizado; se reconstruye desde {knowledge_dir}")
+        return cls.from_knowledge(knowledge_dir)
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+    def expand(self, query: str, max_expansions: int = MAX_EXPANSIONS) -> List[str]:
+        """Consulta original más hasta `max_expansions` variantes (solo la original si no hay términos conocidos)"""
+        remaining = f" {_key(query)} "
+        synonyms: List[str] = []
+        variants: List[str] = []
+        for term, matches in self._entries:
+            needle = f" {term} "
+            if needle not in remaining:
+                continue
+            remaining = remaining.replace(needle, " ")
+            for kind, value in matches:
+                if kind == "synonym":
+                    synonyms += [other for other in value if other not in synonyms]
+                elif kind == "grape":
+                    variants.append(f"Vino elaborado con {value['name']}. Región: {', '.join(value['regions'])}")
+                else:
+                    prefix = f"Vino {value['types'][0].lower()}. " if len(value["types"]) == 1 else ""
+                    variants.append(f"{prefix}Maridaje: {value['phrase']}")
+        if synonyms:
+            variants.insert(0, f"{query} {' '.join(synonyms)}")
+        unique = list(dict.fromkeys(variant for variant in variants if variant != query))
+        return [query] + unique[:max_expansions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tesauro de vinos para la expansión local de consultas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Construir el tesauro desde la base de conocimiento")
+    build.add_argument("--knowledge-dir", default=os.getenv("KNOWLEDGE_BASE_PATH", "knowledge_base"))
+    build.add_argument("--output", default=os.getenv("THESAURUS_PATH", "data/thesaurus.json"))
+
+    expand = subparsers.add_parser("expand", help="Mostrar la expansión de una consulta")
+    expand.add_argument("query")
+    expand.add_argument("--knowledge-dir", default=os.getenv("KNOWLEDGE_BASE_PATH", "knowledge_base"))
+    expand.add_argument("--thesaurus", default=os.getenv("THESAURUS_PATH", "data/thesaurus.json"))
+
+    args = parser.parse_args()
+    if args.command == "build":
+        thesaurus = Thesaurus.from_knowledge(Path(args.knowledge_dir))
+        thesaurus.save(Path(args.output))
+        data = thesaurus.data
+        print(f"Tesauro en {args.output}: {len(data['grapes'])} uvas, {len(data['pairings'])} maridajes, "
+              f"{len(data['synonyms'])} grupos de sinónimos, {len(thesaurus)} términos")
+    else:
+        for variant in Thesaurus.load(Path(args.knowledge_dir), Path(args.thesaurus)).expand(args.query):
+            print(variant)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Índice vectorial exacto en memoria con NumPy (VECTOR_DB_TYPE=numpy)
+Mantiene los embeddings normalizados L2 en una única matriz float32 contigua
+y calcula el top-k exacto por coseno con un solo producto matriz-vector.
+Expone el mismo subconjunto de API que una colección de ChromaDB (add, upsert,
+get, query, count, delete) para ser intercambiable dentro del motor RAG.
+"""
+
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_COMPARISONS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+class NumpyVectorIndex:
+    """Colección vectorial exacta en memoria compatible con la API de ChromaDB"""
+
+    # Tipo de la matriz almacenada (las subclases compactas usan float16)
+    _dtype = np.float32
+
+    def __init__(self, name: str = "rag_documents", initial_capacity: int = 1024):
+        self.name = name
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_arrays(cls, ids: List[str], embeddings: np.ndarray, documents: List[str],
+                    metadatas: List[Dict[str, Any]], name: str = "rag_documents") -> "NumpyVectorIndex":
+        """Crear el índice sobre una matriz ya normalizada sin copiarla (p. ej. un numpy.memmap)"""
+        index = cls(name)
+        index._matrix = embeddings
+        index._size = len(ids)
+        index._ids = list(ids)
+        index._documents = list(documents)
+        index._metadatas = [metadata or {} for metadata in metadatas]
+        index._rows = {doc_id: row for row, doc_id in enumerate(index._ids)}
+        return index
+
+    # === Almacenamiento ===
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _prepare_vectors(self, embeddings) -> np.ndarray:
+        """Vectores tal como se almacenan en la matriz"""
+        return self._normalize(embeddings)
+
+    def _ensure_capacity(self, dim: int, extra: int):
+        """Reservar filas en la matriz duplicando la capacidad cuando se llena"""
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, extra)
+            self._matrix = np.zeros((capacity, dim), dtype=self._dtype)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"Dimensión de embedding {dim} distinta de la del índice {self._matrix.shape[1]}")
+        needed = self._size + extra
+        if needed > self._matrix.shape[0] or not self._matrix.flags.writeable:
+            # También copia la matriz si es de solo lectura (memmap compartido)
+            capacity = max(needed, self._matrix.shape[0] * 2)
+            grown = np.zeros((capacity, dim), dtype=self._dtype)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def _write(self, ids: List[str], embeddings, documents: Optional[List[str]],
+               metadatas: Optional[List[Optional[Dict[str, Any]]]], replace: bool):
+        if len(set(ids)) != len(ids):
+            raise ValueError("IDs duplicados en el lote")
+        vectors = self._prepare_vectors(embeddings)
+        if len(vectors) != len(ids):
+            raise ValueError("El número de embeddings no coincide con el número de IDs")
+        documents = documents or [""] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        new_ids = [doc_id for doc_id in ids if doc_id not in self._rows]
+        if not replace and len(new_ids) != len(ids):
+            existing = [doc_id for doc_id in ids if doc_id in self._rows]
+            raise ValueError(f"IDs ya existentes: {existing[:5]}")
+
+        self._ensure_capacity(vectors.shape[1], len(new_ids))
+        for doc_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._rows[doc_id] = row
+                self._ids.append(doc_id)
+                self._documents.append(document)
+                self._metadatas.append(metadata or {})
+            else:
+                self._documents[row] = document
+                self._metadatas[row] = metadata or {}
+            self._matrix[row] = vector
+        self._columns.clear()
+
+    def add(self, ids: List[str], embeddings, documents: List[str] = None,
+            metadatas: List[Optional[Dict[str, Any]]] = None):
+        """Agregar documentos nuevos"""
+        self._write(ids, embeddings, documents, metadatas, replace=False)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None,
+               metadatas: List[Optional[Dict[str, Any]]] = None):
+        """Agregar o reemplazar documentos"""
+        self._write(ids, embeddings, documents, metadatas, replace=True)
+
+    def delete(self, ids: List[str] = None, where: Dict[str, Any] = None):
+        """Eliminar documentos moviendo la última fila al hueco"""
+        rows = self._select_rows(ids, where)
+        if rows and not self._matrix.flags.writeable:
+            self._ensure_capacity(self._matrix.shape[1], 0)
+        for row in sorted(rows, reverse=True):
+            last = self._size - 1
+            removed_id = self._ids[row]
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._documents[row] = self._documents[last]
+                self._metadatas[row] = self._metadatas[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._documents.pop()
+            self._metadatas.pop()
+            del self._rows[removed_id]
+            self._size -= 1
+        self._columns.clear()
+
+    def count(self) -> int:
+        """Número de documentos"""
+        return self._size
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Vista de la matriz de embeddings normalizados"""
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    # === Filtros de metadatos ===
+
+    def _column(self, field: str) -> np.ndarray:
+        """Columna de valores de metadatos (cacheada hasta la siguiente escritura)"""
+        column = self._columns.get(field)
+        if column is None:
+            column = np.empty(self._size, dtype=object)
+            column[:] = [metadata.get(field) for metadata in self._metadatas]
+            self._columns[field] = column
+        return column
+
+    def _numeric_column(self, field: str) -> np.ndarray:
+        """Columna numérica de un campo; NaN donde el valor no es numérico"""
+        key = f"#num:{field}"
+        column = self._columns.get(key)
+        if column is None:
+            column = np.array([
+                value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+                for value in self._column(field)
+            ], dtype=np.float64)
+            self._columns[key] = column
+        return column
+
+    def _condition_mask(self, field: str, condition: Any) -> np.ndarray:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(self._size, dtype=bool)
+        for operator, value in condition.items():
+            if operator == "$eq":
+                mask &= self._column(field) == value
+            elif operator == "$ne":
+                mask &= self._column(field) != value
+            elif operator in _COMPARISONS:
+                with np.errstate(invalid="ignore"):
+                    mask &= _COMPARISONS[operator](self._numeric_column(field), value)
+            elif operator in ("$in", "$nin"):
+                values = set(value)
+                members = np.fromiter((item in values for item in self._column(field)), dtype=bool, count=self._size)
+                mask &= members if operator == "$in" else ~members
+            else:
+                raise ValueError(f"Operador de filtro no soportado: {operator}")
+        return mask
+
+    def where_mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Evaluar un filtro estilo ChromaDB como máscara booleana"""
+        mask = np.ones(self._size, dtype=bool)
+        for key, value in (where or {}).items():
+            if key == "$and":
+                for clause in value:
+                    mask &= self.where_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(self._size, dtype=bool)
+                for clause in value:
+                    any_mask |= self.where_mask(clause)
+                mask &= any_mask
+            else:
+                mask &= self._condition_mask(key, value)
+        return mask
+
+    def _select_rows(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> List[int]:
+        if ids is not None:
+            rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+        else:
+            rows = list(range(self._size))
+        if where:
+            mask = self.where_mask(where)
+            rows = [row for row in rows if mask[row]]
+        return rows
+
+    # === Lectura y búsqueda ===
+
+    def _similarities(self, queries: np.ndarray) -> np.ndarray:
+        """Coseno de cada consulta normalizada contra todas las filas"""
+        return queries @ self.embeddings.T
+
+    def get(self, ids: List[str] = None, where: Dict[str, Any] = None, limit: int = None,
+            offset: int = None, include: List[str] = None) -> Dict[str, Any]:
+        """Recuperar documentos por ID y/o filtro de metadatos"""
+        include = include or ["documents", "metadatas"]
+        rows = self._select_rows(ids, where)
+        rows = rows[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+
+        return {
+            "ids": [self._ids[row] for row in rows],
+            "documents": [self._documents[row] for row in rows] if "documents" in include else None,
+            "metadatas": [self._metadatas[row] for row in rows] if "metadatas" in include else None,
+            "embeddings": self._matrix[rows] if "embeddings" in include and rows else None,
+        }
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict[str, Any] = None,
+              include: List[str] = None) -> Dict[str, Any]:
+        """Top-k exacto por coseno para una o varias consultas"""
+        include = include or ["documents", "metadatas", "distances"]
+        queries = self._normalize(query_embeddings)
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        if self._size == 0:
+            for _ in range(len(queries)):
+                for key in result:
+                    result[key].append([])
+            return result
+
+        similarities = self._similarities(queries)
+        mask = self.where_mask(where) if where else None
+        if mask is not None:
+            similarities[:, ~mask] = -np.inf
+        candidates = int(mask.sum()) if mask is not None else self._size
+        k = min(n_results, candidates)
+
+        for scores in similarities:
+            if k <= 0:
+                top = np.empty(0, dtype=int)
+            else:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+            result["ids"].append([self._ids[row] for row in top])
+            result["documents"].append([self._documents[row] for row in top])
+            result["metadatas"].append([self._metadatas[row] for row in top])
+            result["distances"].append([float(1 - scores[row]) for row in top])
+
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                result[key] = None
+        return result
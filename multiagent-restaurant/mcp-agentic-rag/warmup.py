@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Seguimiento del arranque en segundo plano del servidor RAG
+El servidor abre el puerto de inmediato y carga la vector DB, la base de
+conocimiento y el modelo de embeddings después. Cada componente registra su
+estado y su tiempo de carga para /health/ready.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class WarmupTracker:
+    """Estado y tiempo de carga de cada componente (seguro entre hilos)"""
+
+    def __init__(self, components: Iterable[str]):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._components: Dict[str, Dict[str, Any]] = {
+            name: {"status": PENDING, "load_ms": None, "error": None} for name in components
+        }
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._components.setdefault(name, {"status": PENDING, "load_ms": None, "error": None}).update(fields)
+
+    @contextmanager
+    def track(self, name: str):
+        """Marcar un componente como cargando y, al salir, como listo o fallido con su duración"""
+        self._update(name, status=LOADING, error=None)
+        start = time.time()
+        try:
+            yield
+        except Exception as e:
+            self._update(name, status=FAILED, load_ms=round((time.time() - start) * 1000, 1), error=str(e))
+            raise
+        load_ms = round((time.time() - start) * 1000, 1)
+        self._update(name, status=READY, load_ms=load_ms)
+        logger.info(f"Componente '{name}' listo en {load_ms} ms")
+
+    def is_ready(self, name: str) -> bool:
+        with self._lock:
+            return self._components.get(name, {}).get("status") == READY
+
+    @property
+    def ready(self) -> bool:
+        """Todos los componentes cargados"""
+        with self._lock:
+            return all(component["status"] == READY for component in self._components.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(component) for name, component in self._components.items()}
+        return {
+            "ready": all(component["status"] == READY for component in components.values()),
+            "uptime_ms": round((time.time() - self._started) * 1000, 1),
+            "components": components
+        }
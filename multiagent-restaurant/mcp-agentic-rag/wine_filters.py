@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Filtros estructurados de vinos para la recuperación
+Un WineFilter se traduce a una cláusula `where` de ChromaDB (que también
+entiende el índice NumPy) para filtrar dentro de la búsqueda vectorial en
+lugar de descartar resultados después.
+"""
+
+import json
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+# Campo de metadatos -> (atributo mínimo, atributo máximo)
+_RANGES = {
+    "price": ("price_min", "price_max"),
+    "rating": ("rating_min", "rating_max"),
+    "vintage": ("vintage_min", "vintage_max"),
+}
+
+
+@dataclass
+class WineFilter:
+    """Restricciones sobre los metadatos de los documentos recuperados"""
+    type: Optional[str] = None
+    wine_type: Optional[str] = None
+    region: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    rating_min: Optional[float] = None
+    rating_max: Optional[float] = None
+    vintage_min: Optional[int] = None
+    vintage_max: Optional[int] = None
+
+    def _clauses(self) -> List[Dict[str, Any]]:
+        clauses = []
+        for field in ("type", "wine_type", "region"):
+            value = getattr(self, field)
+            if value:
+                clauses.append({field: {"$eq": value}})
+        for field, (low, high) in _RANGES.items():
+            if getattr(self, low) is not None:
+                clauses.append({field: {"$gte": getattr(self, low)}})
+            if getattr(self, high) is not None:
+                clauses.append({field: {"$lte": getattr(self, high)}})
+        return clauses
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        """Cláusula `where` estilo ChromaDB (None si no hay restricciones)"""
+        clauses = self._clauses()
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        """Comprobar los metadatos de un documento en Python"""
+        for field in ("type", "wine_type", "region"):
+            value = getattr(self, field)
+            if value and metadata.get(field) != value:
+                return False
+        for field, (low, high) in _RANGES.items():
+            low_value, high_value = getattr(self, low), getattr(self, high)
+            if low_value is None and high_value is None:
+                continue
+            value = metadata.get(field)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return False
+            if low_value is not None and value < low_value:
+                return False
+            if high_value is not None and value > high_value:
+                return False
+        return True
+
+    def cache_key(self) -> str:
+        """Representación estable para claves de caché"""
+        return json.dumps({k: v for k, v in asdict(self).items() if v is not None}, sort_keys=True)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Índice de vinos por nombre
+Mapa hash de nombre normalizado -> IDs de documento más un buscador difuso por
+trigramas de caracteres, construido a partir del metadato `name`. Entiende los
+dos esquemas de metadatos de vinos: el de la carga inicial (type="vino",
+wine_type=...) y el de load-wines.py (type=<tipo de vino>, doc_type="wine").
+"""
+
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from text_utils import tokenize
+
+# Similitud mínima (coeficiente de Dice sobre trigramas) para aceptar una coincidencia difusa
+FUZZY_THRESHOLD = 0.55
+
+_DESCRIPTION_RE = re.compile(r"^Descripción:\s*(.+)$", re.MULTILINE)
+
+
+def normalize_name(name: str) -> str:
+    """Nombre sin acentos, en minúsculas y con espacios simples"""
+    return " ".join(tokenize(name))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_wine(metadata: Dict[str, Any]) -> bool:
+    """El documento describe un vino"""
+    return bool(metadata.get("name")) and (metadata.get("type") == "vino" or metadata.get("doc_type") == "wine")
+
+
+def wine_fields(metadata: Dict[str, Any], content: str = "") -> Dict[str, Any]:
+    """Campos de un vino con independencia del esquema de metadatos"""
+    wine_type = metadata.get("wine_type") if metadata.get("type") == "vino" else metadata.get("type")
+    description = metadata.get("description")
+    if not description and content:
+        match = _DESCRIPTION_RE.search(content)
+        description = match.group(1).strip() if match else None
+    return {
+        "name": metadata.get("name"),
+        "wine_type": wine_type or None,
+        "region": metadata.get("region") or None,
+        "vintage": metadata.get("vintage") or None,
+        "price": metadata.get("price") if isinstance(metadata.get("price"), (int, float)) else None,
+        "stock": metadata.get("stock") if isinstance(metadata.get("stock"), (int, float)) else None,
+        "rating": metadata.get("rating") if isinstance(metadata.get("rating"), (int, float)) else None,
+        "pairing": metadata.get("pairing") or None,
+        "description": description,
+    }
+
+
+class WineNameIndex:
+    """Resolución de nombres de vino: coincidencia exacta normalizada y difusa por trigramas"""
+
+    def __init__(self):
+        self._by_name: Dict[str, List[str]] = {}
+        self._doc_names: Dict[str, str] = {}
+        self._display_names: Dict[str, str] = {}
+        self._grams: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_names)
+
+    def add(self, ids: List[str], metadatas: List[Optional[Dict[str, Any]]]):
+        """Indexar los documentos que son vinos (reemplaza los existentes)"""
+        for doc_id, metadata in zip(ids, metadatas):
+            if doc_id in self._doc_names:
+                self.remove([doc_id])
+            metadata = metadata or {}
+            if not is_wine(metadata):
+                continue
+            key = normalize_name(str(metadata["name"]))
+            if not key:
+                continue
+            if key not in self._by_name:
+                self._by_name[key] = []
+                self._display_names[key] = str(metadata["name"])
+                for gram in _trigrams(key):
+                    self._grams.setdefault(gram, set()).add(key)
+            self._by_name[key].append(doc_id)
+            self._doc_names[doc_id] = key
+
+    def remove(self, ids: List[str]):
+        """Eliminar documentos del índice"""
+        for doc_id in ids:
+            key = self._doc_names.pop(doc_id, None)
+            if key is None:
+                continue
+            self._by_name[key].remove(doc_id)
+            if not self._by_name[key]:
+                del self._by_name[key]
+                del self._display_names[key]
+                for gram in _trigrams(key):
+                    self._grams[gram].discard(key)
+                    if not self._grams[gram]:
+                        del self._grams[gram]
+
+    def clear(self):
+        """Vaciar el índice"""
+        self.__init__()
+
+    def _candidates(self, key: str, limit: int) -> List[Tuple[str, float]]:
+        """Nombres más parecidos por coeficiente de Dice sobre trigramas"""
+        grams = _trigrams(key)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for name in self._grams.get(gram, ()):
+                shared[name] = shared.get(name, 0) + 1
+        scored = [
+            (name, 2 * count / (len(grams) + len(_trigrams(name))))
+            for name, count in shared.items()
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+    def resolve(self, name: str) -> Optional[Tuple[str, List[str], float]]:
+        """(nombre, IDs, similitud) del vino que corresponde al nombre dado, o None"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._by_name:
+            return self._display_names[key], list(self._by_name[key]), 1.0
+        candidates = self._candidates(key, 1)
+        if candidates and candidates[0][1] >= FUZZY_THRESHOLD:
+            best, score = candidates[0]
+            return self._display_names[best], list(self._by_name[best]), score
+        return None
+
+    def suggest(self, name: str, limit: int = 3) -> List[str]:
+        """Nombres parecidos para sugerir cuando no hay coincidencia"""
+        return [self._display_names[key] for key, _ in self._candidates(normalize_name(name), limit)]